@@ -11,18 +11,20 @@
 # =========================================
 # SPIS TREŚCI
 # =========================================
-# 1. Importy i rejestracja obsługi formatów (linie 27-42)
-# 2. Klasy pomocnicze dla UI (linie 50-452)
-#    2.1. ThemeManager - Zarządzanie motywami aplikacji (linie 55-250)
-#    2.2. ToolTip - Tooltips dla widgetów (linie 252-328)
-#    2.3. LoadingSpinner - Animowany spinner ładowania (linie 330-452)
-# 3. Klasa główna aplikacji: ImageFlow (linie 455-1270)
-#    3.1. Inicjalizacja i konfiguracja systemu (linie 464-548)
-#    3.2. Tworzenie interfejsu użytkownika (linie 551-787)
-#    3.3. Obsługa plików i interfejsu (linie 790-970)
-#    3.4. Logika konwersji plików (linie 973-1143)
-#    3.5. Funkcje UI i animacji (linie 1146-1270)
-# 4. Funkcja główna i uruchomienie (linie 1273-1289)
+# 1. Importy i rejestracja obsługi formatów (linie 31-110)
+# 2. Klasy pomocnicze dla UI (linie 112-784)
+#    2.1. ThemeManager - Zarządzanie motywami aplikacji (linie 115-309)
+#    2.2. ToolTip - Tooltips dla widgetów (linie 312-387)
+#    2.3. LoadingSpinner - Animowany spinner ładowania (linie 390-509)
+#    2.4. LogSink - Buforowany zapis logów (linie 512-587)
+#    2.5. VirtualListView - Wirtualizowana lista plików (linie 590-784)
+# 3. Klasa główna aplikacji: ImageFlow (linie 787-2227)
+#    3.1. Inicjalizacja i konfiguracja systemu (linie 796-944)
+#    3.2. Tworzenie interfejsu użytkownika (linie 946-1366)
+#    3.3. Obsługa plików i interfejsu (linie 1368-1729)
+#    3.4. Logika konwersji plików (linie 1731-2141)
+#    3.5. Funkcje UI i animacji (linie 2143-2227)
+# 4. Funkcja główna i uruchomienie (linie 2230-2253)
 # =========================================
 
 # =========================================
@@ -38,6 +40,21 @@ import logging
 import threading
 import subprocess
 import math
+import queue
+from collections import deque
+
+from encoders import supports_target_size
+from engine import (
+    MAX_IMAGE_PIXELS,
+    STATUS_UNCHANGED,
+    ConversionOptions,
+    convert_batch,
+    default_memory_budget,
+    scan_folder,
+)
+from filequeue import REJECT_CONTENT, FileQueue
+from journal import JOURNAL_NAME, load_job, resume, run_job
+from preview import DiskPreviewCache, PreviewLoader, default_cache_dir
 
 # Wykrywanie systemu operacyjnego
 SYSTEM_OS = platform.system()
@@ -48,6 +65,49 @@ IS_LINUX = SYSTEM_OS == "Linux"
 # Rejestracja obsługi plików HEIC
 register_heif_opener()
 
+# Odstęp (ms) między odświeżeniami interfejsu podczas konwersji.
+# Zdarzenia z wątków roboczych są zbierane i nakładane raz na klatkę.
+UI_FRAME_MS = 50
+
+# Liczba ostatnich komunikatów przechowywanych w polu logów
+LOG_CAPACITY = 1000
+
+# Od tej liczby plików konwersja loguje tylko podsumowanie i błędy
+LOG_SUMMARY_THRESHOLD = 500
+
+# Liczba plików przekazywanych naraz z wątku przeglądania folderu do listy
+SCAN_CHUNK = 2000
+
+# Polityki obsługi istniejących plików (etykieta w GUI -> polityka silnika)
+POLITYKI_KONFLIKTOW = {
+    "Nadpisz": "overwrite",
+    "Pomiń": "skip",
+    "Zmień nazwę": "rename",
+    "Pomiń nowsze": "skip_if_newer",
+}
+
+# Układy plików wynikowych (etykieta w GUI -> układ silnika)
+UKLADY_WYJSCIA = {
+    "Jeden folder": "flat",
+    "Jak foldery źródłowe": "tree",
+    "Podfoldery (duże partie)": "sharded",
+}
+
+# Kolejność wykonania partii (etykieta w GUI -> polityka silnika)
+KOLEJNOSCI_WYKONANIA = {
+    "Jak na liście": "input",
+    "Największe najpierw": "largest_first",
+    "Według położenia na dysku": "locality",
+}
+
+# Profile kodera (etykieta w GUI -> profil silnika)
+PROFILE_KODERA = {
+    "Najszybszy zapis": "fastest",
+    "Zrównoważony": "balanced",
+    "Najmniejsze pliki": "smallest",
+    "Archiwalny (bezstratny)": "archival",
+}
+
 
 # =========================================
 # Klasy pomocnicze dla UI
@@ -449,6 +509,281 @@ class LoadingSpinner:
                 self.running = False
 
 
+class LogSink:
+    """Buforowany, ograniczony rozmiarem zapis logów do pola tekstowego"""
+
+    def __init__(
+        self,
+        widget,
+        logger,
+        capacity=LOG_CAPACITY,
+        flush_ms=UI_FRAME_MS,
+        level=logging.INFO,
+    ):
+        self.widget = widget
+        self.logger = logger
+        self.capacity = capacity
+        self.flush_ms = flush_ms
+        self.level = level
+        self.summary_only = False  # Tryb "tylko podsumowanie"
+        self.suppressed = 0  # Pominięte komunikaty szczegółowe
+        self.pending = deque(maxlen=capacity)  # Komunikaty czekające na zapis
+        self._flush_id = None
+
+    def write(self, message, level=logging.INFO, detail=False):
+        """
+        Dodaje komunikat do bufora; zapis do widgetu następuje paczkami.
+        Koszt wywołania jest stały niezależnie od liczby komunikatów.
+
+        Args:
+            message (str): Treść komunikatu
+            level (int): Poziom logowania (logging.INFO, logging.WARNING...)
+            detail (bool): Komunikat szczegółowy (np. per plik) - pomijany
+                w trybie "tylko podsumowanie", chyba że to ostrzeżenie/błąd
+        """
+        if level < self.level:
+            return
+        if detail and self.summary_only and level < logging.WARNING:
+            self.suppressed += 1
+            return
+        self.logger.log(level, message)
+        self.pending.append(message)
+        if self._flush_id is None:
+            try:
+                self._flush_id = self.widget.after(self.flush_ms, self.flush)
+            except tk.TclError:
+                # Widget został zniszczony
+                self.pending.clear()
+
+    def flush(self):
+        """
+        Zapisuje oczekujące komunikaty do widgetu jednym wstawieniem
+        i przycina pole do ostatnich `capacity` linii.
+        """
+        self._flush_id = None
+        if not self.pending:
+            return
+        tekst = "\n".join(self.pending) + "\n"
+        self.pending.clear()
+        try:
+            self.widget.insert(tk.END, tekst)
+            linie = int(self.widget.index("end-1c").split(".")[0]) - 1
+            if linie > self.capacity:
+                self.widget.delete("1.0", f"{linie - self.capacity + 1}.0")
+            self.widget.see(tk.END)
+        except tk.TclError:
+            # Widget został zniszczony
+            pass
+
+    def set_summary_only(self, enabled):
+        """
+        Włącza lub wyłącza tryb "tylko podsumowanie" i zeruje licznik
+        pominiętych komunikatów.
+
+        Args:
+            enabled (bool): True włącza tryb podsumowania
+        """
+        self.summary_only = enabled
+        self.suppressed = 0
+
+
+class VirtualListView(tk.Listbox):
+    """
+    Wirtualizowana lista: Listbox zawiera tylko widoczne wiersze, a dane
+    pochodzą z zewnętrznej sekwencji. Przewijanie, zaznaczanie (także
+    wielokrotne) i scrollbar działają na indeksach całej sekwencji, więc
+    koszt pamięci i odświeżania zależy od wysokości okna, nie od liczby
+    pozycji. Metody size/curselection/selection_set/see/yview zachowują
+    semantykę tk.Listbox dla indeksów całej listy.
+    """
+
+    def __init__(self, parent, source, text=None, **kwargs):
+        """
+        Args:
+            parent: Widget nadrzędny
+            source (callable): Funkcja zwracająca sekwencję pozycji (len, [i])
+            text (callable): Tekst wiersza - funkcja (sekwencja, indeks);
+                domyślnie str(sekwencja[indeks])
+            **kwargs: Opcje tk.Listbox
+        """
+        kwargs.setdefault("selectmode", tk.EXTENDED)
+        kwargs["exportselection"] = False
+        self._yscroll = kwargs.pop("yscrollcommand", None)
+        super().__init__(parent, **kwargs)
+        self.source = source
+        self.text = text or (lambda dane, i: str(dane[i]))
+        self.top = 0  # Indeks pierwszego widocznego wiersza
+        self.rows = int(kwargs.get("height", 10))  # Liczba widocznych wierszy
+        self._zaznaczone = set()
+        self._kotwica = None  # Początek zaznaczenia z Shift
+        self._aktywny = None  # Ostatnio wybrany wiersz (klawiatura)
+
+        self.bind("<Configure>", self._zmiana_rozmiaru)
+        self.bind("<Button-1>", lambda e: self._klik(e, "pojedynczo"))
+        self.bind("<Shift-Button-1>", lambda e: self._klik(e, "zakres"))
+        self.bind("<Control-Button-1>", lambda e: self._klik(e, "przelacz"))
+        self.bind("<B1-Motion>", lambda e: self._klik(e, "zakres"))
+        self.bind("<Up>", lambda e: self._klawisz(-1, e))
+        self.bind("<Down>", lambda e: self._klawisz(1, e))
+        self.bind("<Prior>", lambda e: self._klawisz(-self.rows, e))
+        self.bind("<Next>", lambda e: self._klawisz(self.rows, e))
+        self.bind("<Home>", lambda e: self._klawisz(-len(self.source()), e))
+        self.bind("<End>", lambda e: self._klawisz(len(self.source()), e))
+        self.bind("<Control-a>", self._zaznacz_wszystko)
+        self.bind("<MouseWheel>", self._kolko)
+        self.bind("<Button-4>", lambda e: self._przewin(-3))
+        self.bind("<Button-5>", lambda e: self._przewin(3))
+
+    # --- API zgodne z tk.Listbox (indeksy całej sekwencji) ---
+    def configure(self, cnf=None, **kwargs):
+        if "yscrollcommand" in kwargs:
+            self._yscroll = kwargs.pop("yscrollcommand")
+            self._aktualizuj_scrollbar()
+        return super().configure(cnf, **kwargs)
+
+    config = configure
+
+    def size(self):
+        return len(self.source())
+
+    def insert(self, index, *elements):
+        """Dane pochodzą ze źródła - wstawienie tylko odświeża widok."""
+        self.refresh()
+
+    def delete(self, first, last=None):
+        """Dane pochodzą ze źródła - usunięcie czyści zaznaczenie i odświeża widok."""
+        self.selection_clear(0, tk.END)
+
+    def get(self, first, last=None):
+        dane = self.source()
+        if last is None:
+            return self.text(dane, self._indeks(first))
+        return tuple(
+            self.text(dane, i) for i in self._zakres(first, last) if i < len(dane)
+        )
+
+    def curselection(self):
+        return tuple(sorted(self._zaznaczone))
+
+    def selection_set(self, first, last=None):
+        self._zaznaczone.update(self._zakres(first, last))
+        self.refresh()
+
+    def selection_clear(self, first, last=None):
+        self._zaznaczone.difference_update(self._zakres(first, last))
+        self.refresh()
+
+    def selection_includes(self, index):
+        return self._indeks(index) in self._zaznaczone
+
+    def see(self, index):
+        index = self._indeks(index)
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+        self.refresh()
+
+    def yview(self, *args):
+        """Obsługa scrollbara: moveto (ułamek) i scroll (jednostki/strony)."""
+        n = len(self.source())
+        if not args:
+            if not n:
+                return 0.0, 1.0
+            return self.top / n, min(1.0, (self.top + self.rows) / n)
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            krok = int(args[1]) * (self.rows if args[2] == "pages" else 1)
+            self.top += krok
+        self.refresh()
+        return None
+
+    # --- Renderowanie ---
+    def refresh(self):
+        """Odświeża widoczne wiersze, zaznaczenie i scrollbar."""
+        dane = self.source()
+        n = len(dane)
+        self._zaznaczone = {i for i in self._zaznaczone if i < n}
+        self.top = max(0, min(self.top, n - self.rows))
+        koniec = min(n, self.top + self.rows + 1)
+        tk.Listbox.delete(self, 0, tk.END)
+        if koniec > self.top:
+            tk.Listbox.insert(
+                self, 0, *[self.text(dane, i) for i in range(self.top, koniec)]
+            )
+        for i in self._zaznaczone:
+            if self.top <= i < koniec:
+                tk.Listbox.selection_set(self, i - self.top)
+        self._aktualizuj_scrollbar()
+
+    def _aktualizuj_scrollbar(self):
+        if self._yscroll is not None:
+            self._yscroll(*self.yview())
+
+    def _indeks(self, index):
+        if index == tk.END:
+            return max(0, len(self.source()) - 1)
+        return int(index)
+
+    def _zakres(self, first, last):
+        pierwszy = self._indeks(first)
+        ostatni = pierwszy if last is None else self._indeks(last)
+        return range(min(pierwszy, ostatni), max(pierwszy, ostatni) + 1)
+
+    # --- Obsługa myszy i klawiatury ---
+    def _zmiana_rozmiaru(self, event):
+        linia = self.tk.call("font", "metrics", self.cget("font"), "-linespace")
+        wysokosc_wiersza = max(1, int(linia) + 1)
+        self.rows = max(1, event.height // wysokosc_wiersza)
+        self.refresh()
+
+    def _wybierz(self, index, tryb):
+        n = len(self.source())
+        if not n:
+            return
+        index = max(0, min(index, n - 1))
+        if tryb == "zakres" and self._kotwica is not None:
+            self._zaznaczone = set(self._zakres(self._kotwica, index))
+        elif tryb == "przelacz":
+            self._zaznaczone ^= {index}
+            self._kotwica = index
+        else:
+            self._zaznaczone = {index}
+            self._kotwica = index
+        self._aktywny = index
+        self.see(index)
+        self.event_generate("<<ListboxSelect>>")
+
+    def _klik(self, event, tryb):
+        self.focus_set()
+        if len(self.source()):
+            self._wybierz(self.top + self.nearest(event.y), tryb)
+        return "break"
+
+    def _klawisz(self, krok, event):
+        tryb = "zakres" if event.state & 0x0001 else "pojedynczo"  # Shift
+        start = self._aktywny if self._aktywny is not None else self.top - 1
+        self._wybierz(start + krok, tryb)
+        return "break"
+
+    def _zaznacz_wszystko(self, _event):
+        self._zaznaczone = set(range(len(self.source())))
+        self.refresh()
+        self.event_generate("<<ListboxSelect>>")
+        return "break"
+
+    def _kolko(self, event):
+        # Windows: wielokrotności 120; macOS: małe wartości
+        krok = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        return self._przewin(krok * 3 if krok else 0)
+
+    def _przewin(self, krok):
+        self.top += krok
+        self.refresh()
+        return "break"
+
+
 # =========================================
 # Klasa główna aplikacji: ImageFlow
 # =========================================
@@ -476,8 +811,8 @@ class ImageFlow:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-        # Lista plików do konwersji
-        self.pliki_do_konwersji = []
+        # Kolejka plików do konwersji (indeksy duplikatów: ścieżka, nazwa, zawartość)
+        self._pliki = FileQueue()
 
         # Ustaw domyślny folder zapisu w zależności od systemu
         self.folder_docelowy = self.pobierz_domyslny_folder()
@@ -486,6 +821,17 @@ class ImageFlow:
         self.miniatura = None  # Inicjalizacja atrybutu miniatury
         self.loading_spinner = None  # Spinner dla animacji
         self.callback_po_konwersji = None  # Callback po zakończeniu konwersji
+        # Zdarzenia od wątku konwersji - obsługiwane wyłącznie w pętli Tk
+        self.kolejka_zdarzen = queue.Queue()
+        # Podglądy wczytywane w tle z pamięcią podręczną (na dysku poza testami)
+        self.podglady = PreviewLoader(
+            (200, 200),
+            disk_cache=None if testing_mode else DiskPreviewCache(default_cache_dir()),
+        )
+        self._odbior_podgladu = None
+        # Przeglądanie folderu w tle: paczki ścieżek dla listy plików
+        self.kolejka_skanowania = queue.Queue()
+        self.skanowanie = None
 
         # Najpierw utwórz interfejs, potem loguj
         self.utworz_interfejs()
@@ -496,6 +842,21 @@ class ImageFlow:
         self.log(f"System: {SYSTEM_OS}")
         self.log(f"Domyślny folder zapisu: {self.folder_docelowy}")
 
+    @property
+    def pliki_do_konwersji(self):
+        """Pliki oczekujące na konwersję (FileQueue - zachowuje się jak lista)"""
+        return self._pliki
+
+    @pliki_do_konwersji.setter
+    def pliki_do_konwersji(self, pliki):
+        self._pliki = FileQueue(
+            pliki,
+            dedup_content=self._pliki.dedup_content,
+            unique_names=self._pliki.unique_names,
+        )
+        if hasattr(self, "lista_plikow"):
+            self.lista_plikow.selection_clear(0, tk.END)
+
     # =========================================
     # Konfiguracja specyficzna dla systemu operacyjnego
     # =========================================
@@ -597,7 +958,7 @@ class ImageFlow:
         # Ramka górna z przyciskami
         top_frame = ttk.Frame(main_frame)
         top_frame.grid(row=0, column=0, columnspan=5, sticky="ew", pady=(0, 5))
-        top_frame.columnconfigure(0, weight=1)
+        top_frame.columnconfigure(1, weight=1)
 
         # Przycisk wybierania plików
         select_btn = ttk.Button(
@@ -610,6 +971,17 @@ class ImageFlow:
             self.theme_manager,
         )
 
+        # Przycisk dodawania całego folderu (z podfolderami)
+        self.folder_btn = ttk.Button(
+            top_frame, text="Dodaj folder", command=self.wybierz_folder_zrodlowy
+        )
+        self.folder_btn.grid(row=0, column=1, sticky=tk.W, padx=(5, 0))
+        ToolTip(
+            self.folder_btn,
+            "Dodaj wszystkie obsługiwane pliki z folderu i jego podfolderów",
+            self.theme_manager,
+        )
+
         # Przycisk zmiany motywu
         self.theme_btn = ttk.Button(
             top_frame,
@@ -617,7 +989,7 @@ class ImageFlow:
             command=self.toggle_theme_with_animation,
             width=3,
         )
-        self.theme_btn.grid(row=0, column=1, sticky=tk.E, padx=(10, 0))
+        self.theme_btn.grid(row=0, column=2, sticky=tk.E, padx=(10, 0))
         ToolTip(
             self.theme_btn,
             "Przełącz między jasnym a ciemnym motywem",
@@ -630,8 +1002,14 @@ class ImageFlow:
         pliki_podglad_frame.columnconfigure(1, weight=1)
         pliki_podglad_frame.rowconfigure(0, weight=1)
         # Lista plików (lewa połowa, cała wysokość)
-        self.lista_plikow = tk.Listbox(
-            pliki_podglad_frame, width=35, height=16, selectmode=tk.EXTENDED
+        # Lista plików jest wirtualizowana - renderuje tylko widoczne wiersze
+        self.lista_plikow = VirtualListView(
+            pliki_podglad_frame,
+            lambda: self.pliki_do_konwersji,
+            text=lambda pliki, i: pliki.name(i),
+            width=35,
+            height=16,
+            selectmode=tk.EXTENDED,
         )
         self.lista_plikow.grid(row=0, column=0, sticky="nsew", padx=(0, 5))
         self.lista_plikow.bind("<<ListboxSelect>>", self.pokaz_info_plik)
@@ -741,6 +1119,189 @@ class ImageFlow:
         )
         jakosc_scale.grid(row=0, column=4, sticky="ew")
 
+        # Liczba równoległych zadań konwersji
+        ttk.Label(format_frame, text="Równoległe zadania:").grid(
+            row=1, column=0, sticky="w", padx=(0, 5), pady=(5, 0)
+        )
+        self.watki_var = tk.IntVar(value=os.cpu_count() or 1)
+        watki_box = ttk.Spinbox(
+            format_frame,
+            from_=1,
+            to=max(64, os.cpu_count() or 1),
+            textvariable=self.watki_var,
+            width=6,
+        )
+        watki_box.grid(row=1, column=1, sticky="w", pady=(5, 0))
+        ToolTip(
+            watki_box,
+            "Liczba plików konwertowanych jednocześnie (1 = po kolei)",
+            self.theme_manager,
+        )
+
+        # Polityka dla istniejących plików docelowych - wybierana raz dla partii
+        ttk.Label(format_frame, text="Istniejące pliki:").grid(
+            row=2, column=0, sticky="w", padx=(0, 5), pady=(5, 0)
+        )
+        self.konflikty_var = tk.StringVar(value="Nadpisz")
+        konflikty_box = ttk.Combobox(
+            format_frame,
+            textvariable=self.konflikty_var,
+            values=list(POLITYKI_KONFLIKTOW),
+            state="readonly",
+            width=12,
+        )
+        konflikty_box.grid(row=2, column=1, sticky="w", pady=(5, 0))
+        ToolTip(
+            konflikty_box,
+            "Co zrobić, gdy plik docelowy już istnieje\n"
+            "(Pomiń nowsze - pomija, gdy plik docelowy jest nowszy od źródła)",
+            self.theme_manager,
+        )
+
+        # Układ plików wynikowych
+        ttk.Label(format_frame, text="Układ plików:").grid(
+            row=3, column=0, sticky="w", padx=(0, 5), pady=(5, 0)
+        )
+        self.uklad_var = tk.StringVar(value="Jeden folder")
+        uklad_box = ttk.Combobox(
+            format_frame,
+            textvariable=self.uklad_var,
+            values=list(UKLADY_WYJSCIA),
+            state="readonly",
+            width=22,
+        )
+        uklad_box.grid(row=3, column=1, columnspan=2, sticky="w", pady=(5, 0))
+        uklad_box.bind("<<ComboboxSelected>>", lambda e: self.zmien_uklad())
+        ToolTip(
+            uklad_box,
+            "Jak foldery źródłowe - odtwarza podfoldery względem wspólnego folderu\n"
+            "Podfoldery - rozkłada pliki do folderów ab/cd/ (miliony plików)\n"
+            "W obu układach można dodać pliki o tej samej nazwie z różnych folderów",
+            self.theme_manager,
+        )
+
+        # Kolejność wykonania partii
+        ttk.Label(format_frame, text="Kolejność:").grid(
+            row=4, column=0, sticky="w", padx=(0, 5), pady=(5, 0)
+        )
+        self.kolejnosc_var = tk.StringVar(value="Jak na liście")
+        kolejnosc_box = ttk.Combobox(
+            format_frame,
+            textvariable=self.kolejnosc_var,
+            values=list(KOLEJNOSCI_WYKONANIA),
+            state="readonly",
+            width=22,
+        )
+        kolejnosc_box.grid(row=4, column=1, columnspan=2, sticky="w", pady=(5, 0))
+        ToolTip(
+            kolejnosc_box,
+            "Największe najpierw - duże pliki nie zostają na koniec partii\n"
+            "Według położenia na dysku - szybszy odczyt z dysków HDD i NFS",
+            self.theme_manager,
+        )
+
+        # Profil kodera: szybkość zapisu kontra rozmiar plików
+        ttk.Label(format_frame, text="Profil kodera:").grid(
+            row=4, column=3, sticky="e", padx=(10, 5), pady=(5, 0)
+        )
+        self.profil_var = tk.StringVar(value="Zrównoważony")
+        profil_box = ttk.Combobox(
+            format_frame,
+            textvariable=self.profil_var,
+            values=list(PROFILE_KODERA),
+            state="readonly",
+            width=22,
+        )
+        profil_box.grid(row=4, column=4, sticky="w", pady=(5, 0))
+        ToolTip(
+            profil_box,
+            "Parametry zapisu każdego formatu (kompresja, podpróbkowanie JPEG,\n"
+            "metoda WEBP); archiwalny zapisuje PNG, WEBP i TIFF bezstratnie",
+            self.theme_manager,
+        )
+
+        # Limit rozmiaru pliku wynikowego (JPEG, WEBP); 0 - bez limitu
+        ttk.Label(format_frame, text="Maks. rozmiar (KB):").grid(
+            row=5, column=0, sticky="w", padx=(0, 5), pady=(5, 0)
+        )
+        self.maks_rozmiar_var = tk.IntVar(value=0)
+        maks_rozmiar_box = ttk.Spinbox(
+            format_frame,
+            from_=0,
+            to=100_000,
+            increment=50,
+            textvariable=self.maks_rozmiar_var,
+            width=8,
+        )
+        maks_rozmiar_box.grid(row=5, column=1, sticky="w", pady=(5, 0))
+        ToolTip(
+            maks_rozmiar_box,
+            "JPEG i WEBP: najwyższa jakość (do wartości suwaka), przy której\n"
+            "plik mieści się w limicie; 0 - bez limitu",
+            self.theme_manager,
+        )
+
+        # Pliki już w formacie docelowym kopiowane bez ponownego kodowania
+        self.przepuszczaj_var = tk.BooleanVar(value=False)
+        przepuszczaj_chk = ttk.Checkbutton(
+            format_frame,
+            text="Kopiuj pliki już w formacie docelowym",
+            variable=self.przepuszczaj_var,
+        )
+        przepuszczaj_chk.grid(row=5, column=3, columnspan=2, sticky="w", pady=(5, 0))
+        ToolTip(
+            przepuszczaj_chk,
+            "Pliki w wybranym formacie (np. JPEG -> JPEG) są kopiowane bez\n"
+            "dekodowania i utraty jakości - tylko przy jakości 100, profilu\n"
+            "Zrównoważony i bez limitu rozmiaru pliku",
+            self.theme_manager,
+        )
+
+        # Tryb przyrostowy: pomijaj pliki niezmienione od poprzedniej konwersji
+        self.przyrostowo_var = tk.BooleanVar(value=False)
+        przyrostowo_chk = ttk.Checkbutton(
+            format_frame,
+            text="Tylko nowe i zmienione pliki",
+            variable=self.przyrostowo_var,
+        )
+        przyrostowo_chk.grid(row=2, column=3, columnspan=2, sticky="w", pady=(5, 0))
+        ToolTip(
+            przyrostowo_chk,
+            "Pomija pliki, które zostały już skonwertowane z tymi samymi\n"
+            "ustawieniami (manifest w folderze docelowym)",
+            self.theme_manager,
+        )
+
+        # Pomijanie plików o identycznej zawartości przy dodawaniu
+        self.duplikaty_var = tk.BooleanVar(value=False)
+        duplikaty_chk = ttk.Checkbutton(
+            format_frame,
+            text="Pomijaj identyczne pliki",
+            variable=self.duplikaty_var,
+            command=self.zmien_wykrywanie_duplikatow,
+        )
+        duplikaty_chk.grid(row=3, column=3, columnspan=2, sticky="w", pady=(5, 0))
+        ToolTip(
+            duplikaty_chk,
+            "Przy dodawaniu pomija pliki o tej samej zawartości co pliki na liście\n"
+            "(np. te same zdjęcia z kilku urządzeń)",
+            self.theme_manager,
+        )
+
+        # Tryb logowania: tylko podsumowanie zamiast komunikatu per plik
+        self.tylko_podsumowanie_var = tk.BooleanVar(value=False)
+        podsumowanie_chk = ttk.Checkbutton(
+            format_frame,
+            text="Loguj tylko podsumowanie",
+            variable=self.tylko_podsumowanie_var,
+        )
+        podsumowanie_chk.grid(row=1, column=3, columnspan=2, sticky="w", pady=(5, 0))
+        ToolTip(
+            podsumowanie_chk,
+            f"Pomija komunikaty o pojedynczych plikach (zawsze przy >{LOG_SUMMARY_THRESHOLD} plikach)",
+            self.theme_manager,
+        )
+
         # Pasek postępu
         self.pasek_postepu = ttk.Progressbar(
             main_frame, orient="horizontal", length=300, mode="determinate"
@@ -752,6 +1313,7 @@ class ImageFlow:
 
         # Zarejestruj pole tekstowe do aktualizacji motywu
         self.theme_manager.register_widget(self.pole_logow, "text")
+        self.log_sink = LogSink(self.pole_logow, self.logger)
         # Scrollbar dla logów
         scrollbar = ttk.Scrollbar(
             main_frame, orient="vertical", command=self.pole_logow.yview
@@ -828,23 +1390,57 @@ class ImageFlow:
         """
         idxs = self.lista_plikow.curselection()
         if not idxs:
+            self.podglady.cancel()
             self.info_label.config(text="Szczegóły pliku:")
             self.miniatura_canvas.delete("all")
             return
         idx = idxs[0]
         plik = self.pliki_do_konwersji[idx]
-        try:
-            with Image.open(plik) as img:
-                info = f"Nazwa: {os.path.basename(plik)}\nFormat: {img.format}\nRozdzielczość: {img.size[0]}x{img.size[1]} px\nRozmiar: {os.path.getsize(plik) // 1024} KB"
-                self.info_label.config(text=info)
-                # Miniatura
-                img.thumbnail((200, 200))
-                self.miniatura = ImageTk.PhotoImage(img)
-                self.miniatura_canvas.delete("all")
-                self.miniatura_canvas.create_image(100, 112, image=self.miniatura)
-        except (OSError, IOError) as e:
-            self.info_label.config(text=f"Błąd odczytu: {e}")
+        # Podgląd z pamięci podręcznej od razu, pozostałe dekodowane w tle
+        podglad = self.podglady.request(plik)
+        if podglad is not None:
+            self.pokaz_podglad(plik, podglad)
+            return
+        self.info_label.config(
+            text=f"Nazwa: {os.path.basename(plik)}\nWczytywanie podglądu..."
+        )
+        if self._odbior_podgladu is None:
+            self._odbior_podgladu = self.root.after(UI_FRAME_MS, self.odbierz_podglad)
+
+    def odbierz_podglad(self):
+        """
+        Odbiera w pętli Tk wynik wczytywania podglądu w tle (nieaktualne
+        wyniki są pomijane) i planuje kolejne sprawdzenie, dopóki trwa
+        wczytywanie.
+        """
+        self._odbior_podgladu = None
+        # Najpierw stan, potem wynik - wynik jest w kolejce, zanim pending zgaśnie
+        trwa = self.podglady.pending
+        wynik = self.podglady.poll()
+        if wynik is not None:
+            plik, podglad, blad = wynik
+            self.pokaz_podglad(plik, podglad, blad)
+        if trwa:
+            self._odbior_podgladu = self.root.after(UI_FRAME_MS, self.odbierz_podglad)
+
+    def pokaz_podglad(self, plik, podglad, blad=None):
+        """
+        Wyświetla szczegóły pliku i miniaturę z gotowego podglądu.
+
+        Args:
+            plik (str): Ścieżka pliku
+            podglad (Preview): Podgląd pliku lub None przy błędzie
+            blad (Exception): Błąd odczytu (opcjonalnie)
+        """
+        if podglad is None:
+            self.info_label.config(text=f"Błąd odczytu: {blad}")
             self.miniatura_canvas.delete("all")
+            return
+        info = f"Nazwa: {os.path.basename(plik)}\nFormat: {podglad.format}\nRozdzielczość: {podglad.size[0]}x{podglad.size[1]} px\nRozmiar: {podglad.file_size // 1024} KB"
+        self.info_label.config(text=info)
+        self.miniatura = ImageTk.PhotoImage(podglad.image)
+        self.miniatura_canvas.delete("all")
+        self.miniatura_canvas.create_image(100, 112, image=self.miniatura)
 
     # =========================================
     # Obsługa zamykania aplikacji na macOS
@@ -854,6 +1450,7 @@ class ImageFlow:
         Obsługa zamykania aplikacji na macOS.
         Wywoływana przez system macOS przy zamykaniu aplikacji.
         """
+        self.podglady.close()
         self.root.quit()
 
     # =========================================
@@ -897,7 +1494,11 @@ class ImageFlow:
                 title="Wybierz pliki do konwersji", filetypes=filetypes
             )
             if pliki:  # Sprawdź czy użytkownik wybrał jakieś pliki
-                self.dodaj_pliki(pliki)
+                if self._pliki.dedup_content:
+                    # Rozmiary i skróty liczone w tle - dodanie nie blokuje okna
+                    self.przygotuj_w_tle(pliki, lambda: self.dodaj_pliki(pliki))
+                else:
+                    self.dodaj_pliki(pliki)
         except (OSError, IOError) as e:
             self.log(f"Błąd podczas wyboru plików: {e}")
             messagebox.showerror(
@@ -907,27 +1508,190 @@ class ImageFlow:
     # =========================================
     # Dodawanie plików do listy
     # =========================================
-    def dodaj_pliki(self, pliki):
+    def dodaj_pliki(self, pliki, sprawdz_istnienie=True, szczegoly=True):
         """
         Dodaje wybrane pliki do listy plików do konwersji.
         Filtruje duplikaty, nieobsługiwane formaty i sprawdza czy pliki istnieją.
+        Duplikaty wykrywają indeksy kolejki (FileQueue) w czasie O(1);
+        lista (wirtualizowana) odświeża tylko widoczne wiersze. Przy pomijaniu
+        identycznych plików rozmiary i skróty powinny być policzone wcześniej
+        w tle (przygotuj_w_tle, skanuj_folder) - inaczej czyta je ta metoda.
 
         Args:
             pliki (list): Lista ścieżek do plików do dodania
+            sprawdz_istnienie (bool): Sprawdzaj os.path.isfile (zbędne dla
+                ścieżek z przeglądania folderu)
+            szczegoly (bool): Loguj każdy dodany plik
+
+        Returns:
+            int: Liczba dodanych plików
         """
-        obslugiwane = (".heic", ".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".gif")
+        dodane = 0
+        identyczne = 0
         for plik in pliki:
-            if not os.path.isfile(plik):
+            powod = self._pliki.add(plik, check_exists=sprawdz_istnienie)
+            if powod == REJECT_CONTENT:
+                identyczne += 1
+                if szczegoly:
+                    self.log(f"Pominięto identyczny plik: {plik}", szczegol=True)
+            if powod is not None:
                 continue
-            ext = os.path.splitext(plik)[1].lower()
-            if ext in obslugiwane and plik not in self.pliki_do_konwersji:
-                # Filtrowanie duplikatów po nazwie
-                nazwa = os.path.basename(plik)
-                if any(os.path.basename(p) == nazwa for p in self.pliki_do_konwersji):
-                    continue
-                self.pliki_do_konwersji.append(plik)
-                self.lista_plikow.insert(tk.END, nazwa)
-                self.log(f"Dodano plik: {plik}")
+            dodane += 1
+            if szczegoly:
+                self.log(f"Dodano plik: {plik}", szczegol=True)
+        if identyczne and not szczegoly:
+            self.log(f"Pominięto identyczne pliki: {identyczne}")
+        if dodane:
+            self.lista_plikow.refresh()
+        return dodane
+
+    def zmien_wykrywanie_duplikatow(self):
+        """
+        Włącza lub wyłącza pomijanie plików o identycznej zawartości. Przy
+        włączaniu rozmiary plików z listy są odczytywane w tle.
+        """
+        if self.duplikaty_var.get() and not self._pliki.dedup_content:
+            self.przygotuj_w_tle(list(self._pliki), self.zastosuj_wykrywanie_duplikatow)
+        else:
+            self.zastosuj_wykrywanie_duplikatow()
+
+    def zastosuj_wykrywanie_duplikatow(self):
+        """Ustawia pomijanie identycznych plików według przełącznika."""
+        self._pliki.dedup_content = self.duplikaty_var.get()
+
+    def przygotuj_w_tle(self, pliki, po_przygotowaniu):
+        """
+        Liczy w wątku w tle rozmiary i skróty plików potrzebne do pomijania
+        identycznej zawartości (FileQueue.prepare), a następnie wywołuje
+        po_przygotowaniu w pętli Tk - pętla interfejsu nie czyta plików.
+
+        Args:
+            pliki (list): Ścieżki plików
+            po_przygotowaniu (callable): Funkcja bez argumentów
+        """
+        kolejka = self._pliki
+        gotowe = threading.Event()
+
+        def przygotuj():
+            try:
+                kolejka.prepare(pliki)
+            finally:
+                gotowe.set()
+
+        def sprawdz():
+            if not gotowe.is_set():
+                self.root.after(UI_FRAME_MS, sprawdz)
+                return
+            po_przygotowaniu()
+
+        threading.Thread(target=przygotuj, daemon=True).start()
+        self.root.after(UI_FRAME_MS, sprawdz)
+
+    def zmien_uklad(self):
+        """
+        Po zmianie układu plików wynikowych ustala, czy lista odrzuca pliki
+        o tej samej nazwie - tylko układ "Jeden folder" zapisuje je pod tą
+        samą ścieżką docelową.
+        """
+        uklad = UKLADY_WYJSCIA[self.uklad_var.get()]
+        self._pliki.unique_names = uklad == "flat"
+
+    # =========================================
+    # Dodawanie całego folderu
+    # =========================================
+    def wybierz_folder_zrodlowy(self):
+        """
+        Otwiera okno dialogowe wyboru folderu, z którego (wraz
+        z podfolderami) zostaną dodane wszystkie obsługiwane pliki.
+        """
+        try:
+            folder = filedialog.askdirectory(title="Wybierz folder z plikami")
+            if folder:
+                self.dodaj_folder(os.path.normpath(folder))
+        except (OSError, IOError) as e:
+            self.log(f"Błąd podczas wyboru folderu: {e}")
+            messagebox.showerror(
+                "Błąd", f"Nie można otworzyć dialogu wyboru folderu: {e}"
+            )
+
+    def dodaj_folder(self, folder):
+        """
+        Przegląda folder w wątku w tle; znalezione pliki trafiają do listy
+        paczkami (odbierz_skanowanie w pętli Tk), więc interfejs nie zamiera
+        nawet dla setek tysięcy plików.
+
+        Args:
+            folder (str): Folder do przejrzenia (z podfolderami)
+        """
+        if self.skanowanie is not None:
+            self.log("Przeglądanie folderu już trwa", logging.WARNING)
+            return
+        self.skanowanie = {"folder": folder, "znalezione": 0, "dodane": 0}
+        self.folder_btn.config(state=tk.DISABLED)
+        self.log(f"Przeglądanie folderu: {folder}")
+        threading.Thread(
+            target=self.skanuj_folder, args=(folder, self._pliki), daemon=True
+        ).start()
+        self.root.after(UI_FRAME_MS, self.odbierz_skanowanie)
+
+    def skanuj_folder(self, folder, kolejka=None):
+        """
+        Wątek roboczy przeglądania folderu - przekazuje ścieżki paczkami
+        po SCAN_CHUNK przez kolejkę; None oznacza koniec. Przy pomijaniu
+        identycznych plików rozmiary i skróty paczki są liczone tutaj
+        (FileQueue.prepare), a nie w pętli Tk.
+
+        Args:
+            folder (str): Folder do przejrzenia
+            kolejka (FileQueue): Kolejka, do której trafią pliki
+        """
+
+        def wyslij(paczka):
+            if kolejka is not None and kolejka.dedup_content:
+                kolejka.prepare(paczka)
+            self.kolejka_skanowania.put(paczka)
+
+        paczka = []
+        try:
+            for sciezka in scan_folder(folder):
+                paczka.append(sciezka)
+                if len(paczka) >= SCAN_CHUNK:
+                    wyslij(paczka)
+                    paczka = []
+        finally:
+            if paczka:
+                wyslij(paczka)
+            self.kolejka_skanowania.put(None)
+
+    def odbierz_skanowanie(self):
+        """
+        Dodaje do listy paczki znalezione od ostatniej klatki i pokazuje
+        postęp przeglądania w tytule okna.
+        """
+        koniec = False
+        while True:
+            try:
+                paczka = self.kolejka_skanowania.get_nowait()
+            except queue.Empty:
+                break
+            if paczka is None:
+                koniec = True
+                break
+            self.skanowanie["znalezione"] += len(paczka)
+            self.skanowanie["dodane"] += self.dodaj_pliki(
+                paczka, sprawdz_istnienie=False, szczegoly=False
+            )
+        if not koniec:
+            self.root.title(f"Wyszukiwanie plików: {self.skanowanie['znalezione']}")
+            self.root.after(UI_FRAME_MS, self.odbierz_skanowanie)
+            return
+        self.root.title("ImageFlow")
+        self.log(
+            f"Dodano {self.skanowanie['dodane']} z {self.skanowanie['znalezione']} "
+            f"plików z folderu {self.skanowanie['folder']}"
+        )
+        self.skanowanie = None
+        self.folder_btn.config(state=tk.NORMAL)
 
     # =========================================
     # Usuwanie plików z listy
@@ -937,13 +1701,10 @@ class ImageFlow:
         Usuwa zaznaczone pliki z listy plików do konwersji.
         Obsługuje zaznaczenie wielu plików jednocześnie.
         """
-        zaznaczone = list(self.lista_plikow.curselection())
-        zaznaczone.reverse()
-        for idx in zaznaczone:
-            plik = self.pliki_do_konwersji[idx]
-            self.log(f"Usunięto plik: {plik}")
-            del self.pliki_do_konwersji[idx]
-            self.lista_plikow.delete(idx)
+        usuniete = self._pliki.remove_indices(self.lista_plikow.curselection())
+        for plik in usuniete:
+            self.log(f"Usunięto plik: {plik}", szczegol=True)
+        self.lista_plikow.selection_clear(0, tk.END)
 
     # =========================================
     # Wybór folderu docelowego
@@ -994,17 +1755,19 @@ class ImageFlow:
     # =========================================
     # Logowanie komunikatów do pola tekstowego i loggera
     # =========================================
-    def log(self, message):
+    def log(self, message, level=logging.INFO, szczegol=False):
         """
         Dodaje komunikat do pola logów oraz do loggera.
-        Automatycznie przewija do najnowszej wiadomości.
+        Komunikaty są buforowane i zapisywane do pola paczkami (LogSink),
+        pole przechowuje tylko ostatnie LOG_CAPACITY linii.
 
         Args:
             message (str): Wiadomość do zalogowania
+            level (int): Poziom logowania
+            szczegol (bool): Komunikat szczegółowy (per plik), pomijany
+                w trybie "tylko podsumowanie"
         """
-        self.pole_logow.insert(tk.END, f"{message}\n")
-        self.pole_logow.see(tk.END)
-        self.logger.info(message)
+        self.log_sink.write(message, level, detail=szczegol)
 
     # =========================================
     # Anulowanie konwersji
@@ -1029,7 +1792,8 @@ class ImageFlow:
         if not hasattr(self, "folder_docelowy"):
             messagebox.showerror("Błąd", "Wybierz folder docelowy!")
             return
-        if not self.pliki_do_konwersji:
+        przerwane = self.znajdz_przerwane_zadanie()
+        if not self.pliki_do_konwersji and przerwane is None:
             messagebox.showerror("Błąd", "Dodaj pliki do konwersji!")
             return
         # Sprawdź uprawnienia do zapisu
@@ -1041,97 +1805,243 @@ class ImageFlow:
             )
             return
 
+        wznow = przerwane is not None and messagebox.askyesno(
+            "Przerwana konwersja",
+            f"W folderze docelowym znaleziono przerwaną konwersję "
+            f"({len(przerwane.remaining())} z {len(przerwane.paths)} plików "
+            "pozostało). Czy chcesz ją wznowić?",
+        )
+        if wznow:
+            opcje = przerwane.options
+            pliki = przerwane.remaining()
+            self.log(f"Wznawianie konwersji: pozostało {len(pliki)} plików")
+        elif self.pliki_do_konwersji:
+            opcje = self.utworz_opcje_konwersji()
+            pliki = list(self.pliki_do_konwersji)
+        else:
+            return
+
         self.konwertuj_btn.config(state=tk.DISABLED)
         self.anuluj_btn.config(state=tk.NORMAL)
         self.anuluj_konwersje = False
-        self.root.title(f"Konwersja: 0/{len(self.pliki_do_konwersji)}")
-        thread = threading.Thread(target=self.konwertuj_pliki)
+        # Przy dużych partiach loguj tylko podsumowanie i błędy
+        self.log_sink.set_summary_only(
+            self.tylko_podsumowanie_var.get() or len(pliki) > LOG_SUMMARY_THRESHOLD
+        )
+        self.root.title(f"Konwersja: 0/{len(pliki)}")
+        thread = threading.Thread(
+            target=self.konwertuj_pliki,
+            args=(opcje, pliki, self.sciezka_dziennika(), wznow),
+        )
         thread.daemon = True
         thread.start()
+        self.root.after(UI_FRAME_MS, self.przetworz_zdarzenia)
+
+    # =========================================
+    # Dziennik zadania (wznawianie po awarii)
+    # =========================================
+    def sciezka_dziennika(self):
+        """
+        Zwraca ścieżkę dziennika zadania w folderze docelowym.
+
+        Returns:
+            str: Ścieżka pliku dziennika
+        """
+        return os.path.join(self.folder_docelowy, JOURNAL_NAME)
+
+    def znajdz_przerwane_zadanie(self):
+        """
+        Sprawdza, czy w folderze docelowym jest dziennik niedokończonego
+        zadania (np. po awarii lub anulowaniu).
+
+        Returns:
+            JobState: Stan przerwanego zadania albo None
+        """
+        sciezka = self.sciezka_dziennika()
+        if not os.path.exists(sciezka):
+            return None
+        try:
+            stan = load_job(sciezka)
+        except (OSError, ValueError) as e:
+            self.log(f"Nie można odczytać dziennika zadania: {e}", logging.WARNING)
+            return None
+        if stan.finished or not stan.remaining():
+            return None
+        return stan
 
     # =========================================
     # Główna logika konwersji plików
     # =========================================
-    def konwertuj_pliki(self):
+    def utworz_opcje_konwersji(self):
         """
-        Przetwarza i konwertuje pliki graficzne do wybranego formatu.
-        Obsługuje postęp konwersji, błędy, anulowanie i aktualizuje interfejs.
-        Sprawdza każdy plik pod kątem uszkodzeń przed konwersją.
-        Automatycznie dostosowuje parametry jakości dla różnych formatów.
+        Tworzy ustawienia silnika na podstawie kontrolek interfejsu.
+        Wywoływana w wątku interfejsu - wątek roboczy nie czyta zmiennych Tk.
+
+        Returns:
+            ConversionOptions: Ustawienia konwersji
+        """
+        format_wyjsciowy = self.format_var.get()
+        profil = PROFILE_KODERA[self.profil_var.get()]
+        return ConversionOptions(
+            output_dir=self.folder_docelowy,
+            format=format_wyjsciowy,
+            quality=self.jakosc_var.get(),
+            profile=profil,
+            max_output_bytes=self.pobierz_limit_rozmiaru(format_wyjsciowy, profil),
+            workers=self.pobierz_liczbe_watkow(),
+            ordered=False,
+            thumbnail_size=(200, 200),
+            conflict_policy=POLITYKI_KONFLIKTOW[self.konflikty_var.get()],
+            incremental=self.przyrostowo_var.get(),
+            layout=UKLADY_WYJSCIA[self.uklad_var.get()],
+            schedule=KOLEJNOSCI_WYKONANIA[self.kolejnosc_var.get()],
+            # Połowa pamięci fizycznej - duże skany nie wyczerpią pamięci
+            memory_budget=default_memory_budget(),
+            # Kolejne pliki czytane w tle - ukrywa opóźnienia dysków sieciowych
+            prefetch=2 * self.pobierz_liczbe_watkow(),
+            # Pliki utrwalane raz na końcu partii, nie po każdym pliku
+            output_fsync="batch",
+            passthrough="copy" if self.przepuszczaj_var.get() else "off",
+        )
+
+    def konwertuj_pliki(self, opcje=None, pliki=None, dziennik=None, wznow=False):
         """
-        total = len(self.pliki_do_konwersji)
-        self.pasek_postepu["maximum"] = total
-        self.pasek_postepu["value"] = 0
+        Przetwarza i konwertuje pliki graficzne do wybranego formatu.
+        Właściwą konwersję wykonuje silnik (engine.convert_batch) - ta metoda
+        jedynie przekazuje ustawienia z interfejsu i raportuje wyniki.
+        Działa w wątku roboczym, dlatego nie dotyka widgetów Tk - wszystkie
+        zmiany interfejsu trafiają do kolejki zdarzeń (przetworz_zdarzenia).
+
+        Args:
+            opcje (ConversionOptions): Ustawienia (domyślnie z interfejsu)
+            pliki (list): Pliki do konwersji (domyślnie pliki_do_konwersji)
+            dziennik (str): Ścieżka dziennika zadania (opcjonalnie)
+            wznow (bool): Wznów zadanie z dziennika zamiast zaczynać nowe
+        """
+        if opcje is None:
+            opcje = self.utworz_opcje_konwersji()
+        if pliki is None:
+            pliki = list(self.pliki_do_konwersji)
+        total = len(pliki)
         sukcesy = 0
         bledy = 0
-        for i, plik_zrodlowy in enumerate(self.pliki_do_konwersji):
-            if self.anuluj_konwersje:
-                break
-            try:
-                nazwa_pliku = os.path.splitext(os.path.basename(plik_zrodlowy))[0]
-                format_out = self.format_var.get()
-                ext = {
-                    "JPEG": ".jpg",
-                    "PNG": ".png",
-                    "BMP": ".bmp",
-                    "TIFF": ".tiff",
-                    "WEBP": ".webp",
-                }[format_out]
-
-                # Użyj os.path.join i normalizuj ścieżkę
-                plik_docelowy = os.path.normpath(
-                    os.path.join(self.folder_docelowy, f"{nazwa_pliku}{ext}")
+        bez_zmian = 0
+        self.wyslij_zdarzenie("postep", 0, total)
+
+        def anuluj():
+            return self.anuluj_konwersje
+
+        def raportuj_plan(plan):
+            # Konflikty z planu silnika - bez osobnego planowania w wątku Tk
+            konflikty = sum(1 for pozycja in plan if pozycja.conflict)
+            if konflikty:
+                self.wyslij_zdarzenie(
+                    "log",
+                    f"Istniejące pliki docelowe: {konflikty} "
+                    f"(polityka: {opcje.conflict_policy})",
                 )
-                if os.path.exists(plik_docelowy):
-                    if not messagebox.askyesno(
-                        "Plik istnieje",
-                        f"Plik {nazwa_pliku}{ext} już istnieje. Czy chcesz go nadpisać?",
-                    ):
-                        continue
-                self.log(f"Konwertowanie: {plik_zrodlowy}")
-                try:
-                    with Image.open(plik_zrodlowy) as img:
-                        img.thumbnail((200, 200))
-                        self.miniatura = ImageTk.PhotoImage(img)
-                        self.miniatura_canvas.delete("all")
-                        self.miniatura_canvas.create_image(
-                            100, 100, image=self.miniatura
-                        )
-                except (OSError, IOError):
-                    self.miniatura_canvas.delete("all")
-                try:
-                    with Image.open(plik_zrodlowy) as img:
-                        img.verify()
-                    with Image.open(plik_zrodlowy) as img:
-                        if format_out == "JPEG":
-                            img.save(
-                                plik_docelowy,
-                                format_out,
-                                quality=self.jakosc_var.get(),
-                                subsampling=0,
-                            )
-                        elif format_out == "PNG":
-                            img.save(plik_docelowy, format_out, compress_level=1)
-                        else:
-                            img.save(plik_docelowy, format_out)
-                except (OSError, SyntaxError) as e:
-                    self.log(
-                        f"Plik uszkodzony lub nieobsługiwany: {plik_zrodlowy}: {str(e)}"
+
+        try:
+            if wznow:
+                wyniki = resume(dziennik, cancel=anuluj, on_plan=raportuj_plan)
+            elif dziennik:
+                wyniki = run_job(
+                    pliki, opcje, dziennik, cancel=anuluj, on_plan=raportuj_plan
+                )
+            else:
+                wyniki = convert_batch(
+                    pliki, opcje, cancel=anuluj, on_plan=raportuj_plan
+                )
+            for i, wynik in enumerate(wyniki, start=1):
+                if wynik.ok:
+                    self.wyslij_zdarzenie("miniatura", wynik.thumbnail)
+                    self.wyslij_zdarzenie(
+                        "log", f"Zapisano: {wynik.target}", logging.INFO, True
+                    )
+                    sukcesy += 1
+                elif wynik.error:
+                    self.wyslij_zdarzenie(
+                        "log",
+                        f"{wynik.error} ({wynik.source})",
+                        logging.WARNING,
+                        True,
                     )
                     bledy += 1
-                    continue
-                self.log(f"Zapisano: {plik_docelowy}")
-                sukcesy += 1
-                self.pasek_postepu["value"] = i + 1
-                self.root.title(f"Konwersja: {i + 1}/{total}")
-                if (i + 1) % 5 == 0 or i == total - 1:
-                    self.root.update()
-            except (OSError, IOError, KeyError) as e:
-                self.log(f"Błąd podczas konwersji {plik_zrodlowy}: {str(e)}")
-                self.logger.error(
-                    "Błąd podczas konwersji %s: %s", plik_zrodlowy, str(e)
+                elif wynik.status == STATUS_UNCHANGED:
+                    bez_zmian += 1
+                self.wyslij_zdarzenie("postep", i, total)
+        except (OSError, ValueError, RuntimeError) as e:
+            self.wyslij_zdarzenie(
+                "log", f"Błąd podczas konwersji: {str(e)}", logging.ERROR
+            )
+            self.logger.error("Błąd podczas konwersji: %s", str(e))
+            bledy += 1
+        finally:
+            # Zawsze przywróć interfejs - także po nieoczekiwanym wyjątku silnika
+            if bez_zmian:
+                self.wyslij_zdarzenie(
+                    "log", f"Pominięto niezmienione pliki: {bez_zmian}"
                 )
-                bledy += 1
+            self.wyslij_zdarzenie("koniec", sukcesy, bledy)
+
+    # =========================================
+    # Kolejka zdarzeń: wątek roboczy -> interfejs
+    # =========================================
+    def wyslij_zdarzenie(self, rodzaj, *dane):
+        """
+        Przekazuje zdarzenie z wątku roboczego do wątku interfejsu.
+        Bezpieczne do wywołania z dowolnego wątku.
+
+        Args:
+            rodzaj (str): "log", "postep", "miniatura" lub "koniec"
+            *dane: Dane zdarzenia
+        """
+        self.kolejka_zdarzen.put((rodzaj, dane))
+
+    def przetworz_zdarzenia(self):
+        """
+        Obsługuje zdarzenia zebrane od ostatniej klatki (wywoływana przez
+        root.after w pętli Tk). Postęp, tytuł okna i miniatura są scalane -
+        nakładany jest tylko ostatni stan, więc koszt odświeżenia nie zależy
+        od liczby plików na sekundę.
+        """
+        postep = None
+        miniatura = None
+        koniec = None
+        while True:
+            try:
+                rodzaj, dane = self.kolejka_zdarzen.get_nowait()
+            except queue.Empty:
+                break
+            if rodzaj == "log":
+                self.log(*dane)
+            elif rodzaj == "postep":
+                postep = dane
+            elif rodzaj == "miniatura":
+                miniatura = dane
+            elif rodzaj == "koniec":
+                koniec = dane
+
+        if postep is not None:
+            wykonane, total = postep
+            self.pasek_postepu["maximum"] = max(total, 1)
+            self.pasek_postepu["value"] = wykonane
+            self.root.title(f"Konwersja: {wykonane}/{total}")
+        if miniatura is not None:
+            self.pokaz_miniature_konwersji(miniatura[0])
+        if koniec is not None:
+            self.zakoncz_konwersje(*koniec)
+            return
+        self.root.after(UI_FRAME_MS, self.przetworz_zdarzenia)
+
+    def zakoncz_konwersje(self, sukcesy, bledy):
+        """
+        Przywraca interfejs po zakończeniu konwersji (w wątku interfejsu).
+
+        Args:
+            sukcesy (int): Liczba poprawnie skonwertowanych plików
+            bledy (int): Liczba plików zakończonych błędem
+        """
         self.konwertuj_btn.config(state=tk.NORMAL)
         self.anuluj_btn.config(state=tk.DISABLED)
         self.root.title("ImageFlow")
@@ -1141,14 +2051,64 @@ class ImageFlow:
             self.callback_po_konwersji()
             self.callback_po_konwersji = None
 
+        if self.log_sink.suppressed:
+            self.log(f"Pominięto {self.log_sink.suppressed} komunikatów szczegółowych")
+        self.log_sink.set_summary_only(False)
+
         if self.anuluj_konwersje:
             self.log("Konwersja anulowana przez użytkownika.")
         else:
             self.log(f"Zakończono konwersję. Sukcesy: {sukcesy}, błędy: {bledy}")
             self.pasek_postepu["value"] = 0
-            self.root.update()
             self.pokaz_okno_sukcesu()
 
+    def pobierz_liczbe_watkow(self):
+        """
+        Zwraca liczbę równoległych zadań wybraną w interfejsie.
+
+        Returns:
+            int: Liczba zadań (co najmniej 1)
+        """
+        try:
+            return max(1, int(self.watki_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
+
+    def pobierz_limit_rozmiaru(self, format, profil):
+        """
+        Zwraca limit rozmiaru pliku wynikowego wybrany w interfejsie.
+
+        Args:
+            format (str): Format wyjściowy
+            profil (str): Profil kodera
+
+        Returns:
+            int: Limit w bajtach albo None (brak limitu lub format bez
+                wyszukiwania jakości, np. PNG)
+        """
+        try:
+            limit = int(self.maks_rozmiar_var.get()) * 1024
+        except (tk.TclError, ValueError):
+            return None
+        if limit <= 0 or not supports_target_size(format, profil):
+            return None
+        return limit
+
+    def pokaz_miniature_konwersji(self, miniatura):
+        """
+        Pokazuje miniaturę właśnie skonwertowanego pliku.
+        Miniatura pochodzi z silnika (ten sam zdekodowany obraz co konwersja),
+        więc plik źródłowy nie jest ponownie otwierany.
+
+        Args:
+            miniatura (PIL.Image.Image): Miniatura pliku lub None
+        """
+        self.miniatura_canvas.delete("all")
+        if miniatura is None:
+            return
+        self.miniatura = ImageTk.PhotoImage(miniatura)
+        self.miniatura_canvas.create_image(100, 100, image=self.miniatura)
+
     # =========================================
     # Okno sukcesu po zakończonej konwersji
     # =========================================
@@ -1234,7 +2194,7 @@ class ImageFlow:
         if not hasattr(self, "folder_docelowy"):
             messagebox.showerror("Błąd", "Wybierz folder docelowy!")
             return
-        if not self.pliki_do_konwersji:
+        if not self.pliki_do_konwersji and self.znajdz_przerwane_zadanie() is None:
             messagebox.showerror("Błąd", "Dodaj pliki do konwersji!")
             return
 
@@ -1276,6 +2236,10 @@ def main():
     Tworzy główne okno Tkinter i uruchamia pętlę zdarzeń.
     Używa standardowego Tk() aby uniknąć problemów z podwójnymi oknami.
     """
+    # Skany i panoramy 200-400 MP przekraczają domyślny limit Pillow; limit
+    # jest podnoszony tylko w procesie aplikacji (nie przy imporcie silnika)
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
     # Używamy zawsze standardowego Tk() aby uniknąć problemów z podwójnymi oknami
     root = tk.Tk()
     ImageFlow(root)
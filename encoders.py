@@ -0,0 +1,328 @@
+# ---
+# # ImageFlow - profile kodera
+#
+# **Nazwane profile kodowania ("fastest", "balanced", "smallest",
+# "archival") przekładane na parametry zapisu każdego formatu wyjściowego
+# oraz pomiar (kalibracja) czasu kodowania i rozmiaru plików dla profili
+# na własnych przykładowych obrazach.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import io
+import sys
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from PIL import Image
+from pillow_heif import register_heif_opener
+
+register_heif_opener()
+
+logger = logging.getLogger(__name__)
+
+# Profile kodera: od najszybszego zapisu do najmniejszego pliku; "archival"
+# zapisuje bezstratnie tam, gdzie format na to pozwala
+PROFILE_FASTEST = "fastest"
+PROFILE_BALANCED = "balanced"
+PROFILE_SMALLEST = "smallest"
+PROFILE_ARCHIVAL = "archival"
+ENCODER_PROFILES = (
+    PROFILE_FASTEST,
+    PROFILE_BALANCED,
+    PROFILE_SMALLEST,
+    PROFILE_ARCHIVAL,
+)
+DEFAULT_PROFILE = PROFILE_BALANCED
+
+# Parametry Image.save dla formatu i profilu; "quality": None oznacza jakość
+# z ustawień konwersji. Profil "balanced" dla JPEG odpowiada dotychczasowemu
+# zapisowi (bez podpróbkowania chrominancji)
+PARAMETRY_KODERA = {
+    "JPEG": {
+        PROFILE_FASTEST: {"quality": None, "subsampling": 2},
+        PROFILE_BALANCED: {"quality": None, "subsampling": 0},
+        PROFILE_SMALLEST: {
+            "quality": None,
+            "subsampling": 2,
+            "optimize": True,
+            "progressive": True,
+        },
+        PROFILE_ARCHIVAL: {"quality": None, "subsampling": 0, "optimize": True},
+    },
+    "PNG": {
+        PROFILE_FASTEST: {"compress_level": 1},
+        PROFILE_BALANCED: {"compress_level": 3},
+        PROFILE_SMALLEST: {"compress_level": 9, "optimize": True},
+        PROFILE_ARCHIVAL: {"compress_level": 9},
+    },
+    "WEBP": {
+        PROFILE_FASTEST: {"quality": None, "method": 0},
+        PROFILE_BALANCED: {"quality": None, "method": 4},
+        PROFILE_SMALLEST: {"quality": None, "method": 6},
+        # W trybie bezstratnym quality określa nakład pracy kompresji
+        PROFILE_ARCHIVAL: {"lossless": True, "quality": 80, "method": 4},
+    },
+    "TIFF": {
+        PROFILE_FASTEST: {"compression": "packbits"},
+        PROFILE_BALANCED: {"compression": "tiff_lzw"},
+        PROFILE_SMALLEST: {"compression": "jpeg", "quality": None},
+        PROFILE_ARCHIVAL: {"compression": "tiff_adobe_deflate"},
+    },
+}
+
+# Formaty, dla których działa limit rozmiaru pliku (wyszukiwanie jakości)
+FORMATY_LIMITU_ROZMIARU = ("JPEG", "WEBP")
+
+# Najniższa jakość sprawdzana przy dopasowaniu do limitu rozmiaru
+MIN_QUALITY = 1
+
+# Liczba zapamiętanych jakości (format, profil, limit, klasa rozmiaru obrazu)
+QUALITY_HISTORY_SIZE = 256
+
+# Tryby obrazu, które TIFF potrafi zapisać z kompresją JPEG; pozostałe
+# (np. RGBA) w profilu "smallest" używają kompresji deflate
+TRYBY_TIFF_JPEG = ("RGB", "L", "CMYK", "YCbCr")
+
+
+def encoder_params(format, profile=DEFAULT_PROFILE, quality=100, mode=None):
+    """
+    Zwraca parametry Image.save dla formatu i profilu kodera.
+
+    Args:
+        format (str): Format wyjściowy (np. "JPEG")
+        profile (str): Profil kodera z ENCODER_PROFILES
+        quality (int): Jakość 0-100 dla formatów stratnych
+        mode (str): Tryb zapisywanego obrazu (wybór kompresji TIFF)
+
+    Returns:
+        dict: Parametry zapisu (pusty dla formatów bez parametrów, np. BMP)
+
+    Raises:
+        ValueError: Gdy profil nie jest obsługiwany
+    """
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"Nieobsługiwany profil kodera: {profile}")
+    parametry = dict(PARAMETRY_KODERA.get(format, {}).get(profile, {}))
+    jpeg_w_tiff = parametry.get("compression") == "jpeg"
+    if jpeg_w_tiff and mode is not None and mode not in TRYBY_TIFF_JPEG:
+        parametry = {"compression": "tiff_adobe_deflate"}
+    if "quality" in parametry and parametry["quality"] is None:
+        parametry["quality"] = quality
+    return parametry
+
+
+# =========================================
+# Limit rozmiaru pliku
+# =========================================
+class SizeBudgetError(ValueError):
+    """Obraz nie mieści się w limicie rozmiaru nawet przy najniższej jakości."""
+
+
+def supports_target_size(format, profile=DEFAULT_PROFILE):
+    """
+    Sprawdza, czy dla formatu i profilu można dopasować jakość do limitu
+    rozmiaru (formaty stratne; bezstratny WEBP "archival" - nie).
+
+    Args:
+        format (str): Format wyjściowy
+        profile (str): Profil kodera
+
+    Returns:
+        bool: True, gdy limit rozmiaru jest obsługiwany
+    """
+    if format not in FORMATY_LIMITU_ROZMIARU:
+        return False
+    return not encoder_params(format, profile).get("lossless", False)
+
+
+class QualityHistory:
+    """
+    Jakości, które zmieściły się w limicie rozmiaru dla poprzednich
+    obrazów - punkt startowy wyszukiwania dla kolejnych obrazów o podobnej
+    liczbie pikseli (klasy co potęgę dwójki). Ograniczona do max_entries
+    najdawniej użytych kluczy. Bezpieczna dla wielu wątków.
+    """
+
+    def __init__(self, max_entries=QUALITY_HISTORY_SIZE):
+        """
+        Args:
+            max_entries (int): Limit zapamiętanych kluczy
+        """
+        self.max_entries = max_entries
+        self._jakosci = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(format, profile, max_bytes, size):
+        """Klucz historii: format, profil, limit i klasa liczby pikseli."""
+        klasa = round(math.log2(max(1, size[0] * size[1])))
+        return (format, profile, max_bytes, klasa)
+
+    def get(self, key):
+        """Zwraca zapamiętaną jakość albo None."""
+        with self._lock:
+            jakosc = self._jakosci.get(key)
+            if jakosc is not None:
+                self._jakosci.move_to_end(key)
+            return jakosc
+
+    def put(self, key, quality):
+        """Zapamiętuje jakość dla klucza."""
+        with self._lock:
+            self._jakosci[key] = quality
+            self._jakosci.move_to_end(key)
+            while len(self._jakosci) > self.max_entries:
+                self._jakosci.popitem(last=False)
+
+
+def encode_to_size(
+    img,
+    format,
+    max_bytes,
+    profile=DEFAULT_PROFILE,
+    max_quality=95,
+    tolerance=0.05,
+    history=None,
+):
+    """
+    Koduje obraz w pamięci z najwyższą jakością (do max_quality), przy
+    której wynik mieści się w max_bytes. Jakość jest wyszukiwana binarnie,
+    zaczynając od jakości z historii dla obrazów o podobnej liczbie pikseli
+    (albo od max_quality); wyszukiwanie kończy się wcześniej, gdy wynik
+    mieści się w limicie i jest od niego mniejszy najwyżej o tolerance.
+
+    Args:
+        img (PIL.Image.Image): Zdekodowany obraz
+        format (str): Format wyjściowy ("JPEG" lub "WEBP")
+        max_bytes (int): Limit rozmiaru pliku w bajtach
+        profile (str): Profil kodera
+        max_quality (int): Najwyższa dopuszczalna jakość
+        tolerance (float): Względny zapas poniżej limitu akceptowany bez
+            dalszego wyszukiwania (np. 0.05 = 5%)
+        history (QualityHistory): Historia jakości; None - bez historii
+
+    Returns:
+        tuple: (memoryview z zakodowanym plikiem, jakość, liczba prób)
+
+    Raises:
+        ValueError: Gdy format lub profil nie obsługuje limitu rozmiaru
+        SizeBudgetError: Gdy obraz nie mieści się w limicie przy MIN_QUALITY
+    """
+    if not supports_target_size(format, profile):
+        raise ValueError(f"Limit rozmiaru nie jest obsługiwany dla {format}/{profile}")
+    klucz = QualityHistory.key(format, profile, max_bytes, img.size)
+    dolna, gorna = MIN_QUALITY, max(MIN_QUALITY, max_quality)
+    jakosc = history.get(klucz) if history is not None else None
+    jakosc = gorna if jakosc is None else min(max(jakosc, dolna), gorna)
+    najlepsza, najlepszy_bufor, proby = None, None, 0
+    while dolna <= gorna:
+        bufor = io.BytesIO()
+        img.save(bufor, format, **encoder_params(format, profile, jakosc, img.mode))
+        proby += 1
+        rozmiar = bufor.tell()
+        if rozmiar <= max_bytes:
+            najlepsza, najlepszy_bufor = jakosc, bufor
+            if rozmiar >= max_bytes * (1 - tolerance):
+                break
+            dolna = jakosc + 1
+        else:
+            gorna = jakosc - 1
+        jakosc = (dolna + gorna + 1) // 2
+    if najlepsza is None:
+        raise SizeBudgetError(
+            f"{format} przekracza {max_bytes // 1024} KB nawet przy jakości {MIN_QUALITY}"
+        )
+    if history is not None:
+        history.put(klucz, najlepsza)
+    return najlepszy_bufor.getbuffer(), najlepsza, proby
+
+
+# =========================================
+# Kalibracja profili
+# =========================================
+@dataclass
+class CalibrationResult:
+    """
+    Wynik kalibracji profilu dla jednego formatu.
+
+    Args:
+        format (str): Format wyjściowy
+        profile (str): Profil kodera
+        files (int): Liczba zakodowanych próbek
+        seconds (float): Łączny czas kodowania
+        bytes (int): Łączny rozmiar zakodowanych plików
+    """
+
+    format: str
+    profile: str
+    files: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+
+def calibrate(samples, formats=None, profiles=ENCODER_PROFILES, quality=90):
+    """
+    Koduje przykładowe obrazy w pamięci każdym profilem i mierzy czas
+    kodowania oraz rozmiar wyniku. Każda próbka jest dekodowana raz;
+    próbki, których format nie potrafi zapisać (np. RGBA jako JPEG), są
+    pomijane dla tego formatu.
+
+    Args:
+        samples (iterable): Ścieżki przykładowych obrazów
+        formats (iterable): Formaty wyjściowe (domyślnie wszystkie
+            z PARAMETRY_KODERA)
+        profiles (iterable): Mierzone profile kodera
+        quality (int): Jakość dla formatów stratnych
+
+    Returns:
+        list: Rekordy CalibrationResult w kolejności format, profil
+    """
+    formats = list(PARAMETRY_KODERA) if formats is None else list(formats)
+    wyniki = {(f, p): CalibrationResult(f, p) for f in formats for p in profiles}
+    for sciezka in samples:
+        try:
+            with Image.open(sciezka) as img:
+                img.load()
+                obraz = img.copy()
+        except OSError as e:
+            logger.warning("Pominięto próbkę %s: %s", sciezka, e)
+            continue
+        for (format, profile), wynik in wyniki.items():
+            parametry = encoder_params(format, profile, quality, obraz.mode)
+            bufor = io.BytesIO()
+            start = time.perf_counter()
+            try:
+                obraz.save(bufor, format, **parametry)
+            except (OSError, ValueError) as e:
+                logger.debug("%s nie zapisze %s: %s", format, sciezka, e)
+                continue
+            wynik.seconds += time.perf_counter() - start
+            wynik.bytes += bufor.tell()
+            wynik.files += 1
+    for wynik in wyniki.values():
+        logger.info(
+            "%s/%s: %d plików, %.3f s, %d KB",
+            wynik.format,
+            wynik.profile,
+            wynik.files,
+            wynik.seconds,
+            wynik.bytes // 1024,
+        )
+    return list(wyniki.values())
+
+
+if __name__ == "__main__":
+    # Kalibracja z wiersza poleceń: python encoders.py zdjecie1.jpg zdjecie2.heic
+    print(
+        f"{'format':<6} {'profil':<9} {'pliki':>5} {'czas [s]':>9} {'rozmiar [KB]':>12}"
+    )
+    for wynik in calibrate(sys.argv[1:]):
+        print(
+            f"{wynik.format:<6} {wynik.profile:<9} {wynik.files:>5} "
+            f"{wynik.seconds:>9.3f} {wynik.bytes // 1024:>12}"
+        )
@@ -0,0 +1,2609 @@
+# ---
+# # ImageFlow - silnik konwersji
+#
+# **Bezobsługowy (headless) silnik konwersji plików graficznych.
+# Nie zależy od Tkinter - może działać na serwerach bez ekranu.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+# =========================================
+# Importy i rejestracja obsługi formatów
+# =========================================
+import io
+import os
+import hashlib
+import secrets
+import sys
+import time
+import logging
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageMode
+from pillow_heif import register_heif_opener
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows - bez reflinków
+
+from manifest import Manifest, fingerprint, hash_bytes, hash_file
+from encoders import (
+    DEFAULT_PROFILE,
+    ENCODER_PROFILES,
+    QualityHistory,
+    SizeBudgetError,
+    encode_to_size,
+    encoder_params,
+    supports_target_size,
+)
+from outputcache import OUTPUT_CACHE_BYTES, cache_key, shared_cache
+from sharedframes import (
+    SHARED_POOL_BYTES,
+    SharedFramePool,
+    frame_size,
+    read_frame,
+    write_frame,
+)
+
+# Rejestracja obsługi plików HEIC
+register_heif_opener()
+
+# Zalecany limit pikseli ochrony przed "bombami dekompresji" dla aplikacji.
+# Domyślny limit Pillow (~89 MP, błąd od ~179 MP) odrzuca zwykłe skany
+# i panoramy 200-400 MP. Silnik nie zmienia globalnego Image.MAX_IMAGE_PIXELS
+# (dotyczyłby całego procesu gospodarza) - podnosi go program, który
+# osadza silnik (app.main), a zaostrza ConversionOptions.max_image_pixels.
+MAX_IMAGE_PIXELS = 500_000_000
+
+logger = logging.getLogger(__name__)
+
+# Rozszerzenia plików wejściowych obsługiwanych przez silnik
+OBSLUGIWANE_ROZSZERZENIA = (".heic", ".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".gif")
+
+# Formaty wyjściowe i odpowiadające im rozszerzenia plików
+ROZSZERZENIA_WYJSCIOWE = {
+    "JPEG": ".jpg",
+    "PNG": ".png",
+    "BMP": ".bmp",
+    "TIFF": ".tiff",
+    "WEBP": ".webp",
+}
+
+# Formaty, które zapisują obraz RGBX (RGB odtworzony z pamięci współdzielonej)
+# tak samo jak RGB; dla pozostałych obraz jest najpierw konwertowany do RGB
+FORMATY_RGBX = ("JPEG", "WEBP")
+
+# Statusy rekordów wyników
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_SKIPPED = "skipped"
+STATUS_UNCHANGED = "unchanged"
+
+# Polityki obsługi istniejących plików docelowych
+CONFLICT_POLICIES = ("overwrite", "skip", "rename", "skip_if_newer")
+
+# Akcje w planie konwersji
+ACTION_CONVERT = "convert"
+ACTION_SKIP = "skip"
+ACTION_UNCHANGED = "unchanged"
+
+# Układy plików wynikowych: wszystkie w jednym folderze, odwzorowanie drzewa
+# folderów źródłowych albo podfoldery wyznaczone skrótem ścieżki źródła
+LAYOUT_FLAT = "flat"
+LAYOUT_TREE = "tree"
+LAYOUT_SHARDED = "sharded"
+LAYOUTS = (LAYOUT_FLAT, LAYOUT_TREE, LAYOUT_SHARDED)
+
+# Domyślny szablon nazwy pliku wynikowego (bez rozszerzenia)
+NAME_TEMPLATE = "{stem}"
+
+# Kolejność wykonania partii: jak na wejściu, najdroższe pliki najpierw
+# (longest processing time first) albo według położenia na dysku
+SCHEDULE_INPUT = "input"
+SCHEDULE_LARGEST_FIRST = "largest_first"
+SCHEDULE_LOCALITY = "locality"
+SCHEDULES = (SCHEDULE_INPUT, SCHEDULE_LARGEST_FIRST, SCHEDULE_LOCALITY)
+
+# Narzut kodera i kopii roboczych względem zdekodowanego obrazu przy
+# szacowaniu pamięci zadania (estimate_memory)
+NARZUT_PAMIECI = 0.5
+
+# Polityki fsync plików wynikowych: "none" (tylko bufor systemu), "file"
+# (każdy plik przed podmianą nazwy) lub "batch" (wszystkie pliki na końcu partii)
+OUTPUT_FSYNC_POLICIES = ("none", "file", "batch")
+
+# Domyślna jakość kodowania (ConversionOptions.quality)
+DEFAULT_QUALITY = 100
+
+# Przepuszczanie plików już zapisanych w formacie docelowym (bez dekodowania
+# i kodowania): "off", "copy" (reflink lub kopia w jądrze systemu) lub "link"
+# (twarde dowiązanie na tym samym systemie plików, w przeciwnym razie kopia).
+# Dotyczy tylko ustawień bez ponownego kodowania (_wymaga_kodowania)
+PASSTHROUGH_OFF = "off"
+PASSTHROUGH_COPY = "copy"
+PASSTHROUGH_LINK = "link"
+PASSTHROUGH_MODES = (PASSTHROUGH_OFF, PASSTHROUGH_COPY, PASSTHROUGH_LINK)
+
+# Formaty źródła (Image.format), których bajty są poprawnym plikiem formatu
+# wyjściowego; MPO to JPEG z dodatkowymi obrazami (np. z aparatów)
+FORMATY_PRZEPUSZCZANE = {
+    "JPEG": ("JPEG", "MPO"),
+    "PNG": ("PNG",),
+    "BMP": ("BMP",),
+    "TIFF": ("TIFF",),
+    "WEBP": ("WEBP",),
+}
+
+# ioctl FICLONE (Linux): reflink - kopia współdzieląca bloki (btrfs, XFS)
+FICLONE = 0x40049409
+
+# Domyślny limit bajtów plików wczytanych z wyprzedzeniem (options.prefetch)
+PREFETCH_BYTES = 256 * 1024 * 1024
+
+# Co ile zapisanych plików nowe wpisy manifestu są dopisywane do jego dziennika
+MANIFEST_SAVE_EVERY = 500
+
+# Dostępne tryby wykonania konwersji
+EXECUTORS = ("auto", "serial", "thread", "process", "pipeline")
+
+# Etapy potoku (executor "pipeline"): odczyt z dysku, dekodowanie,
+# przekształcenie (miniatura) oraz kodowanie z zapisem
+STAGE_READ = "read"
+STAGE_DECODE = "decode"
+STAGE_TRANSFORM = "transform"
+STAGE_ENCODE = "encode"
+PIPELINE_STAGES = (STAGE_READ, STAGE_DECODE, STAGE_TRANSFORM, STAGE_ENCODE)
+
+# Rozszerzenia, których dekodowanie jest na tyle kosztowne (CPU), że w trybie
+# "auto" opłaca się pula procesów zamiast puli wątków
+ROZSZERZENIA_CPU = (".heic",)
+
+
+# =========================================
+# Ustawienia i wyniki konwersji
+# =========================================
+@dataclass
+class OutputSpec:
+    """
+    Jeden plik wynikowy w trybie wielu wyjść (ConversionOptions.outputs).
+
+    Args:
+        format (str): Format wyjściowy (klucz z ROZSZERZENIA_WYJSCIOWE)
+        profile (str): Profil kodera
+        max_dimension (int): Najdłuższy bok pomniejszonej wersji w pikselach;
+            None - pełna rozdzielczość
+        suffix (str): Dopisek do nazwy pliku przed rozszerzeniem (np. "_800")
+        quality (int): Jakość 0-100; None - ConversionOptions.quality
+    """
+
+    format: str = "JPEG"
+    profile: str = DEFAULT_PROFILE
+    max_dimension: Optional[int] = None
+    suffix: str = ""
+    quality: Optional[int] = None
+
+
+@dataclass
+class ConversionOptions:
+    """
+    Ustawienia konwersji przekazywane do silnika.
+
+    Args:
+        output_dir (str): Folder docelowy dla skonwertowanych plików
+        format (str): Format wyjściowy (klucz z ROZSZERZENIA_WYJSCIOWE)
+        quality (int): Jakość zapisu 0-100 (JPEG, WEBP i TIFF w profilu
+            "smallest")
+        profile (str): Profil kodera - "fastest", "balanced", "smallest"
+            lub "archival" (parametry formatów: encoders.PARAMETRY_KODERA)
+        max_output_bytes (int): Limit rozmiaru pliku wynikowego (JPEG, WEBP);
+            jakość jest wyszukiwana do wartości quality. None - bez limitu
+        size_tolerance (float): Względny zapas poniżej limitu rozmiaru,
+            przy którym wyszukiwanie jakości kończy się wcześniej
+        executor (str): Tryb wykonania - "serial", "thread" (dekodery i kodery
+            Pillow zwalniają GIL), "process" (np. dekodowanie HEIC),
+            "pipeline" (potok etapowy StagedPipeline) lub "auto"
+        workers (int): Liczba równoległych zadań (domyślnie liczba rdzeni CPU)
+        ordered (bool): True zwraca wyniki w kolejności plików wejściowych,
+            False zaraz po zakończeniu każdego pliku
+        thumbnail_size (tuple): Rozmiar miniatury dołączanej do wyniku
+            (np. dla podglądu w GUI); None pomija miniaturę
+        max_image_pixels (int): Limit pikseli obrazu dla tej konwersji,
+            sprawdzany z nagłówka przed dekodowaniem (rekord błędu "Obraz
+            zbyt duży"). Obowiązuje też globalny limit Pillow
+            (Image.MAX_IMAGE_PIXELS); None - tylko limit globalny
+        conflict_policy (str): Co zrobić z istniejącym plikiem docelowym -
+            "overwrite", "skip", "rename" (dopisuje " (1)", " (2)"...)
+            lub "skip_if_newer" (pomija, gdy plik docelowy jest nowszy)
+        incremental (bool): Tryb przyrostowy - pliki, których źródło
+            i ustawienia nie zmieniły się od poprzedniej konwersji (według
+            manifestu w folderze docelowym), są pomijane bez dekodowania
+        hash_content (bool): W trybie przyrostowym zapisuj i porównuj skrót
+            zawartości, gdy zmienił się tylko czas modyfikacji pliku
+        layout (str): Układ plików wynikowych - "flat" (wszystkie w output_dir),
+            "tree" (odwzorowanie folderów względem source_root) lub "sharded"
+            (podfoldery ab/cd/ wyznaczone skrótem ścieżki źródła)
+        source_root (str): Folder bazowy dla układu "tree"; domyślnie
+            wspólny folder plików partii (resolve_layout)
+        shard_levels (int): Liczba poziomów podfolderów w układzie "sharded"
+        name_template (str): Szablon nazwy pliku wynikowego bez rozszerzenia;
+            pola: {stem} (nazwa źródła), {parent} (nazwa folderu źródła),
+            {hash} (8 znaków skrótu ścieżki źródła)
+        schedule (str): Kolejność wykonania - "input" (jak na wejściu),
+            "largest_first" (najwięcej pikseli najpierw - krótszy czas całej
+            partii przy wielu zadaniach) lub "locality" (według folderu
+            i i-węzła - odczyt sekwencyjny na dyskach talerzowych i NFS);
+            przy ordered=True wyniki przychodzą w kolejności wykonania
+        memory_budget (int): Budżet pamięci (bajty) dla równoległych zadań;
+            zadanie startuje, gdy jego szacunek z nagłówka mieści się
+            w pozostałym budżecie, a pliki większe niż cały budżet są
+            konwertowane po jednym w osobnym torze. None wyłącza limit
+        pipeline_workers (dict): Liczba wątków etapów potoku, np.
+            {"read": 2, "encode": 8}; brakujące etapy - wartości domyślne
+        decode_processes (int): Liczba procesów dekodujących w potoku
+            (np. dla HEIC); piksele wracają przez pamięć współdzieloną,
+            bez serializacji. 0 - dekodowanie w wątkach
+        prefetch (int): Liczba kolejnych plików wczytywanych z wyprzedzeniem
+            w tle (Prefetcher) - ukrywa opóźnienia dysków sieciowych;
+            0 wyłącza wyprzedzenie
+        prefetch_bytes (int): Limit bajtów plików wczytanych z wyprzedzeniem
+        output_fsync (str): Trwałość zapisu plików wynikowych - "none",
+            "file" (fsync każdego pliku) lub "batch" (fsync na końcu partii)
+        passthrough (str): Pliki już zapisane w formacie docelowym (według
+            nagłówka) są przepisywane bajt w bajt zamiast konwersji, o ile
+            quality, profile i max_output_bytes mają wartości domyślne -
+            "off", "copy" (reflink lub kopia w jądrze) lub "link" (twarde
+            dowiązanie - plik wynikowy współdzieli dane ze źródłem)
+        cache_dir (str): Folder pamięci wyników adresowanej zawartością
+            (outputcache.OutputCache) wspólnej dla zadań - przy trafieniu
+            plik jest przepisywany z pamięci bez dekodowania. None wyłącza
+        cache_bytes (int): Limit bajtów pamięci wyników
+        cache_link (bool): Twarde dowiązania między pamięcią a plikami
+            wynikowymi zamiast kopii (reflink lub kopia w jądrze)
+        outputs (list): Lista OutputSpec - kilka plików wynikowych z jednego
+            dekodowania (format, profil, rozmiar, dopisek do nazwy); plan
+            i polityka konfliktów obejmują wszystkie wyjścia. None - jedno
+            wyjście według format, profile i quality
+    """
+
+    output_dir: str
+    format: str = "JPEG"
+    quality: int = DEFAULT_QUALITY
+    profile: str = DEFAULT_PROFILE
+    max_output_bytes: Optional[int] = None
+    size_tolerance: float = 0.05
+    executor: str = "auto"
+    workers: Optional[int] = None
+    ordered: bool = True
+    thumbnail_size: Optional[Tuple[int, int]] = None
+    max_image_pixels: Optional[int] = None
+    conflict_policy: str = "overwrite"
+    incremental: bool = False
+    hash_content: bool = False
+    layout: str = LAYOUT_FLAT
+    source_root: Optional[str] = None
+    shard_levels: int = 2
+    name_template: str = NAME_TEMPLATE
+    schedule: str = SCHEDULE_INPUT
+    memory_budget: Optional[int] = None
+    pipeline_workers: Optional[Dict[str, int]] = None
+    decode_processes: int = 0
+    prefetch: int = 0
+    prefetch_bytes: int = PREFETCH_BYTES
+    output_fsync: str = "none"
+    passthrough: str = PASSTHROUGH_OFF
+    cache_dir: Optional[str] = None
+    cache_bytes: int = OUTPUT_CACHE_BYTES
+    cache_link: bool = False
+    outputs: Optional[List[OutputSpec]] = None
+
+    def to_dict(self):
+        """
+        Zwraca ustawienia jako słownik gotowy do zapisu w JSON.
+
+        Returns:
+            dict: Ustawienia konwersji
+        """
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, dane):
+        """
+        Odtwarza ustawienia ze słownika (np. z dziennika zadania), także
+        zagnieżdżone OutputSpec. Nieznane klucze są pomijane, brakujące
+        przyjmują wartości domyślne.
+
+        Args:
+            dane (dict): Ustawienia zapisane przez to_dict()
+
+        Returns:
+            ConversionOptions: Odtworzone ustawienia
+        """
+        znane = {pole.name for pole in fields(cls)}
+        opcje = cls(**{k: v for k, v in dane.items() if k in znane})
+        if opcje.thumbnail_size is not None:
+            opcje.thumbnail_size = tuple(opcje.thumbnail_size)
+        if opcje.outputs is not None:
+            znane = {pole.name for pole in fields(OutputSpec)}
+            opcje.outputs = [
+                (
+                    wyjscie
+                    if isinstance(wyjscie, OutputSpec)
+                    else OutputSpec(**{k: v for k, v in wyjscie.items() if k in znane})
+                )
+                for wyjscie in opcje.outputs
+            ]
+        return opcje
+
+
+@dataclass
+class ConversionResult:
+    """
+    Rekord wyniku konwersji pojedynczego pliku.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        target (str): Ścieżka pliku docelowego
+        status (str): STATUS_OK, STATUS_ERROR, STATUS_SKIPPED
+            lub STATUS_UNCHANGED (tryb przyrostowy)
+        error (str): Opis błędu (tylko dla STATUS_ERROR)
+        duration (float): Czas przetwarzania pliku w sekundach
+        thumbnail (PIL.Image.Image): Miniatura (gdy ustawiono thumbnail_size)
+        content_hash (str): Skrót zawartości źródła (gdy hash_content)
+        passthrough (str): Sposób przepisania pliku bez konwersji
+            ("hardlink", "reflink" lub "copy"); None - plik skonwertowany
+        cached (bool): True - plik przepisany z pamięci wyników, False -
+            skonwertowany przy włączonej pamięci; None - pamięć wyłączona
+        outputs (list): Ścieżki wszystkich plików wynikowych (tryb wielu
+            wyjść; pierwsza to target); None - jedno wyjście
+    """
+
+    source: str
+    target: str
+    status: str
+    error: Optional[str] = None
+    duration: float = 0.0
+    thumbnail: Optional[Image.Image] = None
+    content_hash: Optional[str] = None
+    passthrough: Optional[str] = None
+    cached: Optional[bool] = None
+    outputs: Optional[List[str]] = None
+
+    @property
+    def ok(self):
+        """True jeśli plik został poprawnie zapisany."""
+        return self.status == STATUS_OK
+
+
+# =========================================
+# Wyszukiwanie plików w folderach
+# =========================================
+def scan_folder(
+    folder, recursive=True, extensions=OBSLUGIWANE_ROZSZERZENIA, cancel=None
+):
+    """
+    Przegląda folder (domyślnie z podfolderami) i zwraca kolejne pliki
+    o obsługiwanych rozszerzeniach (generator). Korzysta z os.scandir -
+    typ wpisu pochodzi z odczytu katalogu, więc pliki nie wymagają
+    osobnego stat. Dowiązania do folderów nie są odwiedzane (brak pętli);
+    nieczytelne foldery są pomijane z ostrzeżeniem.
+
+    Args:
+        folder (str): Folder początkowy
+        recursive (bool): Przeglądaj również podfoldery
+        extensions (tuple): Rozszerzenia plików (małe litery, z kropką)
+        cancel (callable): Funkcja bez argumentów; True przerywa przeglądanie
+
+    Yields:
+        str: Ścieżka kolejnego pliku (folder po folderze, nazwy alfabetycznie)
+    """
+    stos = [folder]
+    while stos:
+        if cancel is not None and cancel():
+            return
+        katalog = stos.pop()
+        try:
+            with os.scandir(katalog) as it:
+                wpisy = sorted(it, key=lambda wpis: wpis.name)
+        except OSError as e:
+            logger.warning("Nie można odczytać folderu %s: %s", katalog, e)
+            continue
+        podfoldery = []
+        for wpis in wpisy:
+            try:
+                if wpis.is_dir(follow_symlinks=False):
+                    if recursive:
+                        podfoldery.append(wpis.path)
+                elif (
+                    os.path.splitext(wpis.name)[1].lower() in extensions
+                    and wpis.is_file()
+                ):
+                    yield wpis.path
+            except OSError:
+                continue
+        # Odwrócona kolejność na stosie = podfoldery alfabetycznie
+        stos.extend(reversed(podfoldery))
+
+
+# =========================================
+# Konwersja pojedynczego pliku
+# =========================================
+def resolve_layout(options, paths):
+    """
+    Uzupełnia ustawienia układu zależne od partii: dla układu "tree" bez
+    source_root wyznacza wspólny folder plików. Wynik warto zapisać (np.
+    w dzienniku zadania), aby wznowienie dla części plików dało te same
+    ścieżki docelowe.
+
+    Args:
+        options (ConversionOptions): Ustawienia konwersji
+        paths (list): Ścieżki plików źródłowych
+
+    Returns:
+        ConversionOptions: Ustawienia z ustalonym source_root (lub te same)
+
+    Raises:
+        ValueError: Gdy układ lub szablon nazwy nie jest obsługiwany
+    """
+    if options.layout not in LAYOUTS:
+        raise ValueError(f"Nieobsługiwany układ plików: {options.layout}")
+    try:
+        options.name_template.format(stem="", parent="", hash="")
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(
+            f"Nieprawidłowy szablon nazwy: {options.name_template} ({e})"
+        ) from None
+    if options.layout != LAYOUT_TREE or options.source_root or not paths:
+        return options
+    try:
+        folder = os.path.commonpath(
+            [os.path.dirname(os.path.abspath(p)) for p in paths]
+        )
+    except ValueError:
+        # Pliki na różnych dyskach (Windows) - brak wspólnego folderu
+        return options
+    return replace(options, source_root=folder)
+
+
+def _skrot_sciezki(source):
+    """Skrót (hex) znormalizowanej ścieżki źródła - stały dla danego pliku."""
+    klucz = os.path.normcase(os.path.abspath(source)).encode("utf-8", "surrogatepass")
+    return hashlib.sha256(klucz).hexdigest()
+
+
+def target_path(source, options):
+    """
+    Wyznacza ścieżkę pliku docelowego dla pliku źródłowego według układu
+    (options.layout) i szablonu nazwy (options.name_template).
+    W układzie "tree" pliki spoza source_root (lub bez source_root)
+    trafiają bezpośrednio do output_dir.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        options (ConversionOptions): Ustawienia konwersji
+
+    Returns:
+        str: Znormalizowana ścieżka pliku docelowego
+    """
+    folder_zrodla, nazwa = os.path.split(source)
+    nazwa_pliku = os.path.splitext(nazwa)[0]
+    skrot = None
+    if options.name_template != NAME_TEMPLATE:
+        skrot = _skrot_sciezki(source)
+        nazwa_pliku = options.name_template.format(
+            stem=nazwa_pliku,
+            parent=os.path.basename(folder_zrodla),
+            hash=skrot[:8],
+        )
+    podfolder = ""
+    if options.layout == LAYOUT_TREE and options.source_root:
+        podfolder = os.path.relpath(
+            os.path.abspath(folder_zrodla), os.path.abspath(options.source_root)
+        )
+        if podfolder == os.curdir or podfolder.startswith(os.pardir):
+            podfolder = ""
+    elif options.layout == LAYOUT_SHARDED:
+        skrot = skrot or _skrot_sciezki(source)
+        podfolder = os.path.join(
+            *(skrot[2 * i : 2 * i + 2] for i in range(max(1, options.shard_levels)))
+        )
+    rdzen = os.path.normpath(os.path.join(options.output_dir, podfolder, nazwa_pliku))
+    # Plan i ścieżka w wynikach dotyczą pierwszego wyjścia
+    return _sciezki_wyjsc(rdzen, options)[0]
+
+
+def _sciezki_wyjsc(rdzen, options):
+    """
+    Ścieżki wszystkich wyjść o wspólnym rdzeniu nazwy: rdzeń (nazwa
+    z szablonu i numer nadany przy konflikcie) + suffix + rozszerzenie.
+    """
+    wyjscia = options.outputs or [OutputSpec(options.format)]
+    return [
+        f"{rdzen}{wyjscie.suffix}{ROZSZERZENIA_WYJSCIOWE[wyjscie.format]}"
+        for wyjscie in wyjscia
+    ]
+
+
+def _rdzen_nazwy(target, options):
+    """Rdzeń nazwy (bez suffix i rozszerzenia) ścieżki pierwszego wyjścia."""
+    rdzen = os.path.splitext(target)[0]
+    dopisek = options.outputs[0].suffix if options.outputs else ""
+    if dopisek and rdzen.endswith(dopisek):
+        rdzen = rdzen[: -len(dopisek)]
+    return rdzen
+
+
+def output_targets(target, options):
+    """
+    Wyznacza ścieżki wszystkich wyjść (options.outputs) z zaplanowanej
+    ścieżki pierwszego wyjścia. Wszystkie wyjścia mają wspólny rdzeń nazwy
+    - także numer nadany przy konflikcie, np. "zdjecie (1)_duze.jpg"
+    i "zdjecie (1)_male.webp".
+
+    Args:
+        target (str): Ścieżka pierwszego wyjścia (z planu)
+        options (ConversionOptions): Ustawienia konwersji
+
+    Returns:
+        list: Ścieżki plików wynikowych w kolejności options.outputs
+            ([target] bez options.outputs)
+    """
+    if not options.outputs:
+        return [target]
+    return _sciezki_wyjsc(_rdzen_nazwy(target, options), options)
+
+
+def _fsync_folderu(folder):
+    """fsync folderu - utrwala podmianę nazwy (tylko POSIX)."""
+    if os.name != "posix":
+        return
+    fd = os.open(folder or os.curdir, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _podmien_atomowo(target, utworz, fsync=False):
+    """
+    Tworzy plik tymczasowy w folderze docelowym funkcją utworz(ścieżka)
+    i podmienia nim plik docelowy (os.replace). Przerwany zapis nigdy nie
+    zostawia niepełnego pliku pod ścieżką docelową.
+
+    Args:
+        target (str): Ścieżka pliku docelowego
+        utworz (callable): Tworzy plik pod podaną ścieżką tymczasową
+        fsync (bool): fsync folderu po podmianie
+
+    Returns:
+        Wartość zwrócona przez utworz
+    """
+    folder, nazwa = os.path.split(target)
+    tymczasowy = os.path.join(folder, f".{nazwa}.{secrets.token_hex(4)}.tmp")
+    try:
+        wynik = utworz(tymczasowy)
+        os.replace(tymczasowy, target)
+    except BaseException:
+        try:
+            os.unlink(tymczasowy)
+        except OSError:
+            logger.debug("Nie można usunąć pliku tymczasowego %s", tymczasowy)
+        raise
+    if fsync:
+        _fsync_folderu(folder)
+    return wynik
+
+
+def _otworz_nowy(sciezka):
+    """Tworzy nowy plik do zapisu (O_EXCL) i zwraca jego deskryptor."""
+    flagi = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    return os.open(sciezka, flagi, 0o666)
+
+
+def _zapisz_atomowo(dane, target, fsync=False):
+    """
+    Zapisuje dane do pliku tymczasowego w folderze docelowym jednym
+    zapisem i podmienia nazwę (_podmien_atomowo).
+
+    Args:
+        dane (bytes): Zawartość pliku
+        target (str): Ścieżka pliku docelowego
+        fsync (bool): fsync pliku przed podmianą i folderu po niej
+    """
+
+    def utworz(tymczasowy):
+        fd = _otworz_nowy(tymczasowy)
+        try:
+            widok = memoryview(dane)
+            while widok:
+                widok = widok[os.write(fd, widok) :]
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    _podmien_atomowo(target, utworz, fsync)
+
+
+def _kopiuj_deskryptor(zrodlo, cel):
+    """
+    Kopiuje zawartość pliku między deskryptorami bez przechodzenia przez
+    bufory Pythona: reflink (FICLONE), potem os.copy_file_range (kopia po
+    stronie jądra lub serwera NFS), os.sendfile, a na końcu odczyt i zapis.
+
+    Args:
+        zrodlo (int): Deskryptor pliku źródłowego
+        cel (int): Deskryptor pustego pliku docelowego
+
+    Returns:
+        str: Użyty sposób - "reflink" lub "copy"
+    """
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            fcntl.ioctl(cel, FICLONE, zrodlo)
+            return "reflink"
+        except OSError as e:
+            # System plików bez reflinków (ext4, tmpfs) lub inny system plików
+            logger.debug("Reflink niedostępny: %s", e)
+    pozostalo = os.fstat(zrodlo).st_size
+    kopiuj_w_jadrze = []
+    if hasattr(os, "copy_file_range"):
+        kopiuj_w_jadrze.append(lambda n: os.copy_file_range(zrodlo, cel, n))
+    if hasattr(os, "sendfile"):
+        kopiuj_w_jadrze.append(lambda n: os.sendfile(cel, zrodlo, None, n))
+    for kopiuj in kopiuj_w_jadrze:
+        try:
+            while pozostalo > 0:
+                skopiowano = kopiuj(pozostalo)
+                if not skopiowano:
+                    break
+                pozostalo -= skopiowano
+            if pozostalo <= 0:
+                return "copy"
+        except OSError as e:
+            # Np. EXDEV (różne systemy plików w starszych jądrach), ENOSYS;
+            # pozycje obu plików wskazują miejsce, od którego kopiować dalej
+            logger.debug("Kopia w jądrze niedostępna: %s", e)
+    while True:
+        blok = os.read(zrodlo, 1024 * 1024)
+        if not blok:
+            return "copy"
+        widok = memoryview(blok)
+        while widok:
+            widok = widok[os.write(cel, widok) :]
+
+
+def _przepisz_plik(source, target, link=False, fsync=False):
+    """
+    Zapisuje bajty źródła pod ścieżką docelową bez dekodowania - atomowo,
+    przez plik tymczasowy (_podmien_atomowo).
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        target (str): Ścieżka pliku docelowego
+        link (bool): Spróbuj twardego dowiązania (ten sam system plików)
+        fsync (bool): fsync kopii przed podmianą i folderu po niej
+
+    Returns:
+        str: Użyty sposób - "hardlink", "reflink" lub "copy"
+    """
+    if link and os.path.exists(target) and os.path.samefile(source, target):
+        return "hardlink"  # Plik docelowy już jest dowiązaniem do źródła
+
+    def utworz(tymczasowy):
+        if link:
+            try:
+                os.link(source, tymczasowy)
+                return "hardlink"
+            except OSError as e:
+                # Inny system plików (EXDEV) lub brak obsługi dowiązań
+                logger.debug("Dowiązanie niemożliwe, kopiowanie %s: %s", source, e)
+        fd_zrodla = os.open(source, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            fd = _otworz_nowy(tymczasowy)
+            try:
+                sposob = _kopiuj_deskryptor(fd_zrodla, fd)
+                if fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        finally:
+            os.close(fd_zrodla)
+        return sposob
+
+    return _podmien_atomowo(target, utworz, fsync)
+
+
+def _fsync_plikow(sciezki):
+    """
+    Utrwala zapisane pliki i ich foldery (polityka "batch"); błędy są
+    logowane, bo pliki zostały już zapisane.
+    """
+    foldery = set()
+    for sciezka in sciezki:
+        try:
+            fd = os.open(sciezka, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            foldery.add(os.path.dirname(sciezka))
+        except OSError as e:
+            logger.warning("Nie można utrwalić pliku %s: %s", sciezka, e)
+    for folder in foldery:
+        try:
+            _fsync_folderu(folder)
+        except OSError as e:
+            logger.warning("Nie można utrwalić folderu %s: %s", folder, e)
+
+
+# Jakości dopasowane do limitu rozmiaru dla poprzednich obrazów (wspólne dla
+# wątków procesu; każdy proces puli uczy się osobno)
+_historia_jakosci = QualityHistory()
+
+
+def _zapisz_obraz(img, target, options):
+    """
+    Koduje obraz w pamięci w formacie docelowym (z parametrami profilu
+    kodera dla formatu) i zapisuje go atomowo jednym zapisem. Przy
+    max_output_bytes jakość jest dopasowywana do limitu (encode_to_size).
+
+    Args:
+        img (PIL.Image.Image): Obraz do zapisania
+        target (str): Ścieżka pliku docelowego
+        options (ConversionOptions): Ustawienia konwersji
+    """
+    if img.mode == "RGBX" and options.format not in FORMATY_RGBX:
+        img = img.convert("RGB")
+    if options.max_output_bytes:
+        dane, jakosc, proby = encode_to_size(
+            img,
+            options.format,
+            options.max_output_bytes,
+            options.profile,
+            max_quality=options.quality,
+            tolerance=options.size_tolerance,
+            history=_historia_jakosci,
+        )
+        logger.debug("%s: jakość %d (%d prób kodowania)", target, jakosc, proby)
+    else:
+        parametry = encoder_params(
+            options.format, options.profile, options.quality, img.mode
+        )
+        bufor = io.BytesIO()
+        img.save(bufor, options.format, **parametry)
+        dane = bufor.getbuffer()
+    _zapisz_atomowo(dane, target, fsync=options.output_fsync == "file")
+
+
+def _pomniejsz(img, max_dimension):
+    """
+    Pomniejsza obraz tak, aby najdłuższy bok nie przekraczał max_dimension
+    (bez powiększania; reducing_gap przyspiesza duże zmniejszenia).
+
+    Args:
+        img (PIL.Image.Image): Obraz
+        max_dimension (int): Najdłuższy bok w pikselach
+
+    Returns:
+        PIL.Image.Image: Pomniejszony obraz albo img, gdy jest dość mały
+    """
+    skala = max_dimension / max(img.size)
+    if skala >= 1:
+        return img
+    rozmiar = (max(1, round(img.width * skala)), max(1, round(img.height * skala)))
+    return img.resize(rozmiar, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def _wersje(img, options):
+    """
+    Tworzy obrazy dla options.outputs z jednego zdekodowanego obrazu.
+    Wersje powstają od największej do najmniejszej, każda pomniejszona
+    z poprzedniej, a nie z pełnej rozdzielczości.
+
+    Args:
+        img (PIL.Image.Image): Zdekodowany obraz
+        options (ConversionOptions): Ustawienia z listą outputs
+
+    Returns:
+        list: Obrazy w kolejności options.outputs
+    """
+    wyjscia = options.outputs
+    kolejnosc = sorted(
+        range(len(wyjscia)),
+        key=lambda i: wyjscia[i].max_dimension or float("inf"),
+        reverse=True,
+    )
+    wersje = [None] * len(wyjscia)
+    biezacy = img
+    for i in kolejnosc:
+        if wyjscia[i].max_dimension:
+            biezacy = _pomniejsz(biezacy, wyjscia[i].max_dimension)
+        wersje[i] = biezacy
+    return wersje
+
+
+def _zapisz_wyjscia(wersje, target, options):
+    """
+    Koduje i zapisuje wersje obrazu z _wersje - każdą z formatem, profilem
+    i jakością swojego OutputSpec.
+
+    Args:
+        wersje (list): Obrazy w kolejności options.outputs
+        target (str): Ścieżka pierwszego wyjścia (z planu)
+        options (ConversionOptions): Ustawienia z listą outputs
+
+    Returns:
+        list: Ścieżki zapisanych plików
+    """
+    cele = output_targets(target, options)
+    for wyjscie, obraz, cel in zip(options.outputs, wersje, cele):
+        opcje = replace(
+            options,
+            format=wyjscie.format,
+            profile=wyjscie.profile,
+            quality=options.quality if wyjscie.quality is None else wyjscie.quality,
+            outputs=None,
+        )
+        _zapisz_obraz(obraz, cel, opcje)
+    return cele
+
+
+def _sprawdz_wyjscia(options):
+    """
+    Sprawdza listę options.outputs przed uruchomieniem partii.
+
+    Args:
+        options (ConversionOptions): Ustawienia z listą outputs
+
+    Raises:
+        ValueError: Pusta lista, nieobsługiwany format lub profil, błędny
+            max_dimension, limit rozmiaru nieobsługiwany dla wyjścia albo
+            dwa wyjścia o tej samej nazwie pliku
+    """
+    if not options.outputs:
+        raise ValueError("Lista wyjść jest pusta")
+    nazwy = set()
+    for wyjscie in options.outputs:
+        if wyjscie.format not in ROZSZERZENIA_WYJSCIOWE:
+            raise ValueError(f"Nieobsługiwany format wyjściowy: {wyjscie.format}")
+        if wyjscie.profile not in ENCODER_PROFILES:
+            raise ValueError(f"Nieobsługiwany profil kodera: {wyjscie.profile}")
+        if wyjscie.max_dimension is not None and wyjscie.max_dimension < 1:
+            raise ValueError(f"Nieprawidłowy max_dimension: {wyjscie.max_dimension}")
+        if options.max_output_bytes and not supports_target_size(
+            wyjscie.format, wyjscie.profile
+        ):
+            raise ValueError(
+                f"Limit rozmiaru nie jest obsługiwany dla {wyjscie.format}/{wyjscie.profile}"
+            )
+        nazwa = (wyjscie.suffix, ROZSZERZENIA_WYJSCIOWE[wyjscie.format])
+        if nazwa in nazwy:
+            raise ValueError(f"Dwa wyjścia dają tę samą nazwę pliku: {nazwa}")
+        nazwy.add(nazwa)
+
+
+def _najmniejsza(wersje):
+    """Najmniejsza wersja obrazu - najtańsze źródło miniatury."""
+    return min(wersje, key=lambda obraz: obraz.width * obraz.height)
+
+
+def _pamiec_wynikow(options):
+    """True, gdy pamięć wyników jest używana (tylko dla jednego wyjścia)."""
+    return bool(options.cache_dir) and not options.outputs
+
+
+def _sprawdz_piksele(img, options):
+    """
+    Sprawdza liczbę pikseli z nagłówka z options.max_image_pixels.
+
+    Args:
+        img (PIL.Image.Image): Otwarty (jeszcze nie zdekodowany) obraz
+        options (ConversionOptions): Ustawienia konwersji
+
+    Raises:
+        Image.DecompressionBombError: Gdy obraz przekracza limit
+    """
+    limit = options.max_image_pixels
+    if limit and img.width * img.height > limit:
+        raise Image.DecompressionBombError(
+            f"{img.width * img.height} pikseli przekracza limit {limit}"
+        )
+
+
+# Wyjątki oznaczające błąd pojedynczego pliku (a nie silnika); ValueError
+# zgłaszają m.in. kodery (np. tryb obrazu nieobsługiwany przez format)
+BLEDY_KONWERSJI = (Image.DecompressionBombError, OSError, SyntaxError, ValueError)
+
+
+def _wynik_bledu(source, target, blad, start):
+    """
+    Tworzy rekord błędu dla wyjątku z BLEDY_KONWERSJI.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        target (str): Ścieżka pliku docelowego
+        blad (Exception): Zgłoszony wyjątek
+        start (float): Czas rozpoczęcia (time.perf_counter)
+
+    Returns:
+        ConversionResult: Rekord ze statusem STATUS_ERROR
+    """
+    if isinstance(blad, Image.DecompressionBombError):
+        opis = f"Obraz zbyt duży: {blad}"
+    elif isinstance(blad, SizeBudgetError):
+        opis = f"Nie mieści się w limicie rozmiaru: {blad}"
+    else:
+        opis = f"Plik uszkodzony lub nieobsługiwany: {blad}"
+    return ConversionResult(
+        source, target, STATUS_ERROR, error=opis, duration=time.perf_counter() - start
+    )
+
+
+def _miniatura(img, rozmiar):
+    """
+    Tworzy miniaturę jak Image.thumbnail, ale bez zmiany obrazu źródłowego
+    (i bez kopiowania go w pełnej rozdzielczości). Obraz RGBX z pamięci
+    współdzielonej daje miniaturę RGB.
+
+    Args:
+        img (PIL.Image.Image): Zdekodowany obraz
+        rozmiar (tuple): Maksymalny rozmiar (szerokość, wysokość)
+
+    Returns:
+        PIL.Image.Image: Miniatura
+    """
+    skala = min(rozmiar[0] / img.width, rozmiar[1] / img.height, 1.0)
+    docelowy = (max(1, round(img.width * skala)), max(1, round(img.height * skala)))
+    miniatura = img.resize(docelowy, Image.Resampling.BICUBIC, reducing_gap=2.0)
+    if miniatura.mode == "RGBX":
+        return miniatura.convert("RGB")
+    return miniatura
+
+
+def _wymaga_kodowania(options):
+    """
+    Sprawdza, czy ustawienia wymagają ponownego kodowania także plików już
+    w formacie docelowym (jakość lub profil inne niż domyślne, limit
+    rozmiaru pliku, wiele wyjść).
+    """
+    return bool(
+        options.quality != DEFAULT_QUALITY
+        or options.profile != DEFAULT_PROFILE
+        or options.max_output_bytes
+        or options.outputs
+    )
+
+
+def _mozna_przepuscic(source, options, data=None):
+    """
+    Sprawdza według nagłówka, czy źródło jest już w formacie docelowym.
+    Nieczytelne pliki nie są przepuszczane - błąd zgłosi zwykła konwersja.
+    """
+    try:
+        with Image.open(io.BytesIO(data) if data is not None else source) as img:
+            format_zrodla = img.format
+    except BLEDY_KONWERSJI:
+        return False
+    return format_zrodla in FORMATY_PRZEPUSZCZANE.get(options.format, ())
+
+
+def _przepusc(source, target, options, start, data=None):
+    """
+    Przepisuje plik bez dekodowania i kodowania (options.passthrough), gdy
+    źródło jest już w formacie docelowym, a ustawienia nie wymagają
+    ponownego kodowania.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        target (str): Ścieżka pliku docelowego
+        options (ConversionOptions): Ustawienia konwersji
+        start (float): Czas rozpoczęcia (time.perf_counter)
+        data (bytes): Zawartość pliku wczytana wcześniej (opcjonalnie)
+
+    Returns:
+        ConversionResult: Wynik albo None, gdy plik wymaga konwersji
+    """
+    if options.passthrough == PASSTHROUGH_OFF or _wymaga_kodowania(options):
+        return None
+    if not _mozna_przepuscic(source, options, data):
+        return None
+    if options.layout != LAYOUT_FLAT:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    sposob = _przepisz_plik(
+        source,
+        target,
+        link=options.passthrough == PASSTHROUGH_LINK,
+        fsync=options.output_fsync == "file",
+    )
+    skrot = None
+    if options.hash_content:
+        skrot = hash_bytes(data) if data is not None else hash_file(source)
+    return ConversionResult(
+        source,
+        target,
+        STATUS_OK,
+        duration=time.perf_counter() - start,
+        content_hash=skrot,
+        passthrough=sposob,
+    )
+
+
+def output_cache_key(content_hash, options):
+    """
+    Klucz pamięci wyników: zawartość źródła, format i parametry kodera
+    (ustawienia nie wpływające na bajty wyniku, np. układ, są pomijane).
+
+    Args:
+        content_hash (str): Skrót zawartości pliku źródłowego
+        options (ConversionOptions): Ustawienia konwersji
+
+    Returns:
+        str: Klucz wpisu (outputcache.cache_key)
+    """
+    ustawienia = {
+        "format": options.format,
+        "params": encoder_params(options.format, options.profile, options.quality),
+    }
+    if options.max_output_bytes:
+        ustawienia["max_output_bytes"] = options.max_output_bytes
+        ustawienia["size_tolerance"] = options.size_tolerance
+    return cache_key(content_hash, ustawienia)
+
+
+def _z_pamieci(source, target, options, skrot, start):
+    """
+    Przepisuje plik wynikowy z pamięci wyników (options.cache_dir).
+
+    Returns:
+        ConversionResult: Wynik albo None przy chybieniu
+    """
+    pamiec = shared_cache(options.cache_dir, options.cache_bytes, options.cache_link)
+    wpis = pamiec.lookup(output_cache_key(skrot, options))
+    if wpis is None:
+        return None
+    if options.layout != LAYOUT_FLAT:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        _przepisz_plik(
+            wpis, target, link=options.cache_link, fsync=options.output_fsync == "file"
+        )
+    except FileNotFoundError:
+        return None  # Wpis usunięty przez inny proces - zwykła konwersja
+    return ConversionResult(
+        source,
+        target,
+        STATUS_OK,
+        duration=time.perf_counter() - start,
+        content_hash=skrot,
+        cached=True,
+    )
+
+
+def convert_file(source, options, target=None, data=None):
+    """
+    Konwertuje jeden plik i zwraca rekord wyniku.
+    Plik źródłowy jest czytany jednym odczytem i dekodowany dokładnie raz;
+    miniatura (jeśli potrzebna) powstaje z tego samego zdekodowanego obrazu.
+    Przy options.passthrough plik już w formacie docelowym jest przepisywany
+    bez dekodowania (bez miniatury); tak samo plik znaleziony w pamięci
+    wyników (options.cache_dir). Nowe wyniki dodaje do pamięci convert_batch.
+    Nie rzuca wyjątków dla uszkodzonych, zbyt dużych ani niezapisywalnych
+    plików - błąd trafia do rekordu, więc jeden plik nie przerywa partii.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        options (ConversionOptions): Ustawienia konwersji
+        target (str): Ścieżka docelowa (domyślnie wyznaczana przez target_path)
+        data (bytes): Zawartość pliku wczytana wcześniej (np. przez
+            Prefetcher); None - plik jest czytany z dysku
+
+    Returns:
+        ConversionResult: Wynik konwersji pliku
+    """
+    if target is None:
+        target = target_path(source, options)
+    start = time.perf_counter()
+    miniatura = None
+    skrot = None
+    wyjscia = None
+    try:
+        przepuszczony = _przepusc(source, target, options, start, data)
+        if przepuszczony is not None:
+            return przepuszczony
+        dane = data
+        if dane is None:
+            with open(source, "rb") as f:
+                dane = f.read()
+        if options.hash_content or _pamiec_wynikow(options):
+            skrot = hash_bytes(dane)
+        if _pamiec_wynikow(options):
+            z_pamieci = _z_pamieci(source, target, options, skrot, start)
+            if z_pamieci is not None:
+                return z_pamieci
+        with Image.open(io.BytesIO(dane)) as img:
+            _sprawdz_piksele(img, options)
+            # Pełne dekodowanie wykrywa uszkodzone pliki (zamiast verify())
+            img.load()
+            if options.layout != LAYOUT_FLAT:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+            if options.outputs:
+                wersje = _wersje(img, options)
+                wyjscia = _zapisz_wyjscia(wersje, target, options)
+                if options.thumbnail_size:
+                    miniatura = _miniatura(_najmniejsza(wersje), options.thumbnail_size)
+            else:
+                _zapisz_obraz(img, target, options)
+                if options.thumbnail_size:
+                    img.thumbnail(options.thumbnail_size)
+                    miniatura = img.copy()
+    except BLEDY_KONWERSJI as e:
+        return _wynik_bledu(source, target, e, start)
+    return ConversionResult(
+        source,
+        target,
+        STATUS_OK,
+        duration=time.perf_counter() - start,
+        thumbnail=miniatura,
+        content_hash=skrot,
+        cached=False if _pamiec_wynikow(options) else None,
+        outputs=wyjscia,
+    )
+
+
+# =========================================
+# Planowanie plików docelowych i konfliktów
+# =========================================
+@dataclass
+class PlannedItem:
+    """
+    Pozycja planu konwersji.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+        target (str): Ścieżka pliku docelowego (po ewentualnej zmianie nazwy)
+        action (str): ACTION_CONVERT, ACTION_SKIP lub ACTION_UNCHANGED
+        conflict (bool): True jeśli plik docelowy już istniał
+        fingerprint (tuple): (rozmiar, mtime_ns) źródła w trybie przyrostowym
+        memory (int): Szacunek pamięci (estimate_memory), gdy nagłówek był
+            już czytany przy układaniu planu (schedule_plan)
+    """
+
+    source: str
+    target: str
+    action: str = ACTION_CONVERT
+    conflict: bool = False
+    fingerprint: Optional[Tuple[int, int]] = None
+    memory: Optional[int] = None
+
+
+def _istniejace_nazwy(folder):
+    """
+    Zwraca nazwy plików w folderze jednym odczytem katalogu
+    (zamiast os.path.exists dla każdego pliku docelowego).
+
+    Args:
+        folder (str): Ścieżka folderu
+
+    Returns:
+        set: Nazwy plików znormalizowane przez os.path.normcase
+    """
+    try:
+        with os.scandir(folder) as wpisy:
+            return {os.path.normcase(wpis.name) for wpis in wpisy}
+    except OSError:
+        return set()
+
+
+def _wolna_nazwa(target, zajete, options, numer=1):
+    """
+    Znajduje wolną nazwę pliku dopisując " (1)", " (2)"... do rdzenia
+    nazwy (przed suffix wyjścia i rozszerzeniem). Przy wielu wyjściach
+    numer jest wspólny i wolne muszą być wszystkie ich ścieżki.
+
+    Args:
+        target (str): Pierwotna ścieżka docelowa (pierwszego wyjścia)
+        zajete (set): Zajęte ścieżki (os.path.normcase)
+        options (ConversionOptions): Ustawienia konwersji
+        numer (int): Pierwszy sprawdzany numer (np. zapamiętany dla tej nazwy)
+
+    Returns:
+        tuple: (wolna ścieżka docelowa pierwszego wyjścia, użyty numer)
+    """
+    rdzen = _rdzen_nazwy(target, options)
+    while True:
+        kandydaci = _sciezki_wyjsc(f"{rdzen} ({numer})", options)
+        if not any(os.path.normcase(c) in zajete for c in kandydaci):
+            return kandydaci[0], numer
+        numer += 1
+
+
+def _cel_nowszy(source, target):
+    """True jeśli plik docelowy jest nowszy lub tak samo nowy jak źródło."""
+    try:
+        return os.stat(target).st_mtime >= os.stat(source).st_mtime
+    except OSError:
+        return False
+
+
+def manifest_settings(options):
+    """
+    Zwraca ustawienia konwersji, od których zależy zawartość pliku
+    wynikowego - ich zmiana unieważnia wpis w manifeście.
+
+    Args:
+        options (ConversionOptions): Ustawienia konwersji
+
+    Returns:
+        dict: Ustawienia zapisywane w manifeście
+    """
+    ustawienia = {"format": options.format, "quality": options.quality}
+    # Układ zmienia ścieżki wynikowe; domyślny nie jest zapisywany, aby
+    # manifesty sprzed wprowadzenia układów pozostały ważne
+    if options.layout != LAYOUT_FLAT:
+        ustawienia["layout"] = options.layout
+    if options.name_template != NAME_TEMPLATE:
+        ustawienia["name_template"] = options.name_template
+    if options.profile != DEFAULT_PROFILE:
+        ustawienia["profile"] = options.profile
+    if options.passthrough != PASSTHROUGH_OFF:
+        ustawienia["passthrough"] = True
+    if options.max_output_bytes:
+        ustawienia["max_output_bytes"] = options.max_output_bytes
+        ustawienia["size_tolerance"] = options.size_tolerance
+    if options.outputs:
+        ustawienia["outputs"] = [asdict(wyjscie) for wyjscie in options.outputs]
+    return ustawienia
+
+
+def plan_batch(paths, options, manifest=None):
+    """
+    Wyznacza ścieżki docelowe dla całej partii przed rozpoczęciem pracy
+    i rozstrzyga konflikty według options.conflict_policy. Dzięki temu
+    równoległe zadania nigdy nie czekają na decyzję użytkownika.
+    Konflikty wewnątrz partii (dwa źródła o tej samej nazwie docelowej)
+    są traktowane jak konflikt z istniejącym plikiem; przy polityce
+    "overwrite" późniejsze źródło nadpisuje wcześniejsze. Przy wielu
+    wyjściach (options.outputs) sprawdzane są ścieżki wszystkich wyjść,
+    a polityka dotyczy ich razem: konflikt jednego to konflikt pliku,
+    "rename" nadaje wszystkim wspólny numer, a "skip_if_newer" pomija plik,
+    gdy wszystkie wyjścia są nowsze od źródła. Każdy folder
+    docelowy (także podfoldery układów "tree" i "sharded") jest odczytywany
+    raz, przy pierwszym pliku, który do niego trafia.
+    Z manifestem (tryb przyrostowy) pliki niezmienione od poprzedniej
+    konwersji dostają akcję ACTION_UNCHANGED, niezależnie od polityki.
+
+    Args:
+        paths (iterable): Ścieżki plików źródłowych
+        options (ConversionOptions): Ustawienia konwersji
+        manifest (Manifest): Manifest konwersji przyrostowej (opcjonalnie)
+
+    Returns:
+        list: Lista PlannedItem w kolejności plików wejściowych
+
+    Raises:
+        ValueError: Gdy polityka konfliktów nie jest obsługiwana
+    """
+    polityka = options.conflict_policy
+    if polityka not in CONFLICT_POLICIES:
+        raise ValueError(f"Nieobsługiwana polityka konfliktów: {polityka}")
+    paths = list(paths)
+    options = resolve_layout(options, paths)
+
+    istniejace = set()
+    przejrzane = set()  # Foldery docelowe, których zawartość już odczytano
+    zaplanowane = {}  # normcase(target) -> indeks pozycji w planie
+    # Wszystkie zajęte nazwy (istniejące i zaplanowane), aktualizowane w miejscu,
+    # oraz następny numer do sprawdzenia dla każdej nazwy - zmiana nazw przy
+    # wielu kolizjach tej samej nazwy pozostaje liniowa
+    zajete = set(istniejace)
+    nastepny_numer = {}
+    ustawienia = manifest_settings(options)
+    plan = []
+    for source in paths:
+        odcisk = None
+        if manifest is not None:
+            try:
+                odcisk = fingerprint(source)
+            except OSError:
+                odcisk = None
+            poprzedni = odcisk and manifest.lookup(
+                source, ustawienia, odcisk, options.hash_content
+            )
+            if poprzedni:
+                for cel in output_targets(poprzedni, options):
+                    zaplanowane[os.path.normcase(cel)] = len(plan)
+                    zajete.add(os.path.normcase(cel))
+                plan.append(PlannedItem(source, poprzedni, ACTION_UNCHANGED))
+                continue
+        target = target_path(source, options)
+        folder = os.path.dirname(target)
+        if folder not in przejrzane:
+            przejrzane.add(folder)
+            nowe = {
+                os.path.normcase(os.path.join(folder, nazwa))
+                for nazwa in _istniejace_nazwy(folder)
+            }
+            istniejace |= nowe
+            zajete |= nowe
+        cele = output_targets(target, options)
+        klucze = [os.path.normcase(cel) for cel in cele]
+        # Wcześniejsze pozycje planu z tymi samymi ścieżkami wyjść
+        wczesniejsze = {zaplanowane[k] for k in klucze if k in zaplanowane}
+        konflikt = bool(wczesniejsze) or any(k in istniejace for k in klucze)
+        pozycja = PlannedItem(source, target, conflict=konflikt, fingerprint=odcisk)
+        if konflikt:
+            if polityka == "skip":
+                pozycja.action = ACTION_SKIP
+            elif polityka == "rename":
+                pozycja.target, numer = _wolna_nazwa(
+                    target, zajete, options, nastepny_numer.get(klucze[0], 1)
+                )
+                nastepny_numer[klucze[0]] = numer + 1
+                klucze = [
+                    os.path.normcase(cel)
+                    for cel in output_targets(pozycja.target, options)
+                ]
+            elif polityka == "skip_if_newer":
+                if wczesniejsze or all(_cel_nowszy(source, cel) for cel in cele):
+                    pozycja.action = ACTION_SKIP
+            elif wczesniejsze:
+                # "overwrite": późniejsze źródło wygrywa, wcześniejsze pomijamy
+                # (chyba że wcześniejsze jest niezmienionym wynikiem z manifestu)
+                if any(plan[i].action == ACTION_UNCHANGED for i in wczesniejsze):
+                    pozycja.action = ACTION_SKIP
+                else:
+                    for i in wczesniejsze:
+                        plan[i].action = ACTION_SKIP
+        if pozycja.action == ACTION_CONVERT:
+            for klucz in klucze:
+                zaplanowane[klucz] = len(plan)
+                zajete.add(klucz)
+        plan.append(pozycja)
+    return plan
+
+
+def find_conflicts(paths, options):
+    """
+    Zwraca ścieżki plików docelowych, które już istnieją lub powtarzają się
+    w partii - np. aby zapytać użytkownika o politykę raz, przed konwersją.
+
+    Args:
+        paths (iterable): Ścieżki plików źródłowych
+        options (ConversionOptions): Ustawienia konwersji
+
+    Returns:
+        list: Ścieżki docelowe w konflikcie
+    """
+    paths = list(paths)
+    options = resolve_layout(options, paths)
+    istniejace = {}  # folder docelowy -> nazwy istniejących plików
+    widziane = set()
+    konflikty = []
+    for source in paths:
+        target = target_path(source, options)
+        folder = os.path.dirname(target)
+        if folder not in istniejace:
+            istniejace[folder] = _istniejace_nazwy(folder)
+        # Przy wielu wyjściach konflikt dowolnego wyjścia to konflikt pliku
+        klucze = [os.path.normcase(cel) for cel in output_targets(target, options)]
+        if any(
+            os.path.basename(k) in istniejace[folder] or k in widziane for k in klucze
+        ):
+            konflikty.append(target)
+        widziane.update(klucze)
+    return konflikty
+
+
+# =========================================
+# Kolejność wykonania
+# =========================================
+def _odczytaj_naglowek(source):
+    """
+    Odczytuje wymiary i tryb obrazu z nagłówka (bez dekodowania pikseli).
+
+    Returns:
+        tuple: ((szerokość, wysokość), tryb) albo None dla nieczytelnych
+    """
+    try:
+        with Image.open(source) as img:
+            return img.size, img.mode
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def probe_cost(source):
+    """
+    Szacuje koszt konwersji pliku z nagłówka, bez dekodowania pikseli.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+
+    Returns:
+        tuple: (liczba_pikseli, rozmiar_w_bajtach); 0 dla nieczytelnych
+    """
+    return _koszt(*_sonduj(source))
+
+
+def _sonduj(source):
+    """
+    Odczytuje rozmiar pliku i nagłówek obrazu - jeden odczyt dla kolejności
+    (probe_cost) i budżetu pamięci (estimate_memory).
+
+    Returns:
+        tuple: (rozmiar albo None dla nieistniejących, nagłówek albo None)
+    """
+    try:
+        rozmiar = os.path.getsize(source)
+    except OSError:
+        return None, None
+    return rozmiar, _odczytaj_naglowek(source)
+
+
+def _koszt(rozmiar, naglowek):
+    """Koszt konwersji (piksele, bajty) z wyniku _sonduj."""
+    if rozmiar is None:
+        return 0, 0
+    if naglowek is None:
+        # Uszkodzony plik zakończy się szybko błędem - na koniec kolejki
+        return 0, rozmiar
+    (szerokosc, wysokosc), _ = naglowek
+    return szerokosc * wysokosc, rozmiar
+
+
+def _klucz_polozenia(source):
+    """Klucz kolejności według położenia na dysku: (folder, i-węzeł)."""
+    folder = os.path.normcase(os.path.dirname(os.path.abspath(source)))
+    try:
+        return folder, os.stat(source).st_ino
+    except OSError:
+        return folder, 0
+
+
+def schedule_plan(plan, policy):
+    """
+    Układa plan w kolejności wykonania. Pozycje pominięte i niezmienione
+    (bez pracy) trafiają na początek, pozostałe są sortowane według polityki:
+    "largest_first" - malejąco według liczby pikseli, potem rozmiaru pliku
+    (przy wielu zadaniach największy plik nie zostaje na sam koniec),
+    "locality" - według folderu i numeru i-węzła (odczyt zbliżony do
+    sekwencyjnego). Sortowanie jest stabilne.
+
+    Args:
+        plan (list): Lista PlannedItem
+        policy (str): Polityka kolejności (SCHEDULES)
+
+    Returns:
+        list: Plan w kolejności wykonania
+
+    Raises:
+        ValueError: Gdy polityka nie jest obsługiwana
+    """
+    if policy not in SCHEDULES:
+        raise ValueError(f"Nieobsługiwana kolejność wykonania: {policy}")
+    if policy == SCHEDULE_INPUT:
+        return plan
+    bez_pracy = [pozycja for pozycja in plan if pozycja.action != ACTION_CONVERT]
+    do_konwersji = [pozycja for pozycja in plan if pozycja.action == ACTION_CONVERT]
+    if policy == SCHEDULE_LARGEST_FIRST:
+        koszty = {}
+        for pozycja in do_konwersji:
+            rozmiar, naglowek = _sonduj(pozycja.source)
+            koszty[pozycja.source] = _koszt(rozmiar, naglowek)
+            # Ten sam odczyt nagłówka służy budżetowi pamięci (memory_budget)
+            pozycja.memory = _szacunek_pamieci(rozmiar, naglowek)
+        do_konwersji.sort(key=lambda pozycja: koszty[pozycja.source], reverse=True)
+    else:
+        do_konwersji.sort(key=lambda pozycja: _klucz_polozenia(pozycja.source))
+    return bez_pracy + do_konwersji
+
+
+# =========================================
+# Budżet pamięci
+# =========================================
+def estimate_memory(source):
+    """
+    Szacuje szczytowe zużycie pamięci konwersji pliku z nagłówka:
+    odczytany plik + zdekodowany obraz (szerokość x wysokość x bajty
+    na piksel) z narzutem kodera NARZUT_PAMIECI. Pillow przechowuje
+    obrazy 3- i 4-kanałowe 8-bitowe w 4 bajtach na piksel.
+
+    Args:
+        source (str): Ścieżka pliku źródłowego
+
+    Returns:
+        int: Szacowana liczba bajtów (0 dla nieistniejących plików)
+    """
+    return _szacunek_pamieci(*_sonduj(source))
+
+
+def _szacunek_pamieci(rozmiar, naglowek):
+    """Szacunek pamięci (estimate_memory) z wyniku _sonduj."""
+    if rozmiar is None:
+        return 0
+    if naglowek is None:
+        return rozmiar
+    (szerokosc, wysokosc), tryb = naglowek
+    try:
+        opis = ImageMode.getmode(tryb)
+        bajty = len(opis.bands) * int(opis.typestr[-1])
+    except (KeyError, ValueError):
+        bajty = 4
+    if bajty == 3:
+        bajty = 4
+    return rozmiar + int(szerokosc * wysokosc * bajty * (1 + NARZUT_PAMIECI))
+
+
+def default_memory_budget(fraction=0.5):
+    """
+    Zwraca domyślny budżet pamięci - część pamięci fizycznej komputera.
+
+    Args:
+        fraction (float): Część pamięci fizycznej przeznaczona na konwersję
+
+    Returns:
+        int: Budżet w bajtach albo None, gdy system nie podaje rozmiaru pamięci
+    """
+    try:
+        pamiec = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+    return int(pamiec * fraction) if pamiec > 0 else None
+
+
+class _SzacunkiPamieci:
+    """
+    Szacunki pamięci plików partii (estimate_memory) dla budżetu pamięci.
+    Szacunki zapisane w planie (nagłówek czytany już przy schedule_plan) są
+    używane bez ponownego odczytu; pozostałe nagłówki są czytane z
+    wyprzedzeniem w wątkach w tle, w kolejności planu, więc wątek zlecający
+    zadania zwykle dostaje gotowy szacunek.
+    """
+
+    def __init__(self, plan, workers=1):
+        """
+        Args:
+            plan (list): Plan w kolejności wykonania (PlannedItem)
+            workers (int): Liczba wątków czytających nagłówki
+        """
+        self._znane = {}
+        do_odczytu = []
+        for pozycja in plan:
+            if pozycja.action != ACTION_CONVERT:
+                continue
+            if pozycja.memory is not None:
+                self._znane[pozycja.source] = pozycja.memory
+            else:
+                do_odczytu.append(pozycja.source)
+        self._kolejne = iter(do_odczytu)
+        self._okno = 2 * max(1, workers)
+        self._oczekujace = {}  # ścieżka -> Future z szacunkiem
+        self._pula = None
+        if do_odczytu:
+            self._pula = ThreadPoolExecutor(
+                max_workers=max(1, workers), thread_name_prefix="imageflow-probe"
+            )
+
+    def get(self, source):
+        """
+        Zwraca szacunek pamięci pliku (czeka tylko na jego własny odczyt).
+
+        Args:
+            source (str): Ścieżka pliku źródłowego
+
+        Returns:
+            int: Szacowana liczba bajtów
+        """
+        koszt = self._znane.get(source)
+        if koszt is not None:
+            return koszt
+        self._dopelnij()
+        future = self._oczekujace.pop(source, None)
+        koszt = future.result() if future is not None else estimate_memory(source)
+        self._dopelnij()
+        return koszt
+
+    def close(self):
+        """Kończy odczyt nagłówków."""
+        if self._pula is not None:
+            for future in self._oczekujace.values():
+                future.cancel()
+            self._pula.shutdown(wait=True)
+            self._pula = None
+        self._oczekujace.clear()
+
+    def _dopelnij(self):
+        """Zleca odczyt kolejnych nagłówków do rozmiaru okna."""
+        if self._pula is None:
+            return
+        while len(self._oczekujace) < self._okno:
+            source = next(self._kolejne, None)
+            if source is None:
+                return
+            if source not in self._oczekujace:
+                self._oczekujace[source] = self._pula.submit(estimate_memory, source)
+
+
+def _podziel_budzet(options, tryb):
+    """
+    Odlicza bufor wczytywania z wyprzedzeniem od budżetu pamięci - bajty
+    czekające w buforze (Prefetcher) też zajmują pamięć. Bufor dostaje
+    najwyżej połowę budżetu.
+
+    Returns:
+        ConversionOptions: Ustawienia z pomniejszonym memory_budget
+            i prefetch_bytes (albo bez zmian)
+    """
+    budzet = options.memory_budget
+    # Pula procesów tylko doradza systemowi (fadvise) - bufor jest pusty
+    if not budzet or options.prefetch <= 0 or tryb in ("serial", "process"):
+        return options
+    rezerwa = min(options.prefetch_bytes, budzet // 2)
+    return replace(options, prefetch_bytes=rezerwa, memory_budget=budzet - rezerwa)
+
+
+def _czekaj_na_budzet(koszty, koszt, budzet):
+    """
+    Czeka, aż zadania w toku zwolnią dość budżetu pamięci dla nowego
+    zadania. Gdy nic nie jest w toku, zadanie startuje zawsze.
+
+    Args:
+        koszty (dict): Future -> szacowana pamięć zadania (aktualizowany)
+        koszt (int): Szacowana pamięć nowego zadania
+        budzet (int): Budżet pamięci
+    """
+    while True:
+        for future in [f for f in koszty if f.done()]:
+            del koszty[future]
+        if not koszty or sum(koszty.values()) + koszt <= budzet:
+            return
+        wait(list(koszty), return_when=FIRST_COMPLETED)
+
+
+# =========================================
+# Wczytywanie z wyprzedzeniem
+# =========================================
+class Prefetcher:
+    """
+    Wczytuje kolejne pliki partii w wątku w tle, zanim przyjdzie ich kolej,
+    więc opóźnienia dysków sieciowych (NFS/SMB) nakładają się na konwersję
+    poprzednich plików. Bufor jest ograniczony liczbą plików i bajtów.
+    W trybie advise_only (pula procesów - dane i tak czyta proces) zamiast
+    wczytywania zgłasza systemowi posix_fadvise(WILLNEED).
+    Konsument nigdy nie czeka na miejsce w buforze: plik, do którego
+    wątek jeszcze nie doszedł, konsument czyta sam, a wątek go pomija.
+    """
+
+    def __init__(
+        self,
+        paths,
+        max_files=8,
+        max_bytes=PREFETCH_BYTES,
+        cancel=None,
+        advise_only=False,
+    ):
+        """
+        Args:
+            paths (iterable): Ścieżki w kolejności konwersji
+            max_files (int): Maksymalna liczba plików w buforze
+            max_bytes (int): Limit bajtów w buforze (może go przekroczyć
+                jeden plik - gdy bufor jest pusty)
+            cancel (callable): Funkcja bez argumentów; True kończy wczytywanie
+            advise_only (bool): Tylko posix_fadvise, bez wczytywania danych
+        """
+        self.max_files = max(1, max_files)
+        self.max_bytes = max_bytes
+        self.advise_only = advise_only
+        self._sciezki = list(paths)
+        self._cancel = cancel
+        self._bufor = {}  # ścieżka -> (dane lub None w trybie advise, bajty)
+        self._bajty = 0
+        self._czytany = None  # Ścieżka wczytywana w tej chwili
+        self._pobrane = set()  # Ścieżki, których konsument już zażądał
+        self._stop = False
+        self._warunek = threading.Condition()
+        self._watek = threading.Thread(
+            target=self._czytaj, name="imageflow-prefetch", daemon=True
+        )
+        self._watek.start()
+
+    @property
+    def bytes(self):
+        """Liczba bajtów plików czekających w buforze"""
+        return self._bajty
+
+    def get(self, path):
+        """
+        Zwraca wczytaną zawartość pliku i zwalnia jej miejsce w buforze.
+        Czeka tylko wtedy, gdy plik jest właśnie wczytywany.
+
+        Args:
+            path (str): Ścieżka pliku
+
+        Returns:
+            bytes: Zawartość pliku albo None (konsument czyta plik sam)
+        """
+        with self._warunek:
+            self._pobrane.add(path)
+            while self._czytany == path:
+                self._warunek.wait()
+            dane, rozmiar = self._bufor.pop(path, (None, 0))
+            self._bajty -= rozmiar
+            self._warunek.notify_all()
+        return dane
+
+    def close(self):
+        """Kończy wczytywanie i zwalnia bufor."""
+        with self._warunek:
+            self._stop = True
+            self._warunek.notify_all()
+        self._watek.join()
+        self._bufor.clear()
+        self._bajty = 0
+
+    def _przerwane(self):
+        return self._stop or (self._cancel is not None and self._cancel())
+
+    def _czytaj(self):
+        """Wątek wczytujący pliki w kolejności konwersji."""
+        for path in self._sciezki:
+            with self._warunek:
+                while self._bufor and (
+                    len(self._bufor) >= self.max_files or self._bajty >= self.max_bytes
+                ):
+                    if self._przerwane():
+                        return
+                    self._warunek.wait(0.1)
+                if self._przerwane():
+                    return
+                if path in self._pobrane:
+                    continue
+                self._czytany = path
+            try:
+                wpis = self._wczytaj(path)
+            finally:
+                with self._warunek:
+                    self._czytany = None
+                    if wpis is not None and path not in self._pobrane:
+                        self._bufor[path] = wpis
+                        self._bajty += wpis[1]
+                    self._warunek.notify_all()
+
+    def _wczytaj(self, path):
+        """Wczytuje plik (albo zgłasza fadvise); None przy błędzie odczytu."""
+        try:
+            if self.advise_only:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    rozmiar = os.fstat(fd).st_size
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+                return None, rozmiar
+            with open(path, "rb") as f:
+                dane = f.read()
+            return dane, len(dane)
+        except OSError:
+            # Błąd odczytu zgłosi konwersja pliku
+            return None
+
+
+def _utworz_wyprzedzenie(plan, options, tryb, cancel):
+    """
+    Tworzy Prefetcher dla plików do konwersji (options.prefetch > 0).
+    W puli procesów używa posix_fadvise, a gdy system go nie ma -
+    wyprzedzenie jest pomijane.
+
+    Returns:
+        Prefetcher: Wczytywanie z wyprzedzeniem albo None
+    """
+    if options.prefetch <= 0:
+        return None
+    tylko_porada = tryb == "process"
+    if tylko_porada and not hasattr(os, "posix_fadvise"):
+        return None
+    return Prefetcher(
+        [pozycja.source for pozycja in plan if pozycja.action == ACTION_CONVERT],
+        max_files=options.prefetch,
+        max_bytes=options.prefetch_bytes,
+        cancel=cancel,
+        advise_only=tylko_porada,
+    )
+
+
+def _konwertuj_z_wyprzedzeniem(wyprzedzenie, source, options, target):
+    """Konwertuje plik z danych wczytanych z wyprzedzeniem (wątek puli)."""
+    return convert_file(source, options, target, data=wyprzedzenie.get(source))
+
+
+def _zlec(pula, zadanie, options, wyprzedzenie):
+    """
+    Zleca konwersję pliku w puli; z wyprzedzeniem w trybie advise_only
+    (pula procesów) miejsce w buforze jest zwalniane przy zleceniu.
+    """
+    source, target = zadanie
+    if wyprzedzenie is None:
+        return pula.submit(convert_file, source, options, target)
+    if wyprzedzenie.advise_only:
+        wyprzedzenie.get(source)
+        return pula.submit(convert_file, source, options, target)
+    return pula.submit(
+        _konwertuj_z_wyprzedzeniem, wyprzedzenie, source, options, target
+    )
+
+
+# =========================================
+# Wybór trybu wykonania
+# =========================================
+def resolve_executor(options, paths):
+    """
+    Wyznacza tryb wykonania i liczbę zadań dla danej partii plików.
+    Tryb "auto" wybiera pulę procesów dla plików kosztownych w dekodowaniu
+    (HEIC), pulę wątków dla pozostałych i tryb szeregowy dla jednego pliku.
+
+    Args:
+        options (ConversionOptions): Ustawienia konwersji
+        paths (list): Ścieżki plików źródłowych
+
+    Returns:
+        tuple: (tryb, liczba_zadan)
+
+    Raises:
+        ValueError: Gdy tryb wykonania nie jest obsługiwany
+    """
+    if options.executor not in EXECUTORS:
+        raise ValueError(f"Nieobsługiwany tryb wykonania: {options.executor}")
+    workers = max(1, options.workers or os.cpu_count() or 1)
+    if options.executor == "serial":
+        return "serial", 1
+    if options.executor != "auto":
+        return options.executor, workers
+    if workers == 1 or len(paths) < 2:
+        return "serial", 1
+    if any(os.path.splitext(p)[1].lower() in ROZSZERZENIA_CPU for p in paths):
+        return "process", workers
+    return "thread", workers
+
+
+def _ustaw_limit_pikseli(limit):
+    """Ustawia globalny limit pikseli Pillow w procesie puli."""
+    Image.MAX_IMAGE_PIXELS = limit
+
+
+def _utworz_pule(tryb, workers):
+    """
+    Tworzy pulę wykonawczą dla trybu "thread" lub "process".
+
+    Args:
+        tryb (str): "thread" lub "process"
+        workers (int): Liczba równoległych zadań
+
+    Returns:
+        concurrent.futures.Executor: Pula wykonawcza
+    """
+    if tryb == "process":
+        # "spawn" zamiast "fork" - silnik bywa wywoływany z wątku roboczego GUI,
+        # a fork wielowątkowego procesu może zakleszczyć się na blokadach.
+        # Nowe procesy dostają globalny limit pikseli procesu wywołującego.
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_ustaw_limit_pikseli,
+            initargs=(Image.MAX_IMAGE_PIXELS,),
+        )
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="imageflow")
+
+
+# =========================================
+# Konwersja wsadowa
+# =========================================
+def _zadania(plan, cancel):
+    """
+    Generator zadań konwersji. Zwraca gotowy ConversionResult dla plików
+    pominiętych w planie albo parę (source, target) dla plików do konwersji.
+    Kończy się wcześniej, gdy cancel() zwróci True.
+    """
+    for pozycja in plan:
+        if cancel is not None and cancel():
+            logger.info("Konwersja anulowana")
+            return
+        if pozycja.action == ACTION_SKIP:
+            yield ConversionResult(pozycja.source, pozycja.target, STATUS_SKIPPED)
+            continue
+        if pozycja.action == ACTION_UNCHANGED:
+            yield ConversionResult(pozycja.source, pozycja.target, STATUS_UNCHANGED)
+            continue
+        yield pozycja.source, pozycja.target
+
+
+def _odbierz_wyniki(oczekujace, ordered):
+    """
+    Odbiera co najmniej jeden zakończony wynik z kolejki zadań w toku.
+
+    Args:
+        oczekujace (deque): Zadania (Future) w kolejności zlecenia
+        ordered (bool): True zachowuje kolejność plików wejściowych
+
+    Yields:
+        ConversionResult: Wyniki zakończonych zadań
+    """
+    if ordered:
+        zakonczone = [oczekujace.popleft()]
+    else:
+        zakonczone, _ = wait(oczekujace, return_when=FIRST_COMPLETED)
+        for future in zakonczone:
+            oczekujace.remove(future)
+    for future in zakonczone:
+        if not future.cancelled():
+            yield future.result()
+
+
+def _konwertuj_rownolegle(
+    zadania, options, tryb, workers, cancel, wyprzedzenie=None, szacunki=None
+):
+    """
+    Wykonuje zadania konwersji w puli wątków lub procesów.
+    Liczba zadań w toku jest ograniczona do 2 x workers, aby anulowanie
+    działało szybko, a pamięć nie rosła z rozmiarem partii.
+    Z budżetem pamięci (options.memory_budget) zadanie startuje dopiero,
+    gdy jego szacunek (estimate_memory; szacunki - _SzacunkiPamieci)
+    mieści się w pozostałym budżecie. Pliki większe niż cały budżet trafiają
+    do osobnej puli z jednym zadaniem - szczytowe zużycie to budżet plus
+    jeden taki plik.
+    """
+    limit = workers * 2
+    budzet = options.memory_budget
+    oczekujace = deque()
+    koszty = {}  # Future -> szacowana pamięć zadania w toku
+    pula = _utworz_pule(tryb, workers)
+    pula_duzych = None
+    try:
+        for zadanie in zadania:
+            if isinstance(zadanie, ConversionResult):
+                future = Future()
+                future.set_result(zadanie)
+            else:
+                koszt = 0
+                if budzet:
+                    koszt = (
+                        szacunki.get(zadanie[0])
+                        if szacunki is not None
+                        else estimate_memory(zadanie[0])
+                    )
+                if budzet and koszt > budzet:
+                    if pula_duzych is None:
+                        pula_duzych = _utworz_pule(tryb, 1)
+                    future = _zlec(pula_duzych, zadanie, options, wyprzedzenie)
+                else:
+                    if budzet:
+                        _czekaj_na_budzet(koszty, koszt, budzet)
+                    future = _zlec(pula, zadanie, options, wyprzedzenie)
+                    if budzet:
+                        koszty[future] = koszt
+            oczekujace.append(future)
+            while len(oczekujace) >= limit:
+                yield from _odbierz_wyniki(oczekujace, options.ordered)
+        if cancel is not None and cancel():
+            for future in oczekujace:
+                future.cancel()
+        while oczekujace:
+            yield from _odbierz_wyniki(oczekujace, options.ordered)
+    finally:
+        # Przerwana iteracja - nie zaczynaj zadań, na które nikt nie czeka
+        for future in oczekujace:
+            future.cancel()
+        pula.shutdown(wait=True)
+        if pula_duzych is not None:
+            pula_duzych.shutdown(wait=True)
+
+
+def _konwertuj_szeregowo(zadania, options, wyprzedzenie=None):
+    """Wykonuje zadania konwersji po kolei w bieżącym wątku."""
+    for zadanie in zadania:
+        if isinstance(zadanie, ConversionResult):
+            yield zadanie
+        elif wyprzedzenie is not None:
+            yield _konwertuj_z_wyprzedzeniem(
+                wyprzedzenie, zadanie[0], options, zadanie[1]
+            )
+        else:
+            yield convert_file(zadanie[0], options, zadanie[1])
+
+
+# =========================================
+# Potok etapowy
+# =========================================
+class _ElementPotoku:
+    """Stan pliku przekazywany między etapami potoku."""
+
+    __slots__ = (
+        "numer",
+        "source",
+        "target",
+        "start",
+        "dane",
+        "obraz",
+        "blok",
+        "miniatura",
+        "wersje",
+        "skrot",
+        "koszt",
+        "wynik",
+    )
+
+    def __init__(self, numer, source, target, wynik=None):
+        self.numer = numer
+        self.source = source
+        self.target = target
+        self.start = time.perf_counter()
+        self.dane = None
+        self.obraz = None
+        self.blok = None  # Blok pamięci współdzielonej z pikselami obrazu
+        self.miniatura = None
+        self.wersje = None  # Obrazy dla options.outputs (tryb wielu wyjść)
+        self.skrot = None
+        self.koszt = 0  # Szacunek pamięci zajęty z budżetu (memory_budget)
+        self.wynik = wynik
+
+
+# Znacznik końca strumienia w kolejkach potoku
+_KONIEC = object()
+
+
+def _dekoduj_do_ramki(dane, nazwa_bloku):
+    """
+    Dekoduje obraz w procesie potomnym i zapisuje piksele w bloku pamięci
+    współdzielonej (funkcja modułu - musi dać się przekazać do puli procesów).
+
+    Args:
+        dane (bytes): Zawartość pliku źródłowego
+        nazwa_bloku (str): Nazwa bloku na piksele
+
+    Returns:
+        Frame: Opis obrazu w bloku
+    """
+    with Image.open(io.BytesIO(dane)) as img:
+        img.load()
+        return write_frame(img, nazwa_bloku)
+
+
+class StagedPipeline:
+    """
+    Potok etapowy: odczyt -> dekodowanie -> przekształcenie -> kodowanie
+    i zapis. Etapy łączą ograniczone kolejki, a każdy etap ma własną liczbę
+    wątków, więc odczyt i zapis na dysku nakładają się na pracę kodeków
+    (Pillow zwalnia GIL przy dekodowaniu, skalowaniu i kodowaniu).
+    Liczba plików w potoku (także czekających na kolejność wyników) jest
+    ograniczona, więc pamięć nie rośnie z rozmiarem partii. Z budżetem
+    pamięci (options.memory_budget) plik wchodzi do potoku dopiero, gdy jego
+    szacunek mieści się w pozostałym budżecie (plik większy niż cały budżet
+    czeka na pusty potok); szacunek obejmuje piksele w pamięci
+    współdzielonej, a bezczynne bloki jej puli są odliczane od budżetu.
+    Po przebiegu utilization() pokazuje, który etap jest wąskim gardłem.
+    """
+
+    def __init__(self, options, workers=None, prefetcher=None, estimates=None):
+        """
+        Args:
+            options (ConversionOptions): Ustawienia konwersji
+                (options.pipeline_workers nadpisuje liczbę wątków etapów)
+            workers (int): Liczba wątków etapów obliczeniowych
+                (domyślnie liczba rdzeni CPU)
+            prefetcher (Prefetcher): Źródło danych wczytanych z wyprzedzeniem
+                dla etapu odczytu (opcjonalnie)
+            estimates (_SzacunkiPamieci): Szacunki pamięci plików dla budżetu
+                (domyślnie estimate_memory w wątku podającym zadania)
+
+        Raises:
+            ValueError: Gdy pipeline_workers zawiera nieznany etap
+        """
+        workers = max(1, workers or os.cpu_count() or 1)
+        self.options = options
+        self.prefetcher = prefetcher
+        self.workers = {
+            STAGE_READ: 2,
+            STAGE_DECODE: workers,
+            STAGE_TRANSFORM: max(1, workers // 2),
+            STAGE_ENCODE: workers,
+        }
+        for etap, liczba in (options.pipeline_workers or {}).items():
+            if etap not in self.workers:
+                raise ValueError(f"Nieznany etap potoku: {etap}")
+            self.workers[etap] = max(1, int(liczba))
+        self.decode_processes = max(0, int(options.decode_processes or 0))
+        self.queue_size = max(2, workers)
+        # Pliki w potoku naraz: wypełnione kolejki, wątki i bufor kolejności
+        self.limit = 4 * workers
+        self._funkcje = {
+            STAGE_READ: self._odczyt,
+            STAGE_DECODE: self._dekodowanie,
+            STAGE_TRANSFORM: self._przeksztalcenie,
+            STAGE_ENCODE: self._kodowanie,
+        }
+        self._lock = threading.Lock()
+        self._zajetosc = dict.fromkeys(PIPELINE_STAGES, 0.0)
+        self._czas = 0.0
+        self._procesy = None  # Pula procesów dekodujących (decode_processes)
+        self._ramki = None  # Pula bloków pamięci współdzielonej
+        self.estimates = estimates
+        self._budzet = options.memory_budget or 0
+        self._ramki_bajty = SHARED_POOL_BYTES
+        if self._budzet and self.decode_processes:
+            # Bezczynne bloki puli też zajmują pamięć - część budżetu
+            self._ramki_bajty = min(SHARED_POOL_BYTES, self._budzet // 4)
+            self._budzet -= self._ramki_bajty
+        self._pamiec = threading.Condition()
+        self._pamiec_w_toku = 0  # Suma szacunków plików w potoku
+
+    def utilization(self):
+        """
+        Zwraca wykorzystanie etapów: czas pracy wątków etapu podzielony
+        przez czas przebiegu i liczbę wątków. Etap bliski 1.0 to wąskie
+        gardło - warto dać mu więcej wątków (pipeline_workers).
+
+        Returns:
+            dict: Etap -> wykorzystanie (0.0-1.0)
+        """
+        if not self._czas:
+            return dict.fromkeys(PIPELINE_STAGES, 0.0)
+        return {
+            etap: min(1.0, self._zajetosc[etap] / (self._czas * self.workers[etap]))
+            for etap in PIPELINE_STAGES
+        }
+
+    def run(self, zadania, cancel=None, ordered=True):
+        """
+        Przepuszcza zadania przez potok (generator).
+
+        Args:
+            zadania (iterable): ConversionResult (pliki bez pracy) albo
+                pary (source, target) - jak z _zadania
+            cancel (callable): Funkcja bez argumentów; True przerywa podawanie
+            ordered (bool): True zwraca wyniki w kolejności zadań
+
+        Yields:
+            ConversionResult: Wyniki kolejnych plików
+        """
+        kolejki = [queue.Queue(maxsize=self.queue_size) for _ in PIPELINE_STAGES]
+        wyjscie = queue.Queue()  # Nieograniczona - zajętość ogranicza semafor
+        wolne = threading.BoundedSemaphore(self.limit)
+        stop = threading.Event()
+        watki = [
+            threading.Thread(
+                target=self._zasilaj,
+                args=(zadania, cancel, kolejki[0], wyjscie, wolne, stop),
+                name="imageflow-pipeline-feed",
+                daemon=True,
+            )
+        ]
+        for i, etap in enumerate(PIPELINE_STAGES):
+            nastepna = kolejki[i + 1] if i + 1 < len(kolejki) else wyjscie
+            aktywne = [self.workers[etap]]  # Wątki etapu, które jeszcze działają
+            for _ in range(self.workers[etap]):
+                watki.append(
+                    threading.Thread(
+                        target=self._etap,
+                        args=(etap, kolejki[i], nastepna, wyjscie, aktywne, stop),
+                        name=f"imageflow-pipeline-{etap}",
+                        daemon=True,
+                    )
+                )
+        if self.decode_processes:
+            self._procesy = _utworz_pule("process", self.decode_processes)
+            self._ramki = SharedFramePool(self._ramki_bajty)
+        start = time.perf_counter()
+        for watek in watki:
+            watek.start()
+        try:
+            bufor = {}  # numer -> wynik czekający na wcześniejsze (ordered)
+            nastepny = 0
+            while True:
+                element = wyjscie.get()
+                if element is _KONIEC:
+                    break
+                if element.koszt:
+                    with self._pamiec:
+                        self._pamiec_w_toku -= element.koszt
+                        self._pamiec.notify_all()
+                if not ordered:
+                    wolne.release()
+                    yield element.wynik
+                    continue
+                bufor[element.numer] = element.wynik
+                while nastepny in bufor:
+                    wolne.release()
+                    yield bufor.pop(nastepny)
+                    nastepny += 1
+        finally:
+            stop.set()
+            for watek in watki:
+                watek.join()
+            self._czas += time.perf_counter() - start
+            if self._procesy is not None:
+                self._procesy.shutdown(wait=True)
+                self._ramki.close()
+                self._procesy = self._ramki = None
+            logger.info(
+                "Wykorzystanie etapów potoku: %s",
+                ", ".join(
+                    f"{etap} {udzial:.0%}"
+                    for etap, udzial in self.utilization().items()
+                ),
+            )
+
+    def _zasilaj(self, zadania, cancel, pierwsza, wyjscie, wolne, stop):
+        """Wątek podający zadania do pierwszego etapu (z przeciwciśnieniem)."""
+        try:
+            for numer, zadanie in enumerate(zadania):
+                while not wolne.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set() or (cancel is not None and cancel()):
+                    return
+                if isinstance(zadanie, ConversionResult):
+                    # Plik bez pracy - od razu do wyników
+                    wyjscie.put(_ElementPotoku(numer, None, None, wynik=zadanie))
+                    continue
+                koszt = self._przyjmij(zadanie[0], stop)
+                if koszt is None:
+                    return
+                element = _ElementPotoku(numer, zadanie[0], zadanie[1])
+                element.koszt = koszt
+                pierwsza.put(element)
+        finally:
+            pierwsza.put(_KONIEC)
+
+    def _przyjmij(self, source, stop):
+        """
+        Czeka, aż szacunek pamięci pliku zmieści się w budżecie
+        (memory_budget) - plik większy niż cały budżet czeka na pusty potok.
+
+        Returns:
+            int: Szacunek zajęty z budżetu (0 bez budżetu) albo None, gdy
+                potok został zatrzymany
+        """
+        if not self._budzet:
+            return 0
+        if self.estimates is not None:
+            koszt = self.estimates.get(source)
+        else:
+            koszt = estimate_memory(source)
+        with self._pamiec:
+            while self._pamiec_w_toku and self._pamiec_w_toku + koszt > self._budzet:
+                if stop.is_set():
+                    return None
+                self._pamiec.wait(0.1)
+            self._pamiec_w_toku += koszt
+        return koszt
+
+    def _etap(self, etap, wejscie, wyjscie_etapu, wyjscie, aktywne, stop):
+        """
+        Wątek etapu: przetwarza elementy i przekazuje je dalej. Element
+        z błędem (lub wynikiem) trafia od razu do wyników. Znacznik końca
+        wraca do kolejki dla pozostałych wątków etapu; ostatni z nich
+        przekazuje go do następnego etapu.
+        """
+        funkcja = self._funkcje[etap]
+        while True:
+            element = wejscie.get()
+            if element is _KONIEC:
+                wejscie.put(_KONIEC)
+                with self._lock:
+                    aktywne[0] -= 1
+                    ostatni = aktywne[0] == 0
+                if ostatni:
+                    wyjscie_etapu.put(_KONIEC)
+                return
+            if stop.is_set():
+                continue  # Przerwany przebieg - nikt nie czeka na wynik
+            start = time.perf_counter()
+            try:
+                funkcja(element)
+            except BLEDY_KONWERSJI as e:
+                element.wynik = _wynik_bledu(
+                    element.source, element.target, e, element.start
+                )
+            except Exception as e:
+                # Nieoczekiwany błąd nie może zakończyć wątku - martwy wątek
+                # etapu zatrzymałby cały potok
+                logger.exception("Błąd etapu %s dla %s", etap, element.source)
+                element.wynik = _wynik_bledu(
+                    element.source, element.target, OSError(str(e)), element.start
+                )
+            with self._lock:
+                self._zajetosc[etap] += time.perf_counter() - start
+            if element.wynik is not None:
+                self._zwolnij(element)
+                element.dane = element.miniatura = None
+                wyjscie.put(element)
+            else:
+                wyjscie_etapu.put(element)
+
+    def _odczyt(self, element):
+        if self.prefetcher is not None:
+            element.dane = self.prefetcher.get(element.source)
+        element.wynik = _przepusc(
+            element.source, element.target, self.options, element.start, element.dane
+        )
+        if element.wynik is not None:
+            return
+        if element.dane is None:
+            with open(element.source, "rb") as f:
+                element.dane = f.read()
+        if self.options.hash_content or _pamiec_wynikow(self.options):
+            element.skrot = hash_bytes(element.dane)
+        if _pamiec_wynikow(self.options):
+            element.wynik = _z_pamieci(
+                element.source,
+                element.target,
+                self.options,
+                element.skrot,
+                element.start,
+            )
+
+    def _dekodowanie(self, element):
+        dane, element.dane = element.dane, None
+        if self._procesy is not None:
+            self._dekodowanie_w_procesie(element, dane)
+            return
+        obraz = Image.open(io.BytesIO(dane))
+        element.obraz = obraz
+        _sprawdz_piksele(obraz, self.options)
+        # Pełne dekodowanie wykrywa uszkodzone pliki (zamiast verify())
+        obraz.load()
+
+    def _dekodowanie_w_procesie(self, element, dane):
+        """
+        Dekoduje w puli procesów; blok na piksele jest dobierany według
+        nagłówka, a obraz odtwarzany z bloku bez kopiowania (dla trybów
+        sharedframes.TRYBY_BEZ_KOPII; RGB wraca jako RGBX).
+        """
+        with Image.open(io.BytesIO(dane)) as naglowek:
+            _sprawdz_piksele(naglowek, self.options)
+            potrzebne = frame_size(naglowek.size, naglowek.mode)
+        element.blok = self._ramki.acquire(potrzebne)
+        ramka = self._procesy.submit(
+            _dekoduj_do_ramki, dane, element.blok.name
+        ).result()
+        element.obraz = read_frame(element.blok, ramka)
+
+    def _zwolnij(self, element):
+        """Zamyka obraz i zwraca jego blok pamięci współdzielonej do puli."""
+        element.wersje = None
+        if element.obraz is not None:
+            element.obraz.close()
+            element.obraz = None
+        if element.blok is not None:
+            self._ramki.release(element.blok)
+            element.blok = None
+
+    def _przeksztalcenie(self, element):
+        zrodlo_miniatury = element.obraz
+        if self.options.outputs:
+            element.wersje = _wersje(element.obraz, self.options)
+            zrodlo_miniatury = _najmniejsza(element.wersje)
+        if self.options.thumbnail_size:
+            element.miniatura = _miniatura(
+                zrodlo_miniatury, self.options.thumbnail_size
+            )
+
+    def _kodowanie(self, element):
+        if self.options.layout != LAYOUT_FLAT:
+            os.makedirs(os.path.dirname(element.target), exist_ok=True)
+        wyjscia = None
+        try:
+            if element.wersje is not None:
+                wyjscia = _zapisz_wyjscia(element.wersje, element.target, self.options)
+            else:
+                _zapisz_obraz(element.obraz, element.target, self.options)
+        finally:
+            self._zwolnij(element)
+        element.wynik = ConversionResult(
+            element.source,
+            element.target,
+            STATUS_OK,
+            duration=time.perf_counter() - element.start,
+            thumbnail=element.miniatura,
+            content_hash=element.skrot,
+            cached=False if _pamiec_wynikow(self.options) else None,
+            outputs=wyjscia,
+        )
+        element.miniatura = None
+
+
+def _zapisuj_w_pamieci(wyniki, options):
+    """
+    Przekazuje wyniki dalej, dodając nowe pliki wynikowe do pamięci
+    wyników i licząc trafienia oraz chybienia. Działa w procesie głównym,
+    więc liczniki obejmują także pliki z puli procesów.
+    """
+    pamiec = shared_cache(options.cache_dir, options.cache_bytes, options.cache_link)
+    try:
+        for wynik in wyniki:
+            if wynik.cached is not None:
+                pamiec.record(wynik.cached)
+                if not wynik.cached and wynik.ok:
+                    pamiec.put(
+                        output_cache_key(wynik.content_hash, options), wynik.target
+                    )
+            yield wynik
+    finally:
+        statystyki = pamiec.stats()
+        logger.info(
+            "Pamięć wyników: %d trafień, %d chybień, %d usuniętych wpisów",
+            statystyki["hits"],
+            statystyki["misses"],
+            statystyki["evictions"],
+        )
+
+
+def _utrwal_partie(wyniki):
+    """
+    Przekazuje wyniki dalej, a na końcu partii (także przerwanej) utrwala
+    zapisane pliki - polityka output_fsync="batch".
+    """
+    zapisane = []
+    try:
+        for wynik in wyniki:
+            if wynik.ok:
+                zapisane.extend(wynik.outputs or [wynik.target])
+            yield wynik
+    finally:
+        _fsync_plikow(zapisane)
+
+
+def _aktualizuj_manifest(wyniki, plan, options, manifest):
+    """
+    Przekazuje wyniki dalej, zapisując udane konwersje w manifeście.
+    Nowe wpisy są dopisywane do dziennika manifestu co MANIFEST_SAVE_EVERY
+    plików; pełny manifest jest zapisywany raz, na końcu partii.
+    """
+    odciski = {pozycja.source: pozycja.fingerprint for pozycja in plan}
+    ustawienia = manifest_settings(options)
+    zapisane = 0
+    try:
+        for wynik in wyniki:
+            odcisk = odciski.get(wynik.source)
+            if wynik.ok and odcisk is not None:
+                manifest.record(
+                    wynik.source,
+                    wynik.target,
+                    ustawienia,
+                    odcisk,
+                    wynik.content_hash,
+                    outputs=wynik.outputs,
+                )
+                zapisane += 1
+                if zapisane % MANIFEST_SAVE_EVERY == 0:
+                    _zapisz_manifest(manifest, pelny=False)
+            yield wynik
+    finally:
+        _zapisz_manifest(manifest)
+
+
+def _zapisz_manifest(manifest, pelny=True):
+    """
+    Zapisuje manifest (pelny) albo dopisuje nowe wpisy do jego dziennika;
+    błąd zapisu nie przerywa konwersji.
+    """
+    try:
+        if pelny:
+            manifest.save()
+        else:
+            manifest.append()
+    except OSError as e:
+        logger.warning("Nie można zapisać manifestu %s: %s", manifest.path, e)
+
+
+def convert_batch(paths, options, cancel=None, on_plan=None):
+    """
+    Konwertuje listę plików, zwracając rekord wyniku zaraz po zakończeniu
+    każdego pliku (generator). Przerwanie iteracji zatrzymuje konwersję.
+    Przed startem cała partia jest planowana (plan_batch), więc konflikty
+    z istniejącymi plikami są rozstrzygane bez udziału użytkownika.
+    W trybie przyrostowym (options.incremental) niezmienione pliki dają
+    STATUS_UNCHANGED, a udane konwersje trafiają do manifestu.
+    Plan jest układany według options.schedule (schedule_plan).
+    W zależności od options.executor pliki są konwertowane szeregowo,
+    równolegle w puli wątków lub procesów albo w potoku etapowym
+    (StagedPipeline).
+
+    Args:
+        paths (iterable): Ścieżki plików źródłowych
+        options (ConversionOptions): Ustawienia konwersji
+        cancel (callable): Funkcja bez argumentów; True przerywa konwersję
+        on_plan (callable): Funkcja wywoływana z planem partii (lista
+            PlannedItem) przed konwersją - np. do raportu konfliktów bez
+            osobnego planowania (find_conflicts)
+
+    Yields:
+        ConversionResult: Wynik konwersji kolejnego pliku
+
+    Raises:
+        ValueError: Gdy format wyjściowy, tryb wykonania, polityka
+            konfliktów, fsync lub przepuszczania, profil kodera (także
+            z limitem rozmiaru), lista wyjść, układ plików lub kolejność
+            nie jest obsługiwana
+    """
+    if options.format not in ROZSZERZENIA_WYJSCIOWE:
+        raise ValueError(f"Nieobsługiwany format wyjściowy: {options.format}")
+
+    paths = list(paths)
+    options = resolve_layout(options, paths)
+    tryb, workers = resolve_executor(options, paths)
+    if options.profile not in ENCODER_PROFILES:
+        raise ValueError(f"Nieobsługiwany profil kodera: {options.profile}")
+    if options.outputs is not None:
+        _sprawdz_wyjscia(options)
+    elif options.max_output_bytes and not supports_target_size(
+        options.format, options.profile
+    ):
+        raise ValueError(
+            f"Limit rozmiaru nie jest obsługiwany dla {options.format}/{options.profile}"
+        )
+    if options.passthrough not in PASSTHROUGH_MODES:
+        raise ValueError(f"Nieobsługiwany tryb przepuszczania: {options.passthrough}")
+    if options.output_fsync not in OUTPUT_FSYNC_POLICIES:
+        raise ValueError(f"Nieobsługiwana polityka fsync: {options.output_fsync}")
+    if options.schedule not in SCHEDULES:
+        raise ValueError(f"Nieobsługiwana kolejność wykonania: {options.schedule}")
+    manifest = Manifest.load(options.output_dir) if options.incremental else None
+    plan = schedule_plan(plan_batch(paths, options, manifest), options.schedule)
+    logger.info(
+        "Konwersja %d plików (tryb: %s, zadania: %d, konflikty: %d)",
+        len(paths),
+        tryb,
+        workers,
+        sum(1 for pozycja in plan if pozycja.conflict),
+    )
+    if on_plan is not None:
+        on_plan(plan)
+    zadania = _zadania(plan, cancel)
+    options = _podziel_budzet(options, tryb)
+    wyprzedzenie = _utworz_wyprzedzenie(plan, options, tryb, cancel)
+    szacunki = None
+    if options.memory_budget and tryb != "serial":
+        szacunki = _SzacunkiPamieci(plan, min(workers, 8))
+    if tryb == "serial":
+        wyniki = _konwertuj_szeregowo(zadania, options, wyprzedzenie)
+    elif tryb == "pipeline":
+        potok = StagedPipeline(
+            options, workers, prefetcher=wyprzedzenie, estimates=szacunki
+        )
+        wyniki = potok.run(zadania, cancel, options.ordered)
+    else:
+        wyniki = _konwertuj_rownolegle(
+            zadania, options, tryb, workers, cancel, wyprzedzenie, szacunki
+        )
+
+    strumien = wyniki
+    if _pamiec_wynikow(options):
+        strumien = _zapisuj_w_pamieci(strumien, options)
+    # Pliki utrwalane przed zapisem manifestu, który je odnotowuje
+    if options.output_fsync == "batch":
+        strumien = _utrwal_partie(strumien)
+    try:
+        if manifest is None:
+            yield from strumien
+        else:
+            yield from _aktualizuj_manifest(strumien, plan, options, manifest)
+    finally:
+        # Generator wyników zamykany najpierw - wątki puli nie czekają już
+        # na dane z wyprzedzenia
+        wyniki.close()
+        if wyprzedzenie is not None:
+            wyprzedzenie.close()
+        if szacunki is not None:
+            szacunki.close()
@@ -0,0 +1,367 @@
+# ---
+# # ImageFlow - kolejka plików do konwersji
+#
+# **Kolejka plików z indeksami haszującymi (ścieżka, nazwa pliku), dzięki
+# którym dodanie pliku i wykrycie duplikatu kosztuje O(1). Opcjonalnie
+# wykrywa pliki o identycznej zawartości (rozmiar, potem skrót).**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import os
+import logging
+import threading
+from array import array
+
+from engine import OBSLUGIWANE_ROZSZERZENIA
+from manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+# Powody odrzucenia pliku przez kolejkę
+REJECT_MISSING = "missing"
+REJECT_EXTENSION = "extension"
+REJECT_PATH = "path"
+REJECT_NAME = "name"
+REJECT_CONTENT = "content"
+
+
+class FileQueue:
+    """
+    Kolejka plików do konwersji. Zachowuje się jak lista ścieżek (len,
+    indeksowanie, iteracja, in), ale przechowuje je zwięźle: każdy folder
+    raz (lista folderów + tablica numerów), a przy pliku tylko nazwę.
+    Duplikaty wykrywa przez indeksy:
+    - ścieżka (os.path.normcase) - ten sam plik dodany drugi raz,
+    - nazwa pliku - dwa pliki o tej samej nazwie dałyby ten sam plik wynikowy
+      w płaskim układzie wyjścia (unique_names=False wyłącza to sprawdzenie
+      dla układów zachowujących foldery),
+    - zawartość (dedup_content=True) - pliki o identycznych bajtach, np. te
+      same zdjęcia zaimportowane z kilku urządzeń. Skrót liczony jest tylko
+      dla plików, których rozmiar powtarza się w kolejce. Rozmiary i skróty
+      może z wyprzedzeniem policzyć prepare() w wątku w tle - add() w wątku
+      interfejsu nie czyta wtedy plików.
+    Poza prepare() kolejka nie jest bezpieczna dla wielu wątków.
+    """
+
+    def __init__(self, paths=(), dedup_content=False, unique_names=True):
+        self._dedup_content = dedup_content
+        self.unique_names = unique_names
+        self._foldery = []  # Foldery (każdy raz)
+        self._numery_folderow = {}  # folder -> numer na liście _foldery
+        self._folder = array("I")  # Numer folderu dla każdej pozycji
+        self._nazwy = []  # Nazwa pliku dla każdej pozycji
+        # normcase(nazwa) -> numer folderu (zbiór numerów, gdy nazwa powtarza
+        # się w kilku folderach); ten sam indeks wykrywa powtórzoną ścieżkę
+        self._indeks_nazw = {}
+        self._rozmiary = {}  # rozmiar -> ścieżki plików o tym rozmiarze
+        self._skroty = {}  # skrót zawartości -> ścieżka
+        self._policzone = {}  # ścieżka -> skrót zawartości
+        # Policzone z wyprzedzeniem przez prepare(): ścieżka -> rozmiar,
+        # rozmiar -> ścieżki, ścieżka -> skrót (zużywane przez add())
+        self._wstepne_rozmiary = {}
+        self._wstepne_wg_rozmiaru = {}
+        self._wstepne_skroty = {}
+        # Chroni indeksy zawartości czytane przez prepare() z innego wątku
+        self._blokada = threading.Lock()
+        for path in paths:
+            self.add(path, check_exists=False)
+
+    @property
+    def dedup_content(self):
+        """Czy pliki o identycznej zawartości są odrzucane"""
+        return self._dedup_content
+
+    @dedup_content.setter
+    def dedup_content(self, enabled):
+        if enabled and not self._dedup_content:
+            # Pliki dodane wcześniej też biorą udział w porównaniu rozmiarów
+            # (rozmiary z prepare(), jeśli zostały policzone w tle)
+            self._indeksuj_rozmiary(list(self))
+        self._dedup_content = enabled
+
+    def __len__(self):
+        return len(self._nazwy)
+
+    def _sciezka(self, idx):
+        return os.path.join(self._foldery[self._folder[idx]], self._nazwy[idx])
+
+    def __iter__(self):
+        for idx in range(len(self._nazwy)):
+            yield self._sciezka(idx)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._sciezka(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self._nazwy)
+        if not 0 <= idx < len(self._nazwy):
+            raise IndexError("indeks kolejki poza zakresem")
+        return self._sciezka(idx)
+
+    def name(self, idx):
+        """
+        Zwraca nazwę pliku pozycji (bez składania pełnej ścieżki).
+
+        Args:
+            idx (int): Indeks pozycji
+
+        Returns:
+            str: Nazwa pliku
+        """
+        return self._nazwy[idx]
+
+    def __contains__(self, path):
+        folder, nazwa = os.path.split(path)
+        numery = self._indeks_nazw.get(os.path.normcase(nazwa))
+        if numery is None:
+            return False
+        if isinstance(numery, int):
+            numery = (numery,)
+        folder = os.path.normcase(folder)
+        return any(os.path.normcase(self._foldery[n]) == folder for n in numery)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"FileQueue({list(self)!r})"
+
+    def check(self, path, check_exists=True):
+        """
+        Sprawdza, czy plik można dodać (bez dodawania).
+
+        Args:
+            path (str): Ścieżka pliku
+            check_exists (bool): Sprawdzaj, czy plik istnieje
+
+        Returns:
+            str: Powód odrzucenia (REJECT_*) albo None
+        """
+        if os.path.splitext(path)[1].lower() not in OBSLUGIWANE_ROZSZERZENIA:
+            return REJECT_EXTENSION
+        if os.path.normcase(os.path.basename(path)) in self._indeks_nazw:
+            if path in self:
+                return REJECT_PATH
+            if self.unique_names:
+                return REJECT_NAME
+        if check_exists and not os.path.isfile(path):
+            return REJECT_MISSING
+        return None
+
+    def add(self, path, check_exists=True):
+        """
+        Dodaje plik na koniec kolejki, o ile nie jest duplikatem.
+
+        Args:
+            path (str): Ścieżka pliku
+            check_exists (bool): Sprawdzaj, czy plik istnieje (zbędne dla
+                ścieżek z przeglądania folderu)
+
+        Returns:
+            str: Powód odrzucenia (REJECT_*) albo None, gdy plik dodano
+        """
+        powod = self.check(path, check_exists)
+        if powod is None and self.dedup_content and self._duplikat_zawartosci(path):
+            powod = REJECT_CONTENT
+        # Skrót dodanego pliku może się jeszcze przydać (_skrot)
+        self._zapomnij_wstepne(path, skrot=powod is not None)
+        if powod is not None:
+            return powod
+        self._dopisz(path)
+        return None
+
+    def prepare(self, paths):
+        """
+        Odczytuje z wyprzedzeniem rozmiary plików i skróty, których add()
+        potrzebowałby do wykrywania identycznej zawartości. Przeznaczona dla
+        wątku w tle (np. przeglądania folderu) - kolejne add() w wątku
+        interfejsu nie czyta wtedy plików. Skróty są liczone tylko dla plików
+        o rozmiarze, który powtarza się w kolejce lub wśród przygotowanych.
+        Bezpieczna dla wielu wątków; odczyt plików odbywa się poza blokadą.
+
+        Args:
+            paths (iterable): Ścieżki plików, które zostaną dodane
+        """
+        for path in paths:
+            try:
+                rozmiar = os.path.getsize(path)
+            except OSError:
+                continue
+            with self._blokada:
+                podobne = list(self._rozmiary.get(rozmiar, ()))
+                podobne += self._wstepne_wg_rozmiaru.get(rozmiar, ())
+                self._wstepne_rozmiary[path] = rozmiar
+                self._wstepne_wg_rozmiaru.setdefault(rozmiar, []).append(path)
+            if podobne:
+                for sciezka in podobne + [path]:
+                    self._przygotuj_skrot(sciezka)
+
+    def _przygotuj_skrot(self, path):
+        """Liczy skrót dla prepare(), o ile nie jest już znany."""
+        with self._blokada:
+            if path in self._policzone or path in self._wstepne_skroty:
+                return
+        try:
+            skrot = hash_file(path)
+        except OSError:
+            return
+        with self._blokada:
+            self._wstepne_skroty[path] = skrot
+
+    def _zapomnij_wstepne(self, path, skrot=True):
+        """Usuwa dane z prepare() dla ścieżki obsłużonej przez add()."""
+        with self._blokada:
+            rozmiar = self._wstepne_rozmiary.pop(path, None)
+            if skrot:
+                self._wstepne_skroty.pop(path, None)
+            if rozmiar is not None:
+                sciezki = self._wstepne_wg_rozmiaru[rozmiar]
+                sciezki.remove(path)
+                if not sciezki:
+                    del self._wstepne_wg_rozmiaru[rozmiar]
+
+    def _rozmiar(self, path):
+        """Rozmiar pliku - z prepare() albo odczytany (OSError, gdy brak)."""
+        rozmiar = self._wstepne_rozmiary.get(path)
+        return os.path.getsize(path) if rozmiar is None else rozmiar
+
+    def _policz_skrot(self, path):
+        """Skrót zawartości - z prepare() albo liczony (OSError, gdy brak)."""
+        with self._blokada:
+            skrot = self._wstepne_skroty.pop(path, None)
+        return hash_file(path) if skrot is None else skrot
+
+    def _dopisz(self, path):
+        """Dopisuje pozycję i aktualizuje indeksy."""
+        folder, nazwa = os.path.split(path)
+        numer = self._numery_folderow.get(folder)
+        if numer is None:
+            numer = len(self._foldery)
+            self._foldery.append(folder)
+            self._numery_folderow[folder] = numer
+        self._folder.append(numer)
+        self._nazwy.append(nazwa)
+        klucz = os.path.normcase(nazwa)
+        poprzednie = self._indeks_nazw.get(klucz)
+        if poprzednie is None:
+            self._indeks_nazw[klucz] = numer
+        elif isinstance(poprzednie, int):
+            self._indeks_nazw[klucz] = {poprzednie, numer}
+        else:
+            poprzednie.add(numer)
+
+    def _skrot(self, path):
+        """Skrót zawartości pliku (liczony raz, zapamiętywany)."""
+        skrot = self._policzone.get(path)
+        if skrot is None:
+            skrot = self._policz_skrot(path)
+            with self._blokada:
+                self._policzone[path] = skrot
+            self._skroty.setdefault(skrot, path)
+        return skrot
+
+    def _duplikat_zawartosci(self, path):
+        """
+        Sprawdza, czy plik ma tę samą zawartość co plik w kolejce. Pliki
+        o unikalnym rozmiarze nie są czytane; przy powtórzonym rozmiarze
+        liczone są skróty (także - jednorazowo - dla wcześniejszych plików).
+        Zapamiętuje rozmiar/skrót pliku, który nie jest duplikatem. Rozmiary
+        i skróty policzone przez prepare() nie są odczytywane ponownie.
+        """
+        try:
+            rozmiar = self._rozmiar(path)
+            podobne = self._rozmiary.get(rozmiar)
+            if podobne is None:
+                with self._blokada:
+                    self._rozmiary[rozmiar] = [path]
+                return False
+            for wczesniejszy in podobne:
+                if wczesniejszy not in self._policzone:
+                    try:
+                        self._skrot(wczesniejszy)
+                    except OSError:
+                        continue
+            skrot = self._policz_skrot(path)
+        except OSError as e:
+            logger.warning("Nie można odczytać pliku %s: %s", path, e)
+            return False
+        if skrot in self._skroty:
+            return True
+        with self._blokada:
+            podobne.append(path)
+            self._policzone[path] = skrot
+        self._skroty[skrot] = path
+        return False
+
+    def extend(self, paths, check_exists=True):
+        """
+        Dodaje wiele plików.
+
+        Args:
+            paths (iterable): Ścieżki plików
+            check_exists (bool): Sprawdzaj, czy pliki istnieją
+
+        Returns:
+            list: Dodane ścieżki (w kolejności)
+        """
+        return [path for path in paths if self.add(path, check_exists) is None]
+
+    def remove_indices(self, indices):
+        """
+        Usuwa pozycje o podanych indeksach jedną przebudową kolejki.
+
+        Args:
+            indices (iterable): Indeksy pozycji do usunięcia
+
+        Returns:
+            list: Usunięte ścieżki
+        """
+        do_usuniecia = set(indices)
+        if not do_usuniecia:
+            return []
+        usuniete = [self[i] for i in sorted(do_usuniecia)]
+        pozostale = [
+            self._sciezka(i) for i in range(len(self)) if i not in do_usuniecia
+        ]
+        self._przebuduj(pozostale)
+        return usuniete
+
+    def clear(self):
+        """Usuwa wszystkie pozycje."""
+        self._przebuduj([])
+
+    def _przebuduj(self, paths):
+        """Zastępuje zawartość kolejki (indeksy budowane od nowa)."""
+        paths = list(paths)
+        self._foldery = []
+        self._numery_folderow = {}
+        self._folder = array("I")
+        self._nazwy = []
+        self._indeks_nazw = {}
+        for path in paths:
+            self._dopisz(path)
+        zostaja = set(paths)
+        # Indeksy zawartości są filtrowane, bez ponownego odczytu plików
+        rozmiary = {}
+        for rozmiar, sciezki in self._rozmiary.items():
+            zostale = [p for p in sciezki if p in zostaja]
+            if zostale:
+                rozmiary[rozmiar] = zostale
+        with self._blokada:
+            self._policzone = {p: s for p, s in self._policzone.items() if p in zostaja}
+            self._rozmiary = rozmiary
+        self._skroty = {s: p for p, s in self._policzone.items()}
+
+    def _indeksuj_rozmiary(self, paths):
+        """Buduje indeks rozmiarów plików w kolejce (przy włączeniu dedup)."""
+        rozmiary = {}
+        for path in paths:
+            try:
+                rozmiar = self._rozmiar(path)
+            except OSError:
+                continue
+            rozmiary.setdefault(rozmiar, []).append(path)
+            self._zapomnij_wstepne(path, skrot=False)
+        with self._blokada:
+            self._rozmiary = rozmiary
@@ -0,0 +1,284 @@
+# ---
+# # ImageFlow - dziennik zadania konwersji
+#
+# **Dziennik (append-only) zapisujący ukończone i nieudane pliki na bieżąco.
+# Po awarii procesu zadanie można wznowić od miejsca przerwania.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import os
+import json
+import time
+import logging
+
+from engine import STATUS_ERROR, ConversionOptions, convert_batch, resolve_layout
+
+logger = logging.getLogger(__name__)
+
+# Domyślna nazwa dziennika w folderze docelowym
+JOURNAL_NAME = ".imageflow-job.jsonl"
+
+# Wersja formatu dziennika
+JOURNAL_VERSION = 1
+
+# Polityki fsync: "none" (tylko bufor systemu), "interval" (co fsync_interval
+# sekund - tanio, a awaria systemu traci najwyżej ostatnią chwilę pracy)
+# i "always" (po każdym pliku)
+FSYNC_POLICIES = ("none", "interval", "always")
+
+# Rozmiar bloku przy szukaniu końca ostatniej pełnej linii dziennika
+_BLOK_OGONA = 64 * 1024
+
+
+class JobJournal:
+    """Dziennik zadania konwersji zapisywany jako JSON Lines"""
+
+    def __init__(self, path, fsync_policy="interval", fsync_interval=1.0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Nieobsługiwana polityka fsync: {fsync_policy}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._plik = None
+        self._ostatni_fsync = time.monotonic()
+
+    @classmethod
+    def create(cls, path, paths, options, **kwargs):
+        """
+        Tworzy nowy dziennik z nagłówkiem zawierającym listę plików
+        i ustawienia zadania (nadpisuje poprzedni dziennik).
+
+        Args:
+            path (str): Ścieżka pliku dziennika
+            paths (list): Ścieżki plików źródłowych zadania
+            options (ConversionOptions): Ustawienia konwersji
+            **kwargs: fsync_policy, fsync_interval
+
+        Returns:
+            JobJournal: Dziennik otwarty do dopisywania
+        """
+        dziennik = cls(path, **kwargs)
+        dziennik._plik = open(path, "w", encoding="utf-8")
+        dziennik._zapisz(
+            {
+                "type": "job",
+                "version": JOURNAL_VERSION,
+                "options": options.to_dict(),
+                "paths": list(paths),
+            },
+            wymus_fsync=True,
+        )
+        return dziennik
+
+    def open(self):
+        """
+        Otwiera istniejący dziennik do dopisywania. Niedokończona ostatnia
+        linia (awaria w trakcie zapisu) jest najpierw obcinana - inaczej
+        nowy rekord skleiłby się z nią i przepadł przy odczycie.
+        """
+        _obetnij_niepelna_linie(self.path)
+        self._plik = open(self.path, "a", encoding="utf-8")
+
+    def _zapisz(self, rekord, wymus_fsync=False):
+        """
+        Dopisuje rekord i opróżnia bufor Pythona (przeżywa awarię procesu).
+        fsync (przeżywa awarię systemu) zależy od polityki.
+        """
+        self._plik.write(json.dumps(rekord, ensure_ascii=False) + "\n")
+        self._plik.flush()
+        teraz = time.monotonic()
+        if self.fsync_policy == "always" or (
+            self.fsync_policy == "interval"
+            and (wymus_fsync or teraz - self._ostatni_fsync >= self.fsync_interval)
+        ):
+            os.fsync(self._plik.fileno())
+            self._ostatni_fsync = teraz
+
+    def record(self, result):
+        """
+        Zapisuje wynik pliku: "failed" dla błędów, "done" dla pozostałych.
+
+        Args:
+            result (ConversionResult): Wynik konwersji pliku
+        """
+        self._zapisz(
+            {
+                "type": "failed" if result.status == STATUS_ERROR else "done",
+                "source": result.source,
+                "target": result.target,
+                "status": result.status,
+            }
+        )
+
+    def finish(self):
+        """Oznacza zadanie jako zakończone i zamyka dziennik."""
+        self._zapisz({"type": "end"}, wymus_fsync=True)
+        self.close()
+
+    def close(self):
+        """Zamyka dziennik (bez oznaczania zakończenia)."""
+        if self._plik is not None:
+            if self.fsync_policy != "none":
+                os.fsync(self._plik.fileno())
+            self._plik.close()
+            self._plik = None
+
+
+def _obetnij_niepelna_linie(path):
+    """
+    Obcina plik za ostatnim znakiem nowej linii (czytając od końca blokami).
+
+    Args:
+        path (str): Ścieżka pliku dziennika
+    """
+    with open(path, "rb+") as f:
+        koniec = f.seek(0, os.SEEK_END)
+        pozycja = koniec
+        while pozycja > 0:
+            start = max(0, pozycja - _BLOK_OGONA)
+            f.seek(start)
+            blok = f.read(pozycja - start)
+            indeks = blok.rfind(b"\n")
+            if indeks != -1:
+                pozycja = start + indeks + 1
+                break
+            pozycja = start
+        if pozycja != koniec:
+            logger.warning("Obcięto niedokończony rekord dziennika %s", path)
+            f.truncate(pozycja)
+
+
+class JobState:
+    """Stan zadania odtworzony z dziennika"""
+
+    def __init__(self, paths, options, done, failed, finished):
+        self.paths = paths
+        self.options = options
+        self.done = done  # Zbiór plików ukończonych
+        self.failed = failed  # Zbiór plików zakończonych błędem
+        self.finished = finished  # Czy zadanie dobiegło końca
+
+    def remaining(self, retry_failed=False):
+        """
+        Zwraca pliki, które nie zostały jeszcze przetworzone.
+
+        Args:
+            retry_failed (bool): Dołącz pliki zakończone błędem
+
+        Returns:
+            list: Ścieżki w kolejności z nagłówka zadania
+        """
+        pominiete = self.done if retry_failed else self.done | self.failed
+        return [p for p in self.paths if p not in pominiete]
+
+
+def load_job(path):
+    """
+    Wczytuje stan zadania z dziennika. Ucięta ostatnia linia (awaria
+    w trakcie zapisu) jest pomijana.
+
+    Args:
+        path (str): Ścieżka pliku dziennika
+
+    Returns:
+        JobState: Stan zadania
+
+    Raises:
+        ValueError: Gdy plik nie jest dziennikiem zadania ImageFlow
+        OSError: Gdy dziennika nie można odczytać
+    """
+    naglowek = None
+    done = set()
+    failed = set()
+    finished = False
+    with open(path, "r", encoding="utf-8") as f:
+        for linia in f:
+            try:
+                rekord = json.loads(linia)
+            except ValueError:
+                logger.warning("Pominięto uszkodzoną linię dziennika %s", path)
+                continue
+            rodzaj = rekord.get("type")
+            if rodzaj == "job":
+                naglowek = rekord
+            elif rodzaj == "done":
+                done.add(rekord["source"])
+                failed.discard(rekord["source"])
+            elif rodzaj == "failed":
+                failed.add(rekord["source"])
+            elif rodzaj == "end":
+                finished = True
+    if naglowek is None or naglowek.get("version") != JOURNAL_VERSION:
+        raise ValueError(f"Niepoprawny dziennik zadania: {path}")
+    return JobState(
+        naglowek["paths"],
+        ConversionOptions.from_dict(naglowek["options"]),
+        done,
+        failed,
+        finished,
+    )
+
+
+def _konwertuj_z_dziennikiem(paths, options, dziennik, cancel, on_plan):
+    """Uruchamia konwersję zapisując każdy wynik w dzienniku."""
+    try:
+        for wynik in convert_batch(paths, options, cancel=cancel, on_plan=on_plan):
+            dziennik.record(wynik)
+            yield wynik
+        if cancel is None or not cancel():
+            dziennik.finish()
+    finally:
+        dziennik.close()
+
+
+def run_job(paths, options, journal_path, cancel=None, on_plan=None, **kwargs):
+    """
+    Konwertuje pliki jak convert_batch, zapisując postęp w dzienniku,
+    aby po awarii można było wywołać resume().
+
+    Args:
+        paths (iterable): Ścieżki plików źródłowych
+        options (ConversionOptions): Ustawienia konwersji
+        journal_path (str): Ścieżka pliku dziennika
+        cancel (callable): Funkcja bez argumentów; True przerywa konwersję
+        on_plan (callable): Funkcja wywoływana z planem partii
+            (convert_batch)
+        **kwargs: fsync_policy, fsync_interval
+
+    Yields:
+        ConversionResult: Wynik konwersji kolejnego pliku
+    """
+    paths = list(paths)
+    # Folder bazowy układu "tree" ustalany dla całej partii i zapisywany,
+    # aby wznowienie dla pozostałych plików dało te same ścieżki docelowe
+    options = resolve_layout(options, paths)
+    dziennik = JobJournal.create(journal_path, paths, options, **kwargs)
+    yield from _konwertuj_z_dziennikiem(paths, options, dziennik, cancel, on_plan)
+
+
+def resume(journal_path, cancel=None, retry_failed=False, on_plan=None, **kwargs):
+    """
+    Wznawia przerwane zadanie z dziennika: konwertuje tylko pozostałe pliki,
+    z tymi samymi ustawieniami, dopisując wyniki do tego samego dziennika.
+
+    Args:
+        journal_path (str): Ścieżka pliku dziennika
+        cancel (callable): Funkcja bez argumentów; True przerywa konwersję
+        retry_failed (bool): Ponów także pliki zakończone błędem
+        on_plan (callable): Funkcja wywoływana z planem partii
+            (convert_batch)
+        **kwargs: fsync_policy, fsync_interval
+
+    Yields:
+        ConversionResult: Wynik konwersji kolejnego pozostałego pliku
+    """
+    stan = load_job(journal_path)
+    pozostale = stan.remaining(retry_failed)
+    logger.info(
+        "Wznawianie zadania: %d z %d plików pozostało", len(pozostale), len(stan.paths)
+    )
+    dziennik = JobJournal(journal_path, **kwargs)
+    dziennik.open()
+    opcje = resolve_layout(stan.options, stan.paths)
+    yield from _konwertuj_z_dziennikiem(pozostale, opcje, dziennik, cancel, on_plan)
@@ -0,0 +1,262 @@
+# ---
+# # ImageFlow - manifest konwersji przyrostowej
+#
+# **Trwały zapis tego, co zostało już skonwertowane do folderu docelowego.
+# Pozwala pominąć pliki, których źródło i ustawienia się nie zmieniły.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import os
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nazwa pliku manifestu w folderze docelowym
+MANIFEST_NAME = ".imageflow-manifest.json"
+
+# Przyrostek dziennika zmian manifestu (JSON Lines, tylko dopisywanie)
+MANIFEST_LOG_SUFFIX = ".log"
+
+# Wersja formatu pliku manifestu
+MANIFEST_VERSION = 1
+
+# Rozmiar bloku przy strumieniowym liczeniu skrótu pliku
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_bytes(dane):
+    """
+    Zwraca skrót zawartości (SHA-256, hex).
+
+    Args:
+        dane (bytes): Zawartość pliku
+
+    Returns:
+        str: Skrót w postaci szesnastkowej
+    """
+    return hashlib.sha256(dane).hexdigest()
+
+
+def hash_file(sciezka):
+    """
+    Liczy skrót zawartości pliku strumieniowo (bez wczytywania całości).
+
+    Args:
+        sciezka (str): Ścieżka pliku
+
+    Returns:
+        str: Skrót SHA-256 w postaci szesnastkowej
+    """
+    skrot = hashlib.sha256()
+    with open(sciezka, "rb") as f:
+        for blok in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            skrot.update(blok)
+    return skrot.hexdigest()
+
+
+def fingerprint(sciezka):
+    """
+    Zwraca tani odcisk pliku źródłowego (rozmiar, mtime w ns).
+
+    Args:
+        sciezka (str): Ścieżka pliku
+
+    Returns:
+        tuple: (rozmiar, mtime_ns)
+
+    Raises:
+        OSError: Gdy pliku nie można odczytać
+    """
+    st = os.stat(sciezka)
+    return st.st_size, st.st_mtime_ns
+
+
+class Manifest:
+    """
+    Manifest konwersji przyrostowej przechowywany w folderze docelowym.
+    W trakcie partii nowe wpisy są dopisywane do dziennika zmian (append),
+    a pełny plik JSON jest zapisywany raz na końcu (save) - koszt zapisu
+    rośnie liniowo z liczbą plików, a nie kwadratowo.
+    """
+
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.log_path = f"{path}{MANIFEST_LOG_SUFFIX}"
+        self.entries = entries if entries is not None else {}
+        self.dirty = False
+        self._zmienione = set()  # Klucze zmienione od ostatniego append/save
+
+    @classmethod
+    def load(cls, output_dir):
+        """
+        Wczytuje manifest z folderu docelowego (pusty, jeśli go nie ma
+        albo jest nieczytelny).
+
+        Args:
+            output_dir (str): Folder docelowy
+
+        Returns:
+            Manifest: Wczytany manifest
+        """
+        path = os.path.join(output_dir, MANIFEST_NAME)
+        manifest = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                dane = json.load(f)
+            if dane.get("version") == MANIFEST_VERSION:
+                manifest.entries = dane.get("entries", {})
+            else:
+                logger.warning("Nieznana wersja manifestu %s - pomijam", path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Nie można wczytać manifestu %s: %s", path, e)
+        if manifest._odtworz_dziennik():
+            # Kompaktowanie przy wczytaniu: dziennik zaczyna każdą partię pusty,
+            # więc niedokończona ostatnia linia nie skleja się z nowymi wpisami
+            try:
+                manifest.save()
+            except OSError as e:
+                logger.warning("Nie można zapisać manifestu %s: %s", path, e)
+        return manifest
+
+    def _odtworz_dziennik(self):
+        """
+        Nakłada wpisy z dziennika zmian (pomija uszkodzone linie).
+
+        Returns:
+            bool: True, jeśli dziennik istniał
+        """
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for linia in f:
+                    try:
+                        rekord = json.loads(linia)
+                        self.entries[rekord["source"]] = rekord["entry"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(
+                "Nie można wczytać dziennika manifestu %s: %s", self.log_path, e
+            )
+            return False
+        self.dirty = True
+        return True
+
+    @staticmethod
+    def _klucz(source):
+        return os.path.abspath(source)
+
+    def lookup(self, source, settings, source_fingerprint, hash_content=False):
+        """
+        Sprawdza, czy plik można pominąć: źródło i ustawienia są takie same
+        jak przy poprzedniej konwersji, a plik wynikowy (przy wielu wyjściach
+        - każdy z nich) nadal istnieje.
+        Przy zgodnym rozmiarze i mtime pliku nie trzeba czytać; gdy zmienił
+        się tylko mtime, a hash_content jest włączone, porównywany jest skrót.
+
+        Args:
+            source (str): Ścieżka pliku źródłowego
+            settings (dict): Ustawienia konwersji wpływające na wynik
+            source_fingerprint (tuple): Aktualny (rozmiar, mtime_ns) źródła
+            hash_content (bool): Porównuj skrót zawartości przy zmianie mtime
+
+        Returns:
+            str: Ścieżka istniejącego pliku wynikowego albo None
+        """
+        wpis = self.entries.get(self._klucz(source))
+        if wpis is None or wpis.get("settings") != settings:
+            return None
+        rozmiar, mtime_ns = source_fingerprint
+        if rozmiar != wpis.get("size"):
+            return None
+        if mtime_ns != wpis.get("mtime_ns"):
+            if not hash_content or not wpis.get("hash"):
+                return None
+            try:
+                if hash_file(source) != wpis["hash"]:
+                    return None
+            except OSError:
+                return None
+            # Ta sama zawartość - zapamiętaj nowy mtime, by kolejny raz nie liczyć skrótu
+            wpis["mtime_ns"] = mtime_ns
+            self.dirty = True
+            self._zmienione.add(self._klucz(source))
+        cele = wpis.get("outputs") or [wpis.get("target", "")]
+        if not all(os.path.exists(cel) for cel in cele):
+            return None
+        return wpis["target"]
+
+    def record(
+        self,
+        source,
+        target,
+        settings,
+        source_fingerprint,
+        content_hash=None,
+        outputs=None,
+    ):
+        """
+        Zapisuje w manifeście udaną konwersję pliku.
+
+        Args:
+            source (str): Ścieżka pliku źródłowego
+            target (str): Ścieżka pliku wynikowego
+            settings (dict): Ustawienia konwersji wpływające na wynik
+            source_fingerprint (tuple): (rozmiar, mtime_ns) sprzed konwersji
+            content_hash (str): Skrót zawartości źródła (opcjonalnie)
+            outputs (list): Ścieżki wszystkich plików wynikowych przy wielu
+                wyjściach (opcjonalnie)
+        """
+        rozmiar, mtime_ns = source_fingerprint
+        klucz = self._klucz(source)
+        self.entries[klucz] = {
+            "size": rozmiar,
+            "mtime_ns": mtime_ns,
+            "hash": content_hash,
+            "settings": settings,
+            "target": target,
+        }
+        if outputs:
+            self.entries[klucz]["outputs"] = list(outputs)
+        self.dirty = True
+        self._zmienione.add(klucz)
+
+    def append(self):
+        """
+        Dopisuje wpisy zmienione od ostatniego zapisu do dziennika zmian.
+        Koszt zależy tylko od liczby nowych wpisów, nie od wielkości manifestu.
+        """
+        if not self._zmienione:
+            return
+        linie = [
+            json.dumps({"source": klucz, "entry": self.entries[klucz]}) + "\n"
+            for klucz in self._zmienione
+        ]
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.writelines(linie)
+        self._zmienione.clear()
+
+    def save(self):
+        """
+        Zapisuje pełny manifest atomowo (plik tymczasowy + os.replace), aby
+        przerwany zapis nie zostawił uszkodzonego manifestu, i usuwa dziennik
+        zmian, którego wpisy są już w manifeście.
+        """
+        if not self.dirty:
+            return
+        tymczasowy = f"{self.path}.tmp"
+        with open(tymczasowy, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f)
+        os.replace(tymczasowy, self.path)
+        try:
+            os.remove(self.log_path)
+        except FileNotFoundError:
+            pass
+        self._zmienione.clear()
+        self.dirty = False
@@ -0,0 +1,242 @@
+# ---
+# # ImageFlow - pamięć podręczna wyników konwersji
+#
+# **Pliki wynikowe przechowywane według zawartości źródła i ustawień
+# kodera (skrót SHA-256), wspólne dla zadań i użytkowników. Przy trafieniu
+# silnik przepisuje gotowy plik (dowiązanie lub kopia) zamiast dekodowania
+# i kodowania. Magazyn ograniczony bajtami, najdawniej użyte wpisy są
+# usuwane.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import secrets
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Domyślny limit bajtów pamięci wyników
+OUTPUT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Rozszerzenie plików wpisów w folderze pamięci
+ROZSZERZENIE_WPISU = ".out"
+
+
+def default_output_cache_dir():
+    """
+    Zwraca systemowy folder pamięci wyników konwersji.
+
+    Returns:
+        str: Ścieżka folderu (może jeszcze nie istnieć)
+    """
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        baza = os.environ.get("LOCALAPPDATA", home)
+        return os.path.join(baza, "ImageFlow", "outputs")
+    if sys.platform == "darwin":
+        return os.path.join(home, "Library", "Caches", "ImageFlow", "outputs")
+    baza = os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+    return os.path.join(baza, "imageflow", "outputs")
+
+
+def cache_key(content_hash, settings):
+    """
+    Wyznacza klucz wpisu z zawartości źródła i ustawień kodera.
+
+    Args:
+        content_hash (str): Skrót zawartości pliku źródłowego
+        settings (dict): Ustawienia, od których zależą bajty wyniku (format,
+            parametry kodera...) - wartości muszą dać się zapisać w JSON
+
+    Returns:
+        str: Klucz (skrót SHA-256 w zapisie szesnastkowym)
+    """
+    opis = json.dumps([content_hash, settings], sort_keys=True)
+    return hashlib.sha256(opis.encode("utf-8")).hexdigest()
+
+
+class OutputCache:
+    """
+    Magazyn plików wynikowych adresowany zawartością (klucz z cache_key).
+    Ograniczony liczbą bajtów - po przekroczeniu limitu usuwane są wpisy
+    najdawniej użyte (trafienie odświeża mtime wpisu). Liczniki trafień,
+    chybień i usunięć (stats) pomagają dobrać rozmiar pamięci. Folder może
+    być wspólny dla wielu procesów - wpisy są zapisywane atomowo, a liczba
+    bajtów jest przeliczana przy przycinaniu. Bezpieczny dla wielu wątków.
+    """
+
+    def __init__(self, folder, max_bytes=OUTPUT_CACHE_BYTES, link=False):
+        """
+        Args:
+            folder (str): Folder pamięci
+            max_bytes (int): Limit bajtów wpisów
+            link (bool): Dodawaj wpisy jako twarde dowiązania do plików
+                wynikowych zamiast kopii (bez kopiowania danych, ale wpis
+                współdzieli dane z plikiem wynikowym)
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.link = link
+        self.bytes = None  # Liczone przy pierwszym zapisie
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._blokada = threading.Lock()
+
+    def _sciezka(self, key):
+        return os.path.join(self.folder, key + ROZSZERZENIE_WPISU)
+
+    def lookup(self, key):
+        """
+        Zwraca ścieżkę wpisu i oznacza go jako ostatnio użyty (bez zmiany
+        liczników - trafienia i chybienia odnotowuje record).
+
+        Args:
+            key (str): Klucz z cache_key
+
+        Returns:
+            str: Ścieżka pliku wpisu albo None, gdy go nie ma
+        """
+        sciezka = self._sciezka(key)
+        try:
+            os.utime(sciezka)
+        except OSError:
+            return None
+        return sciezka
+
+    def record(self, hit):
+        """
+        Odnotowuje trafienie lub chybienie.
+
+        Args:
+            hit (bool): True dla trafienia
+        """
+        with self._blokada:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, path):
+        """
+        Dodaje plik wynikowy do pamięci (atomowo; błędy są tylko logowane,
+        bo pamięć nie może przerwać konwersji).
+
+        Args:
+            key (str): Klucz z cache_key
+            path (str): Ścieżka pliku wynikowego
+        """
+        cel = self._sciezka(key)
+        if os.path.exists(cel):
+            return
+        tymczasowy = f"{cel}.{secrets.token_hex(4)}.tmp"
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            dowiazany = False
+            if self.link:
+                try:
+                    os.link(path, tymczasowy)
+                    dowiazany = True
+                except OSError as e:
+                    # Inny system plików - wpis będzie kopią
+                    logger.debug("Dowiązanie niemożliwe (%s), kopiowanie", e)
+            if not dowiazany:
+                shutil.copyfile(path, tymczasowy)
+            os.replace(tymczasowy, cel)
+            rozmiar = os.path.getsize(cel)
+        except OSError as e:
+            logger.debug("Nie można dodać wyniku do pamięci: %s", e)
+            try:
+                os.remove(tymczasowy)
+            except OSError:
+                logger.debug("Brak pliku tymczasowego %s", tymczasowy)
+            return
+        with self._blokada:
+            if self.bytes is None:
+                self.bytes = sum(rozmiar for _, rozmiar, _ in self._wpisy())
+            else:
+                self.bytes += rozmiar
+            if self.bytes > self.max_bytes:
+                self._przytnij()
+
+    def stats(self):
+        """
+        Zwraca liczniki pamięci.
+
+        Returns:
+            dict: hits, misses, evictions i bytes (None przed pierwszym
+                zapisem)
+        """
+        with self._blokada:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self.bytes,
+            }
+
+    def _wpisy(self):
+        """Zwraca (ścieżka, rozmiar, mtime) wpisów w folderze"""
+        wpisy = []
+        try:
+            with os.scandir(self.folder) as it:
+                for wpis in it:
+                    if wpis.name.endswith(ROZSZERZENIE_WPISU):
+                        try:
+                            st = wpis.stat()
+                        except OSError:
+                            continue
+                        wpisy.append((wpis.path, st.st_size, st.st_mtime_ns))
+        except OSError as e:
+            logger.debug("Nie można odczytać folderu pamięci: %s", e)
+        return wpisy
+
+    def _przytnij(self):
+        """Usuwa najdawniej użyte wpisy do 3/4 limitu (zapas na kolejne zapisy)"""
+        wpisy = sorted(self._wpisy(), key=lambda w: w[2])
+        self.bytes = sum(rozmiar for _, rozmiar, _ in wpisy)
+        cel = self.max_bytes * 3 // 4
+        for sciezka, rozmiar, _ in wpisy:
+            if self.bytes <= cel:
+                break
+            try:
+                os.remove(sciezka)
+            except OSError:
+                continue
+            self.bytes -= rozmiar
+            self.evictions += 1
+
+
+# Pamięci otwarte w tym procesie (folder -> OutputCache), aby liczniki
+# sumowały się między partiami
+_otwarte = {}
+_otwarte_blokada = threading.Lock()
+
+
+def shared_cache(folder, max_bytes=OUTPUT_CACHE_BYTES, link=False):
+    """
+    Zwraca pamięć dla folderu wspólną dla całego procesu (tworzy ją przy
+    pierwszym użyciu; limit i tryb dowiązań są aktualizowane).
+
+    Args:
+        folder (str): Folder pamięci
+        max_bytes (int): Limit bajtów wpisów
+        link (bool): Dodawaj wpisy jako twarde dowiązania
+
+    Returns:
+        OutputCache: Pamięć wyników
+    """
+    klucz = os.path.normcase(os.path.abspath(folder))
+    with _otwarte_blokada:
+        pamiec = _otwarte.get(klucz)
+        if pamiec is None:
+            pamiec = _otwarte[klucz] = OutputCache(folder, max_bytes, link)
+        pamiec.max_bytes = max_bytes
+        pamiec.link = link
+        return pamiec
@@ -0,0 +1,478 @@
+# ---
+# # ImageFlow - szybki podgląd plików
+#
+# **Dekodowanie podglądu w zmniejszonej rozdzielczości, zależne od formatu:
+# skalowanie DCT dla JPEG, osadzone miniatury HEIF, mniejsze strony TIFF.
+# Pełne dekodowanie tylko wtedy, gdy format nie daje tańszej drogi.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import os
+import sys
+import json
+import math
+import queue
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image, PngImagePlugin
+from pillow_heif import register_heif_opener
+
+# Rejestracja obsługi plików HEIC
+register_heif_opener()
+
+logger = logging.getLogger(__name__)
+
+# Domyślny rozmiar podglądu (mieści się w ramce miniatury GUI)
+PREVIEW_SIZE = (200, 200)
+
+# Sposoby uzyskania podglądu
+METHOD_DRAFT = "draft"
+METHOD_EMBEDDED = "embedded"
+METHOD_PAGE = "page"
+METHOD_FULL = "full"
+METHOD_CACHED = "cached"
+
+# Domyślny limit pamięci podręcznej miniatur (bajty pikseli)
+PREVIEW_CACHE_BYTES = 32 * 1024 * 1024
+
+# Domyślny limit dyskowej pamięci podglądów (bajty plików PNG)
+DISK_CACHE_BYTES = 64 * 1024 * 1024
+
+# Klucz metadanych podglądu w plikach PNG pamięci dyskowej
+_PNG_KLUCZ = "imageflow-preview"
+
+
+@dataclass
+class Preview:
+    """Podgląd pliku wraz z informacjami odczytanymi z nagłówka"""
+
+    path: str
+    format: Optional[str]
+    size: Tuple[int, int]
+    file_size: int
+    image: Image.Image
+    method: str = METHOD_FULL
+
+
+def _rozmiar_dopasowany(rozmiar, size):
+    """
+    Zwraca rozmiar obrazu po wpasowaniu w ramkę size (z zachowaniem proporcji).
+
+    Args:
+        rozmiar (tuple): Pełny rozmiar obrazu (szerokość, wysokość)
+        size (tuple): Ramka podglądu (szerokość, wysokość)
+
+    Returns:
+        tuple: Rozmiar podglądu, nie większy niż oryginał
+    """
+    szer, wys = rozmiar
+    skala = min(size[0] / szer, size[1] / wys, 1.0)
+    return max(1, math.ceil(szer * skala)), max(1, math.ceil(wys * skala))
+
+
+def _wybierz_strone_tiff(img, potrzebny):
+    """
+    Przechodzi do najmniejszej strony TIFF, która jest pomniejszoną kopią
+    pierwszej strony i nadal pokrywa potrzebny rozmiar (piramidy, podglądy).
+
+    Args:
+        img (PIL.Image.Image): Otwarty, jeszcze niezdekodowany plik TIFF
+        potrzebny (tuple): Minimalny rozmiar podglądu
+
+    Returns:
+        bool: True, jeśli wybrano stronę o mniejszej rozdzielczości
+    """
+    liczba_stron = getattr(img, "n_frames", 1)
+    if liczba_stron < 2:
+        return False
+    szer, wys = img.size
+    najlepsza, najlepszy_rozmiar = 0, szer * wys
+    for strona in range(1, liczba_stron):
+        img.seek(strona)
+        s, w = img.size
+        # Ta sama orientacja i proporcje (z tolerancją zaokrągleń)
+        if s < potrzebny[0] or w < potrzebny[1]:
+            continue
+        if abs(s * wys - w * szer) > max(szer, wys):
+            continue
+        if s * w < najlepszy_rozmiar:
+            najlepsza, najlepszy_rozmiar = strona, s * w
+    img.seek(najlepsza)
+    return najlepsza != 0
+
+
+def load_preview(path, size=PREVIEW_SIZE):
+    """
+    Wczytuje podgląd pliku w rozdzielczości bliskiej docelowej. Format,
+    pełna rozdzielczość i rozmiar pliku pochodzą z nagłówka, więc czas
+    podglądu prawie nie zależy od rozdzielczości źródła.
+
+    Args:
+        path (str): Ścieżka pliku
+        size (tuple): Ramka podglądu (szerokość, wysokość)
+
+    Returns:
+        Preview: Podgląd z miniaturą niezależną od otwartego pliku
+
+    Raises:
+        OSError: Gdy pliku nie można odczytać lub zdekodować
+    """
+    file_size = os.path.getsize(path)
+    with Image.open(path) as img:
+        fmt = img.format
+        pelny_rozmiar = img.size
+        potrzebny = _rozmiar_dopasowany(pelny_rozmiar, size)
+        method = METHOD_FULL
+        if fmt == "TIFF":
+            if _wybierz_strone_tiff(img, potrzebny):
+                method = METHOD_PAGE
+        elif img.draft(None, potrzebny) is not None:
+            # JPEG: skalowanie DCT 1/2-1/8; HEIF: najmniejsza wystarczająca miniatura
+            method = METHOD_EMBEDDED if fmt == "HEIF" else METHOD_DRAFT
+        img.thumbnail(size)
+        obraz = img.copy()
+    return Preview(path, fmt, pelny_rozmiar, file_size, obraz, method)
+
+
+# =========================================
+# Pamięć podręczna podglądów
+# =========================================
+def preview_key(path, size=PREVIEW_SIZE):
+    """
+    Zwraca klucz podglądu: ścieżka, rozmiar i mtime pliku oraz rozmiar
+    podglądu. Zmiana pliku daje nowy klucz, więc wpisy nie wymagają
+    unieważniania.
+
+    Args:
+        path (str): Ścieżka pliku
+        size (tuple): Ramka podglądu
+
+    Returns:
+        tuple: Klucz pamięci podręcznej
+
+    Raises:
+        OSError: Gdy pliku nie można odczytać
+    """
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns, tuple(size)
+
+
+def _rozmiar_w_bajtach(podglad):
+    obraz = podglad.image
+    return obraz.width * obraz.height * len(obraz.getbands())
+
+
+class PreviewCache:
+    """Pamięć podręczna podglądów LRU ograniczona liczbą bajtów pikseli"""
+
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._wpisy = OrderedDict()
+        self._blokada = threading.Lock()
+
+    def __len__(self):
+        return len(self._wpisy)
+
+    def get(self, key):
+        """
+        Zwraca podgląd dla klucza (i oznacza go jako ostatnio użyty).
+
+        Args:
+            key (tuple): Klucz z preview_key
+
+        Returns:
+            Preview: Podgląd albo None
+        """
+        with self._blokada:
+            podglad = self._wpisy.get(key)
+            if podglad is not None:
+                self._wpisy.move_to_end(key)
+            return podglad
+
+    def put(self, key, podglad):
+        """
+        Dodaje podgląd, usuwając najdawniej użyte wpisy ponad limit bajtów.
+
+        Args:
+            key (tuple): Klucz z preview_key
+            podglad (Preview): Podgląd do zapamiętania
+        """
+        rozmiar = _rozmiar_w_bajtach(podglad)
+        if rozmiar > self.max_bytes:
+            return
+        with self._blokada:
+            poprzedni = self._wpisy.pop(key, None)
+            if poprzedni is not None:
+                self.bytes -= _rozmiar_w_bajtach(poprzedni)
+            self._wpisy[key] = podglad
+            self.bytes += rozmiar
+            while self.bytes > self.max_bytes:
+                _, usuniety = self._wpisy.popitem(last=False)
+                self.bytes -= _rozmiar_w_bajtach(usuniety)
+
+    def clear(self):
+        """Usuwa wszystkie wpisy"""
+        with self._blokada:
+            self._wpisy.clear()
+            self.bytes = 0
+
+
+def default_cache_dir():
+    """
+    Zwraca systemowy folder pamięci podręcznej podglądów.
+
+    Returns:
+        str: Ścieżka folderu (może jeszcze nie istnieć)
+    """
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        baza = os.environ.get("LOCALAPPDATA", home)
+        return os.path.join(baza, "ImageFlow", "previews")
+    if sys.platform == "darwin":
+        return os.path.join(home, "Library", "Caches", "ImageFlow", "previews")
+    baza = os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+    return os.path.join(baza, "imageflow", "previews")
+
+
+class DiskPreviewCache:
+    """
+    Dyskowa pamięć podglądów (PNG) kluczowana ścieżką, rozmiarem i mtime.
+    Ograniczona liczbą bajtów - po przekroczeniu limitu usuwane są pliki
+    najdawniej użyte (odczyt odświeża mtime pliku podglądu).
+    """
+
+    def __init__(self, folder, max_bytes=DISK_CACHE_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.bytes = None  # Liczone przy pierwszym zapisie
+        self._blokada = threading.Lock()
+
+    def _sciezka(self, key):
+        skrot = hashlib.sha256(repr(key).encode("utf-8"))
+        return os.path.join(self.folder, f"{skrot.hexdigest()}.png")
+
+    def get(self, key):
+        """
+        Wczytuje podgląd z dysku.
+
+        Args:
+            key (tuple): Klucz z preview_key
+
+        Returns:
+            Preview: Podgląd albo None, gdy go nie ma lub jest nieczytelny
+        """
+        try:
+            with Image.open(self._sciezka(key)) as img:
+                img.load()
+                meta = json.loads(img.info[_PNG_KLUCZ])
+                obraz = img.copy()
+            # Oznacz jako ostatnio użyty (kolejność usuwania przy przycinaniu)
+            os.utime(self._sciezka(key))
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.debug("Pomijam uszkodzony podgląd na dysku: %s", e)
+            return None
+        return Preview(
+            key[0],
+            meta["format"],
+            tuple(meta["size"]),
+            key[1],
+            obraz,
+            METHOD_CACHED,
+        )
+
+    def put(self, key, podglad):
+        """
+        Zapisuje podgląd na dysku (atomowo; błędy zapisu są tylko logowane).
+
+        Args:
+            key (tuple): Klucz z preview_key
+            podglad (Preview): Podgląd do zapisania
+        """
+        cel = self._sciezka(key)
+        meta = PngImagePlugin.PngInfo()
+        meta.add_text(
+            _PNG_KLUCZ,
+            json.dumps({"format": podglad.format, "size": list(podglad.size)}),
+        )
+        tymczasowy = f"{cel}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            podglad.image.save(tymczasowy, "PNG", pnginfo=meta, compress_level=1)
+            os.replace(tymczasowy, cel)
+            rozmiar = os.path.getsize(cel)
+        except OSError as e:
+            logger.debug("Nie można zapisać podglądu na dysku: %s", e)
+            return
+        with self._blokada:
+            if self.bytes is None:
+                self.bytes = sum(rozmiar for _, rozmiar, _ in self._wpisy())
+            else:
+                self.bytes += rozmiar
+            if self.bytes > self.max_bytes:
+                self._przytnij()
+
+    def _wpisy(self):
+        """Zwraca (ścieżka, rozmiar, mtime) plików podglądów w folderze"""
+        wpisy = []
+        try:
+            with os.scandir(self.folder) as it:
+                for wpis in it:
+                    if wpis.name.endswith(".png"):
+                        try:
+                            st = wpis.stat()
+                        except OSError:
+                            continue
+                        wpisy.append((wpis.path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            pass
+        return wpisy
+
+    def _przytnij(self):
+        """Usuwa najdawniej użyte podglądy do 3/4 limitu (zapas na kolejne zapisy)"""
+        wpisy = sorted(self._wpisy(), key=lambda w: w[2])
+        self.bytes = sum(rozmiar for _, rozmiar, _ in wpisy)
+        cel = self.max_bytes * 3 // 4
+        for sciezka, rozmiar, _ in wpisy:
+            if self.bytes <= cel:
+                break
+            try:
+                os.remove(sciezka)
+            except OSError:
+                continue
+            self.bytes -= rozmiar
+
+
+# =========================================
+# Asynchroniczne wczytywanie podglądów
+# =========================================
+class PreviewLoader:
+    """
+    Wczytuje podglądy w wątku w tle. Czeka najwyżej jedno żądanie - nowe
+    zastępuje poprzednie, więc przy szybkim przewijaniu listy dekodowany
+    jest tylko ostatnio wybrany plik. Wyniki odbiera się przez poll().
+    """
+
+    def __init__(self, size=PREVIEW_SIZE, cache=None, disk_cache=None):
+        self.size = tuple(size)
+        self.cache = cache if cache is not None else PreviewCache()
+        self.disk_cache = disk_cache
+        self.generation = 0
+        self._oczekujace = None
+        self._wyniki = queue.Queue()
+        self._warunek = threading.Condition()
+        self._zamkniety = False
+        self._w_toku = None
+        self._watek = threading.Thread(
+            target=self._petla, name="imageflow-preview", daemon=True
+        )
+        self._watek.start()
+
+    def request(self, path):
+        """
+        Zleca wczytanie podglądu. Podgląd z pamięci zwracany jest od razu;
+        w przeciwnym razie wynik pojawi się w poll().
+
+        Args:
+            path (str): Ścieżka pliku
+
+        Returns:
+            Preview: Podgląd z pamięci podręcznej albo None
+        """
+        with self._warunek:
+            self.generation += 1
+            self._oczekujace = None
+            generacja = self.generation
+        try:
+            key = preview_key(path, self.size)
+        except OSError as e:
+            self._wyniki.put((generacja, path, None, e))
+            return None
+        podglad = self.cache.get(key)
+        if podglad is not None:
+            return podglad
+        with self._warunek:
+            if generacja == self.generation:
+                self._oczekujace = (generacja, path, key)
+                self._warunek.notify()
+        return None
+
+    def cancel(self):
+        """Anuluje oczekujące żądanie i unieważnia wyniki w toku"""
+        with self._warunek:
+            self.generation += 1
+            self._oczekujace = None
+
+    def poll(self):
+        """
+        Odbiera wynik najnowszego żądania, odrzucając nieaktualne.
+
+        Returns:
+            tuple: (path, Preview, None) albo (path, None, błąd); None, gdy brak wyniku
+        """
+        wynik = None
+        while True:
+            try:
+                generacja, path, podglad, blad = self._wyniki.get_nowait()
+            except queue.Empty:
+                return wynik
+            if generacja == self.generation:
+                wynik = (path, podglad, blad)
+
+    @property
+    def pending(self):
+        """
+        True, gdy żądanie czeka w kolejce lub trwa dekodowanie. Wynik trafia
+        do poll() przed zdjęciem flagi, więc po odczycie False wystarczy
+        jedno wywołanie poll().
+        """
+        with self._warunek:
+            return self._oczekujace is not None or self._w_toku is not None
+
+    def close(self):
+        """Zatrzymuje wątek roboczy"""
+        with self._warunek:
+            self._zamkniety = True
+            self._oczekujace = None
+            self._warunek.notify()
+        self._watek.join(timeout=1)
+
+    def _wczytaj(self, path, key):
+        if self.disk_cache is not None:
+            podglad = self.disk_cache.get(key)
+            if podglad is not None:
+                podglad.path = path
+                return podglad
+        podglad = load_preview(path, self.size)
+        if self.disk_cache is not None:
+            self.disk_cache.put(key, podglad)
+        return podglad
+
+    def _petla(self):
+        while True:
+            with self._warunek:
+                while self._oczekujace is None and not self._zamkniety:
+                    self._warunek.wait()
+                if self._zamkniety:
+                    return
+                generacja, path, key = self._oczekujace
+                self._oczekujace = None
+                self._w_toku = generacja
+            try:
+                podglad = self._wczytaj(path, key)
+                self.cache.put(key, podglad)
+                wynik = (generacja, path, podglad, None)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                wynik = (generacja, path, None, e)
+            # Wynik trafia do kolejki przed zdjęciem flagi, by pending nie "mrugnęło"
+            self._wyniki.put(wynik)
+            with self._warunek:
+                self._w_toku = None
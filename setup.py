@@ -20,7 +20,7 @@ setup(
     description="ImageFlow - Universal image converter with cross-platform support",
     long_description=long_description,
     long_description_content_type="text/markdown",
-    py_modules=["app"],
+    py_modules=["app", "engine", "manifest", "journal", "preview", "filequeue", "sharedframes", "encoders", "outputcache"],
     python_requires=">=3.8",
     install_requires=requirements,
     classifiers=[
@@ -0,0 +1,283 @@
+# ---
+# # ImageFlow - przekazywanie obrazów przez pamięć współdzieloną
+#
+# **Zdekodowane piksele przekazywane między procesami w blokach
+# multiprocessing.shared_memory zamiast serializacji (pickle) całego bufora.
+# Bloki pochodzą z puli, więc nie są tworzone od nowa dla każdego pliku.**
+#
+# Autor: Alan Steinbarth
+# ---
+
+import logging
+import threading
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+from PIL import Image, ImageMode
+
+logger = logging.getLogger(__name__)
+
+# Limit bajtów bezczynnych bloków przechowywanych w puli do ponownego użycia
+SHARED_POOL_BYTES = 256 * 1024 * 1024
+
+# Najmniejszy rozmiar bloku; większe są zaokrąglane do potęgi dwójki, aby
+# bloki dało się użyć ponownie dla obrazów o zbliżonych rozmiarach
+MIN_BLOCK_BYTES = 64 * 1024
+
+# Tryby, dla których Image.frombuffer współdzieli pamięć zamiast kopiować
+TRYBY_BEZ_KOPII = ("L", "P", "RGBA", "RGBX", "CMYK", "I;16", "I;16L", "I;16B")
+
+# Układ pikseli w bloku dla trybów spoza TRYBY_BEZ_KOPII. Pillow przechowuje
+# RGB w 4 bajtach na piksel (jak RGBX), więc w tym układzie piksele trafiają
+# do bloku jedną kopią, a odbiorca dostaje obraz RGBX bez kopii
+TRYBY_PRZESYLANIA = {"RGB": "RGBX"}
+
+
+@dataclass
+class Frame:
+    """
+    Opis obrazu zapisanego w bloku pamięci współdzielonej.
+
+    Args:
+        mode (str): Tryb obrazu Pillow
+        size (tuple): Rozmiar (szerokość, wysokość)
+        nbytes (int): Liczba bajtów pikseli w bloku
+        palette (bytes): Paleta dla trybu "P"
+        palette_mode (str): Tryb palety (np. "RGB")
+        info (dict): Metadane obrazu (Image.info)
+        data (bytes): Piksele przekazane bezpośrednio, gdy nie zmieściły się
+            w bloku (rzadki przypadek - szacunek z nagłówka był za mały)
+        rawmode (str): Układ pikseli w bloku (np. "RGBX" dla RGB); None -
+            tobytes() w trybie mode
+    """
+
+    mode: str
+    size: Tuple[int, int]
+    nbytes: int
+    palette: Optional[bytes] = None
+    palette_mode: Optional[str] = None
+    info: Optional[dict] = None
+    data: Optional[bytes] = None
+    rawmode: Optional[str] = None
+
+
+def frame_size(size, mode):
+    """
+    Szacuje liczbę bajtów pikseli obrazu w bloku (w układzie
+    z TRYBY_PRZESYLANIA, np. 4 bajty na piksel RGB) z nagłówka.
+
+    Args:
+        size (tuple): Rozmiar (szerokość, wysokość)
+        mode (str): Tryb obrazu Pillow
+
+    Returns:
+        int: Liczba bajtów
+    """
+    try:
+        opis = ImageMode.getmode(TRYBY_PRZESYLANIA.get(mode, mode))
+        bajty = len(opis.bands) * int(opis.typestr[-1])
+    except (KeyError, ValueError):
+        bajty = 4
+    return size[0] * size[1] * bajty
+
+
+def attach_block(name):
+    """
+    Dołącza do istniejącego bloku bez przejmowania jego usunięcia - blokiem
+    zarządza proces, który go utworzył (SharedFramePool). Procesy puli
+    (spawn) korzystają z resource_tracker procesu głównego, więc ponowna
+    rejestracja bloku w starszych wersjach Pythona nie prowadzi do jego
+    usunięcia przy zakończeniu procesu potomnego.
+
+    Args:
+        name (str): Nazwa bloku
+
+    Returns:
+        SharedMemory: Dołączony blok
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 nie ma parametru track
+        return shared_memory.SharedMemory(name=name)
+
+
+def _wklej_do_bloku(img, bufor, rawmode):
+    """
+    Kopiuje piksele obrazu wprost do pamięci bloku (jedna kopia, bez
+    pośredniego bufora tobytes()).
+    """
+    cel = Image.frombuffer(rawmode, img.size, bufor, "raw", rawmode, 0, 1)
+    try:
+        # Obraz z frombuffer jest dla Pillow tylko do odczytu (paste() by go
+        # skopiował) - wklejenie na poziomie rdzenia pisze wprost do bloku
+        cel.im.paste(img.im, (0, 0) + img.size)
+    finally:
+        cel.close()
+
+
+def write_frame(img, name):
+    """
+    Zapisuje piksele obrazu w bloku o podanej nazwie (strona procesu
+    dekodującego). Piksele trafiają do bloku jedną kopią - RGB w układzie
+    RGBX (TRYBY_PRZESYLANIA), który odbiorca odczytuje bez kopii. Gdy
+    piksele nie mieszczą się w bloku (lub tryb nie ma układu bez kopii),
+    trafiają do bloku albo do Frame.data przez tobytes().
+
+    Args:
+        img (PIL.Image.Image): Zdekodowany obraz
+        name (str): Nazwa bloku pamięci współdzielonej
+
+    Returns:
+        Frame: Opis zapisanego obrazu
+    """
+    ramka = Frame(img.mode, img.size, 0, info=dict(img.info))
+    if img.mode == "P" and img.palette is not None:
+        ramka.palette_mode = img.palette.mode
+        ramka.palette = bytes(img.getpalette(img.palette.mode))
+    rawmode = TRYBY_PRZESYLANIA.get(img.mode, img.mode)
+    potrzebne = frame_size(img.size, img.mode)
+    blok = attach_block(name)
+    try:
+        if rawmode in TRYBY_BEZ_KOPII and potrzebne <= blok.size:
+            bufor = blok.buf[:potrzebne]
+            try:
+                _wklej_do_bloku(img, bufor, rawmode)
+            finally:
+                bufor.release()
+            ramka.nbytes = potrzebne
+            ramka.rawmode = rawmode
+            return ramka
+        dane = img.tobytes()
+        ramka.nbytes = len(dane)
+        if len(dane) <= blok.size:
+            blok.buf[: len(dane)] = dane
+        else:
+            ramka.data = dane
+    finally:
+        blok.close()
+    return ramka
+
+
+def read_frame(block, frame):
+    """
+    Odtwarza obraz z bloku (strona procesu odbierającego). Dla trybów
+    z TRYBY_BEZ_KOPII i TRYBY_PRZESYLANIA obraz korzysta bezpośrednio
+    z pamięci bloku - blok nie może wrócić do puli, dopóki obraz jest
+    używany. Obraz RGB wraca w trybie RGBX (ten sam układ pikseli); formaty
+    bez zapisu RGBX wymagają convert("RGB") przy kodowaniu.
+
+    Args:
+        block (SharedMemory): Blok z pikselami
+        frame (Frame): Opis obrazu z write_frame
+
+    Returns:
+        PIL.Image.Image: Obraz
+    """
+    if frame.data is not None:
+        img = Image.frombytes(frame.mode, frame.size, frame.data)
+    else:
+        rawmode = frame.rawmode or frame.mode
+        img = Image.frombuffer(
+            rawmode, frame.size, block.buf[: frame.nbytes], "raw", rawmode, 0, 1
+        )
+    if frame.palette is not None:
+        img.putpalette(frame.palette, frame.palette_mode)
+    if frame.info:
+        img.info.update(frame.info)
+    return img
+
+
+class SharedFramePool:
+    """
+    Pula bloków pamięci współdzielonej. Rozmiary są zaokrąglane do potęgi
+    dwójki, a zwolnione bloki czekają na ponowne użycie (do max_bytes
+    bezczynnych bajtów). close() usuwa wszystkie bloki utworzone przez pulę.
+    Bezpieczna dla wielu wątków.
+    """
+
+    def __init__(self, max_bytes=SHARED_POOL_BYTES):
+        """
+        Args:
+            max_bytes (int): Limit bajtów bezczynnych bloków w puli
+        """
+        self.max_bytes = max_bytes
+        self.allocations = 0  # Liczba utworzonych bloków (statystyka)
+        self._wolne = {}  # rozmiar bloku -> lista bezczynnych bloków
+        self._bezczynne = 0
+        self._wszystkie = {}  # nazwa -> blok (do usunięcia w close)
+        # nazwa -> rozmiar z acquire (system może zaokrąglić block.size)
+        self._rozmiary = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bytes(self):
+        """Liczba bajtów bezczynnych bloków w puli"""
+        return self._bezczynne
+
+    def acquire(self, nbytes):
+        """
+        Zwraca blok o rozmiarze co najmniej nbytes (z puli lub nowy).
+
+        Args:
+            nbytes (int): Wymagana liczba bajtów
+
+        Returns:
+            SharedMemory: Blok pamięci współdzielonej
+        """
+        rozmiar = MIN_BLOCK_BYTES
+        while rozmiar < nbytes:
+            rozmiar *= 2
+        with self._lock:
+            wolne = self._wolne.get(rozmiar)
+            if wolne:
+                self._bezczynne -= rozmiar
+                return wolne.pop()
+            self.allocations += 1
+        blok = shared_memory.SharedMemory(create=True, size=rozmiar)
+        with self._lock:
+            self._wszystkie[blok.name] = blok
+            self._rozmiary[blok.name] = rozmiar
+        return blok
+
+    def release(self, block):
+        """
+        Zwraca blok do puli albo usuwa go, gdy pula przekroczyłaby limit.
+
+        Args:
+            block (SharedMemory): Blok z acquire()
+        """
+        with self._lock:
+            rozmiar = self._rozmiary.get(block.name, block.size)
+            if self._bezczynne + rozmiar <= self.max_bytes:
+                self._wolne.setdefault(rozmiar, []).append(block)
+                self._bezczynne += rozmiar
+                return
+            self._wszystkie.pop(block.name, None)
+            self._rozmiary.pop(block.name, None)
+        self._usun(block)
+
+    def close(self):
+        """Usuwa wszystkie bloki utworzone przez pulę."""
+        with self._lock:
+            bloki = list(self._wszystkie.values())
+            self._wszystkie.clear()
+            self._rozmiary.clear()
+            self._wolne.clear()
+            self._bezczynne = 0
+        for blok in bloki:
+            self._usun(blok)
+
+    @staticmethod
+    def _usun(block):
+        try:
+            block.close()
+        except BufferError:
+            # Obraz wciąż korzysta z bloku - pamięć zwolni system po jego
+            # usunięciu, nazwa bloku jest usuwana od razu
+            logger.debug("Blok %s wciąż w użyciu przy zamykaniu", block.name)
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            logger.debug("Blok %s został już usunięty", block.name)
@@ -0,0 +1,194 @@
+"""
+Testy jednostkowe dla profili kodera ImageFlow
+"""
+
+import unittest
+import tempfile
+import io
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from encoders import (
+        DEFAULT_PROFILE,
+        ENCODER_PROFILES,
+        PARAMETRY_KODERA,
+        QualityHistory,
+        SizeBudgetError,
+        calibrate,
+        encode_to_size,
+        encoder_params,
+        supports_target_size,
+    )
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+def obraz_testowy(tryb="RGB"):
+    """Obraz z gradientem i szumem - różnice między profilami są widoczne"""
+    szum = Image.effect_noise((160, 120), 10).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((160, 120)).convert("RGB")
+    return Image.blend(gradient, szum, 0.1).convert(tryb)
+
+
+class TestEncoderParams(unittest.TestCase):
+    """Testy parametrów zapisu dla profili"""
+
+    def test_quality_applied_to_lossy_formats(self):
+        """Test przekazania jakości do JPEG i WEBP"""
+        self.assertEqual(encoder_params("JPEG", "balanced", 70)["quality"], 70)
+        self.assertEqual(encoder_params("WEBP", "fastest", 55)["quality"], 55)
+        self.assertNotIn("quality", encoder_params("PNG", "smallest", 70))
+        self.assertEqual(encoder_params("BMP", "smallest", 70), {})
+
+    def test_default_jpeg_unchanged(self):
+        """Test zgodności profilu domyślnego z dotychczasowym zapisem JPEG"""
+        self.assertEqual(
+            encoder_params("JPEG", DEFAULT_PROFILE, 90),
+            {"quality": 90, "subsampling": 0},
+        )
+
+    def test_unknown_profile(self):
+        """Test błędu dla nieznanego profilu"""
+        with self.assertRaises(ValueError):
+            encoder_params("JPEG", "turbo")
+
+    def test_tiff_jpeg_fallback(self):
+        """Test kompresji deflate dla trybów, których TIFF/JPEG nie zapisze"""
+        self.assertEqual(
+            encoder_params("TIFF", "smallest", mode="RGB")["compression"], "jpeg"
+        )
+        self.assertEqual(
+            encoder_params("TIFF", "smallest", mode="RGBA"),
+            {"compression": "tiff_adobe_deflate"},
+        )
+
+    def test_every_profile_encodes(self):
+        """Test zapisu każdego formatu w każdym profilu"""
+        for tryb in ("RGB", "RGBA"):
+            obraz = obraz_testowy(tryb)
+            for format in PARAMETRY_KODERA:
+                if format == "JPEG" and tryb == "RGBA":
+                    continue
+                for profil in ENCODER_PROFILES:
+                    bufor = io.BytesIO()
+                    obraz.save(
+                        bufor, format, **encoder_params(format, profil, 80, tryb)
+                    )
+                    bufor.seek(0)
+                    with Image.open(bufor) as img:
+                        self.assertEqual(img.size, (160, 120), (format, profil))
+
+    def test_archival_is_lossless(self):
+        """Test bezstratnego zapisu w profilu archiwalnym"""
+        obraz = obraz_testowy()
+        for format in ("PNG", "WEBP", "TIFF"):
+            bufor = io.BytesIO()
+            obraz.save(bufor, format, **encoder_params(format, "archival", 50, "RGB"))
+            bufor.seek(0)
+            with Image.open(bufor) as img:
+                self.assertEqual(img.convert("RGB").tobytes(), obraz.tobytes(), format)
+
+
+class TestEncodeToSize(unittest.TestCase):
+    """Testy dopasowania jakości do limitu rozmiaru"""
+
+    def setUp(self):
+        self.obraz = obraz_testowy().resize((640, 480))
+
+    def rozmiar(self, format, jakosc):
+        bufor = io.BytesIO()
+        self.obraz.save(bufor, format, **encoder_params(format, "balanced", jakosc))
+        return bufor.tell()
+
+    def test_highest_quality_within_budget(self):
+        """Test wyboru najwyższej jakości mieszczącej się w limicie"""
+        for format in ("JPEG", "WEBP"):
+            limit = (self.rozmiar(format, 40) + self.rozmiar(format, 80)) // 2
+            dane, jakosc, proby = encode_to_size(
+                self.obraz, format, limit, max_quality=95, tolerance=0
+            )
+            self.assertLessEqual(len(dane), limit, format)
+            self.assertEqual(len(dane), self.rozmiar(format, jakosc), format)
+            self.assertGreater(self.rozmiar(format, jakosc + 1), limit, format)
+            # Wyszukiwanie binarne w zakresie 1-95
+            self.assertLessEqual(proby, 8, format)
+
+    def test_max_quality_when_it_fits(self):
+        """Test jednej próby, gdy maksymalna jakość mieści się w limicie"""
+        _, jakosc, proby = encode_to_size(self.obraz, "JPEG", 10**9, max_quality=90)
+        self.assertEqual((jakosc, proby), (90, 1))
+
+    def test_history_starts_search(self):
+        """Test startu od jakości dobranej dla podobnego obrazu"""
+        historia = QualityHistory()
+        limit = self.rozmiar("JPEG", 60)
+        _, jakosc, proby = encode_to_size(
+            self.obraz, "JPEG", limit, tolerance=0.2, history=historia
+        )
+        self.assertGreater(proby, 1)
+        podobny = self.obraz.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        _, jakosc_podobnego, proby = encode_to_size(
+            podobny, "JPEG", limit, tolerance=0.2, history=historia
+        )
+        self.assertEqual(proby, 1)
+        self.assertEqual(jakosc_podobnego, jakosc)
+
+    def test_budget_too_small(self):
+        """Test błędu, gdy obraz nie mieści się nawet przy najniższej jakości"""
+        with self.assertRaises(SizeBudgetError):
+            encode_to_size(self.obraz, "JPEG", 100)
+
+    def test_supported_formats(self):
+        """Test formatów obsługujących limit rozmiaru"""
+        self.assertTrue(supports_target_size("JPEG"))
+        self.assertTrue(supports_target_size("WEBP", "smallest"))
+        self.assertFalse(supports_target_size("WEBP", "archival"))
+        self.assertFalse(supports_target_size("PNG"))
+        with self.assertRaises(ValueError):
+            encode_to_size(self.obraz, "PNG", 10**6)
+
+
+class TestCalibrate(unittest.TestCase):
+    """Testy kalibracji profili"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.probki = []
+        for nazwa, tryb in (("zdjecie.png", "RGB"), ("logo.png", "RGBA")):
+            sciezka = os.path.join(self._tmp.name, nazwa)
+            obraz_testowy(tryb).save(sciezka)
+            self.probki.append(sciezka)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_reports_every_profile(self):
+        """Test pomiaru czasu i rozmiaru dla każdego profilu"""
+        wyniki = calibrate(self.probki, formats=["PNG", "JPEG"])
+        self.assertEqual(len(wyniki), 2 * len(ENCODER_PROFILES))
+        for wynik in wyniki:
+            # JPEG nie zapisze próbki RGBA
+            self.assertEqual(wynik.files, 1 if wynik.format == "JPEG" else 2)
+            self.assertGreater(wynik.bytes, 0)
+            self.assertGreater(wynik.seconds, 0)
+        png = {w.profile: w.bytes for w in wyniki if w.format == "PNG"}
+        self.assertLess(png["smallest"], png["fastest"])
+
+    def test_unreadable_sample_skipped(self):
+        """Test pominięcia uszkodzonej próbki"""
+        zla = os.path.join(self._tmp.name, "zla.jpg")
+        with open(zla, "wb") as f:
+            f.write(b"to nie jest obraz")
+        wyniki = calibrate([zla, self.probki[0]], formats=["WEBP"])
+        self.assertTrue(all(w.files == 1 for w in wyniki))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1357 @@
+"""
+Testy jednostkowe dla silnika konwersji ImageFlow (bez interfejsu graficznego)
+"""
+
+import unittest
+import tempfile
+import os
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from engine import (
+        ACTION_CONVERT,
+        ACTION_SKIP,
+        ConversionOptions,
+        ConversionResult,
+        OutputSpec,
+        Prefetcher,
+        StagedPipeline,
+        STATUS_ERROR,
+        STATUS_OK,
+        STATUS_SKIPPED,
+        convert_batch,
+        convert_file,
+        estimate_memory,
+        find_conflicts,
+        manifest_settings,
+        output_cache_key,
+        output_targets,
+        plan_batch,
+        probe_cost,
+        resolve_executor,
+        resolve_layout,
+        scan_folder,
+        schedule_plan,
+        target_path,
+    )
+    from outputcache import shared_cache
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+def utworz_obraz(folder, nazwa, rozmiar=(64, 48), kolor="red", format=None):
+    """Tworzy testowy plik graficzny i zwraca jego ścieżkę"""
+    sciezka = os.path.join(folder, nazwa)
+    Image.new("RGB", rozmiar, color=kolor).save(sciezka, format)
+    return sciezka
+
+
+class TestEngineBase(unittest.TestCase):
+    """Wspólne przygotowanie folderów dla testów silnika"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder_zrodlowy = os.path.join(self._tmp.name, "src")
+        self.folder_docelowy = os.path.join(self._tmp.name, "out")
+        os.makedirs(self.folder_zrodlowy)
+        os.makedirs(self.folder_docelowy)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+
+class TestConvertFile(TestEngineBase):
+    """Testy konwersji pojedynczego pliku"""
+
+    def test_target_path(self):
+        """Test wyznaczania ścieżki docelowej"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, format="PNG")
+        self.assertEqual(
+            target_path("/a/b/zdjecie.heic", opcje),
+            os.path.normpath(os.path.join(self.folder_docelowy, "zdjecie.png")),
+        )
+
+    def test_convert_png_to_jpeg(self):
+        """Test konwersji PNG do JPEG"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, quality=80)
+
+        wynik = convert_file(zrodlo, opcje)
+
+        self.assertIsInstance(wynik, ConversionResult)
+        self.assertEqual(wynik.status, STATUS_OK)
+        self.assertTrue(wynik.ok)
+        with Image.open(wynik.target) as img:
+            self.assertEqual(img.format, "JPEG")
+            self.assertEqual(img.size, (64, 48))
+
+    def test_thumbnail_from_decoded_image(self):
+        """Test miniatury tworzonej z tego samego zdekodowanego obrazu"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "duzy.png", rozmiar=(800, 600))
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, thumbnail_size=(200, 200)
+        )
+
+        wynik = convert_file(zrodlo, opcje)
+
+        self.assertTrue(wynik.ok)
+        self.assertEqual(wynik.thumbnail.size, (200, 150))
+        with Image.open(wynik.target) as img:
+            self.assertEqual(img.size, (800, 600))
+
+    def test_no_thumbnail_by_default(self):
+        """Test braku miniatury w trybie bezobsługowym"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+
+        self.assertIsNone(convert_file(zrodlo, opcje).thumbnail)
+
+    def test_single_open_of_source(self):
+        """Test czy plik źródłowy jest otwierany tylko raz"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+
+        with patch("builtins.open", wraps=open) as mock_open_func:
+            convert_file(zrodlo, opcje)
+
+        otwarcia = [c for c in mock_open_func.call_args_list if c.args[0] == zrodlo]
+        self.assertEqual(len(otwarcia), 1)
+
+    def test_truncated_file_returns_error(self):
+        """Test wykrywania uciętego pliku bez osobnego verify()"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png", rozmiar=(256, 256))
+        with open(zrodlo, "rb") as f:
+            dane = f.read()
+        with open(zrodlo, "wb") as f:
+            f.write(dane[: len(dane) // 2])
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+
+        self.assertEqual(convert_file(zrodlo, opcje).status, STATUS_ERROR)
+
+    def test_corrupted_file_returns_error(self):
+        """Test czy uszkodzony plik daje rekord błędu zamiast wyjątku"""
+        zrodlo = os.path.join(self.folder_zrodlowy, "zepsuty.jpg")
+        with open(zrodlo, "wb") as f:
+            f.write(b"to nie jest obraz")
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+
+        wynik = convert_file(zrodlo, opcje)
+
+        self.assertEqual(wynik.status, STATUS_ERROR)
+        self.assertIn("uszkodzony", wynik.error)
+        self.assertFalse(os.path.exists(wynik.target))
+
+    def test_oversized_image_returns_error(self):
+        """Test czy zbyt duży obraz daje rekord błędu i nie przerywa partii"""
+        duzy = utworz_obraz(self.folder_zrodlowy, "duzy.png", rozmiar=(100, 100))
+        maly = utworz_obraz(self.folder_zrodlowy, "maly.png", rozmiar=(10, 10))
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, executor="serial")
+
+        # Błąd DecompressionBombError pojawia się powyżej 2x limitu
+        with patch("engine.Image.MAX_IMAGE_PIXELS", 1000):
+            wyniki = list(convert_batch([duzy, maly], opcje))
+
+        self.assertEqual([w.status for w in wyniki], [STATUS_ERROR, STATUS_OK])
+        self.assertIn("zbyt duży", wyniki[0].error)
+
+    def test_import_keeps_global_pixel_limit(self):
+        """Test czy import silnika nie zmienia globalnego limitu Pillow"""
+        kod = (
+            "from PIL import Image; przed = Image.MAX_IMAGE_PIXELS; "
+            "import engine; print(Image.MAX_IMAGE_PIXELS == przed)"
+        )
+        wynik = subprocess.run(
+            [sys.executable, "-c", kod],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(wynik.stdout.strip(), "True")
+
+    def test_per_call_pixel_limit(self):
+        """Test limitu pikseli z ustawień konwersji (bez zmiany globalnego)"""
+        duzy = utworz_obraz(self.folder_zrodlowy, "duzy.png", rozmiar=(100, 100))
+        maly = utworz_obraz(self.folder_zrodlowy, "maly.png", rozmiar=(10, 10))
+        for executor in ("serial", "pipeline"):
+            opcje = ConversionOptions(
+                output_dir=os.path.join(self.folder_docelowy, executor),
+                executor=executor,
+                max_image_pixels=1000,
+            )
+            os.makedirs(opcje.output_dir)
+            wyniki = list(convert_batch([duzy, maly], opcje))
+            self.assertEqual(
+                [w.status for w in wyniki], [STATUS_ERROR, STATUS_OK], executor
+            )
+            self.assertIn("zbyt duży", wyniki[0].error)
+
+    def test_encoder_value_error_returns_error(self):
+        """Test czy ValueError kodera daje rekord błędu"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+
+        with patch("engine._zapisz_obraz", side_effect=ValueError("zły tryb")):
+            wynik = convert_file(zrodlo, opcje)
+
+        self.assertEqual(wynik.status, STATUS_ERROR)
+        self.assertIn("zły tryb", wynik.error)
+
+
+class TestScanFolder(TestEngineBase):
+    """Testy przeglądania folderów"""
+
+    def setUp(self):
+        super().setUp()
+        for sciezka in ["a.jpg", "b.txt", "C.HEIC", "sub/d.png", "sub/deep/e.tiff"]:
+            pelna = os.path.join(self.folder_zrodlowy, sciezka)
+            os.makedirs(os.path.dirname(pelna), exist_ok=True)
+            with open(pelna, "wb") as f:
+                f.write(b"x")
+
+    def wzgledne(self, sciezki):
+        return [os.path.relpath(p, self.folder_zrodlowy) for p in sciezki]
+
+    def test_recursive_scan_filters_extensions(self):
+        """Test przeglądania z podfolderami i filtrowania rozszerzeń"""
+        znalezione = self.wzgledne(scan_folder(self.folder_zrodlowy))
+        self.assertEqual(
+            znalezione,
+            [
+                "C.HEIC",
+                "a.jpg",
+                os.path.join("sub", "d.png"),
+                os.path.join("sub", "deep", "e.tiff"),
+            ],
+        )
+
+    def test_non_recursive_scan(self):
+        """Test przeglądania bez podfolderów"""
+        znalezione = self.wzgledne(scan_folder(self.folder_zrodlowy, recursive=False))
+        self.assertEqual(znalezione, ["C.HEIC", "a.jpg"])
+
+    def test_scan_is_lazy_and_cancellable(self):
+        """Test przerwania przeglądania"""
+        wyniki = scan_folder(self.folder_zrodlowy, cancel=lambda: True)
+        self.assertEqual(list(wyniki), [])
+
+    @unittest.skipIf(not hasattr(os, "symlink"), "Brak dowiązań symbolicznych")
+    def test_directory_symlink_loop_not_followed(self):
+        """Test pominięcia dowiązań do folderów (brak pętli)"""
+        try:
+            os.symlink(
+                self.folder_zrodlowy, os.path.join(self.folder_zrodlowy, "petla")
+            )
+        except OSError:
+            self.skipTest("Nie można utworzyć dowiązania")
+        self.assertEqual(len(list(scan_folder(self.folder_zrodlowy))), 4)
+
+
+class TestConvertBatch(TestEngineBase):
+    """Testy konwersji wsadowej"""
+
+    def test_yields_result_per_file(self):
+        """Test czy generator zwraca rekord dla każdego pliku"""
+        pliki = [utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png") for i in range(3)]
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, format="WEBP")
+
+        wyniki = list(convert_batch(pliki, opcje))
+
+        self.assertEqual([w.source for w in wyniki], pliki)
+        self.assertTrue(all(w.ok for w in wyniki))
+
+    def test_invalid_format_raises(self):
+        """Test odrzucenia nieobsługiwanego formatu"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, format="XYZ")
+        with self.assertRaises(ValueError):
+            list(convert_batch([], opcje))
+
+    def test_cancel_stops_batch(self):
+        """Test anulowania konwersji"""
+        pliki = [utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png") for i in range(3)]
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+        przetworzone = []
+
+        for wynik in convert_batch(pliki, opcje, cancel=lambda: len(przetworzone)):
+            przetworzone.append(wynik)
+
+        self.assertEqual(len(przetworzone), 1)
+
+    def test_skip_policy_keeps_existing(self):
+        """Test pominięcia istniejącego pliku przy polityce skip"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, conflict_policy="skip"
+        )
+        with open(target_path(zrodlo, opcje), "wb") as f:
+            f.write(b"stary plik")
+
+        wyniki = list(convert_batch([zrodlo], opcje))
+
+        self.assertEqual(wyniki[0].status, STATUS_SKIPPED)
+        with open(wyniki[0].target, "rb") as f:
+            self.assertEqual(f.read(), b"stary plik")
+
+
+class TestPlanBatch(TestEngineBase):
+    """Testy planowania plików docelowych i rozstrzygania konfliktów"""
+
+    def setUp(self):
+        super().setUp()
+        self.zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        self.istniejacy = os.path.join(self.folder_docelowy, "obraz.jpg")
+        with open(self.istniejacy, "wb") as f:
+            f.write(b"stary plik")
+
+    def opcje(self, polityka):
+        return ConversionOptions(
+            output_dir=self.folder_docelowy, conflict_policy=polityka
+        )
+
+    def test_overwrite(self):
+        """Test polityki nadpisywania"""
+        plan = plan_batch([self.zrodlo], self.opcje("overwrite"))
+        self.assertEqual(plan[0].action, ACTION_CONVERT)
+        self.assertTrue(plan[0].conflict)
+        self.assertEqual(plan[0].target, os.path.normpath(self.istniejacy))
+
+    def test_rename(self):
+        """Test zmiany nazwy z przyrostkiem"""
+        drugi = os.path.join(self._tmp.name, "obraz.png")
+        Image.new("RGB", (8, 8)).save(drugi)
+
+        plan = plan_batch([self.zrodlo, drugi], self.opcje("rename"))
+
+        nazwy = [os.path.basename(p.target) for p in plan]
+        self.assertEqual(nazwy, ["obraz (1).jpg", "obraz (2).jpg"])
+        self.assertTrue(all(p.action == ACTION_CONVERT for p in plan))
+
+    def test_rename_many_collisions(self):
+        """Test zmiany nazw przy tysiącach kolizji (planowanie liniowe)"""
+        with open(os.path.join(self.folder_docelowy, "obraz (2).jpg"), "wb") as f:
+            f.write(b"zajety")
+        zrodla = [f"/zrodla/{i}/obraz.png" for i in range(5000)]
+
+        plan = plan_batch(zrodla, self.opcje("rename"))
+
+        cele = [os.path.basename(p.target) for p in plan]
+        self.assertEqual(len(set(cele)), 5000)
+        self.assertEqual(cele[:3], ["obraz (1).jpg", "obraz (3).jpg", "obraz (4).jpg"])
+        self.assertNotIn("obraz (2).jpg", cele)
+
+    def test_skip_if_newer(self):
+        """Test pomijania gdy plik docelowy jest nowszy"""
+        os.utime(self.zrodlo, (1000, 1000))
+        plan = plan_batch([self.zrodlo], self.opcje("skip_if_newer"))
+        self.assertEqual(plan[0].action, ACTION_SKIP)
+
+        os.utime(self.istniejacy, (500, 500))
+        plan = plan_batch([self.zrodlo], self.opcje("skip_if_newer"))
+        self.assertEqual(plan[0].action, ACTION_CONVERT)
+
+    def test_duplicate_in_batch_overwrite(self):
+        """Test konfliktu wewnątrz partii - wygrywa późniejsze źródło"""
+        os.remove(self.istniejacy)
+        drugi = os.path.join(self._tmp.name, "obraz.png")
+        Image.new("RGB", (8, 8)).save(drugi)
+
+        plan = plan_batch([self.zrodlo, drugi], self.opcje("overwrite"))
+
+        self.assertEqual([p.action for p in plan], [ACTION_SKIP, ACTION_CONVERT])
+
+    def test_invalid_policy(self):
+        """Test odrzucenia nieznanej polityki"""
+        with self.assertRaises(ValueError):
+            plan_batch([self.zrodlo], self.opcje("zapytaj"))
+
+    def test_find_conflicts(self):
+        """Test wykrywania konfliktów przed konwersją"""
+        konflikty = find_conflicts([self.zrodlo], self.opcje("overwrite"))
+        self.assertEqual(konflikty, [os.path.normpath(self.istniejacy)])
+
+    def test_plan_reported_from_batch(self):
+        """Test przekazania planu partii bez osobnego planowania"""
+        plany = []
+        with patch("engine.plan_batch", wraps=plan_batch) as mock_plan:
+            list(
+                convert_batch(
+                    [self.zrodlo], self.opcje("overwrite"), on_plan=plany.append
+                )
+            )
+        self.assertEqual(mock_plan.call_count, 1)
+        self.assertEqual([[p.conflict for p in plan] for plan in plany], [[True]])
+
+
+class TestOutputLayout(TestEngineBase):
+    """Testy układów plików wynikowych"""
+
+    def setUp(self):
+        super().setUp()
+        self.pliki = []
+        for podfolder in ("2023", "2024"):
+            folder = os.path.join(self.folder_zrodlowy, podfolder)
+            os.makedirs(folder)
+            self.pliki.append(utworz_obraz(folder, "IMG_1.png"))
+
+    def test_tree_mirrors_source_folders(self):
+        """Test odwzorowania folderów źródłowych względem wspólnego folderu"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, layout="tree")
+        wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertTrue(all(w.ok for w in wyniki))
+        for podfolder in ("2023", "2024"):
+            self.assertTrue(
+                os.path.isfile(
+                    os.path.join(self.folder_docelowy, podfolder, "IMG_1.jpg")
+                )
+            )
+
+    def test_resolve_layout_fixes_root(self):
+        """Test ustalenia folderu bazowego dla całej partii"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, layout="tree")
+        ustalone = resolve_layout(opcje, self.pliki)
+        self.assertEqual(ustalone.source_root, os.path.abspath(self.folder_zrodlowy))
+        # Ten sam folder bazowy daje tę samą ścieżkę dla podzbioru partii
+        self.assertEqual(
+            target_path(self.pliki[1], ustalone),
+            os.path.normpath(os.path.join(self.folder_docelowy, "2024", "IMG_1.jpg")),
+        )
+
+    def test_sharded_layout_is_stable(self):
+        """Test podfolderów wyznaczonych skrótem ścieżki źródła"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, layout="sharded")
+        cel = target_path(self.pliki[0], opcje)
+        wzgledna = os.path.relpath(cel, self.folder_docelowy).split(os.sep)
+        self.assertEqual(len(wzgledna), 3)
+        self.assertTrue(all(len(czesc) == 2 for czesc in wzgledna[:2]))
+        self.assertEqual(cel, target_path(self.pliki[0], opcje))
+        self.assertNotEqual(cel, target_path(self.pliki[1], opcje))
+        wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertTrue(all(w.ok and os.path.isfile(w.target) for w in wyniki))
+
+    def test_name_template(self):
+        """Test szablonu nazwy pliku wynikowego"""
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, name_template="{parent}_{stem}"
+        )
+        plan = plan_batch(self.pliki, opcje)
+        self.assertEqual(
+            [os.path.basename(p.target) for p in plan],
+            ["2023_IMG_1.jpg", "2024_IMG_1.jpg"],
+        )
+        self.assertFalse(any(p.conflict for p in plan))
+
+    def test_invalid_layout_and_template(self):
+        """Test błędu dla nieznanego układu i pola szablonu"""
+        with self.assertRaises(ValueError):
+            resolve_layout(
+                ConversionOptions(output_dir=self.folder_docelowy, layout="x"), []
+            )
+        with self.assertRaises(ValueError):
+            resolve_layout(
+                ConversionOptions(output_dir=self.folder_docelowy, name_template="{x}"),
+                [],
+            )
+
+    def test_conflicts_checked_in_subfolders(self):
+        """Test wykrywania istniejących plików w podfolderach docelowych"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, layout="tree")
+        os.makedirs(os.path.join(self.folder_docelowy, "2024"))
+        istniejacy = utworz_obraz(
+            os.path.join(self.folder_docelowy, "2024"), "IMG_1.jpg", format="JPEG"
+        )
+        self.assertEqual(
+            find_conflicts(self.pliki, opcje), [os.path.normpath(istniejacy)]
+        )
+
+
+class TestSchedule(TestEngineBase):
+    """Testy kolejności wykonania partii"""
+
+    def setUp(self):
+        super().setUp()
+        self.maly = utworz_obraz(self.folder_zrodlowy, "maly.png", (10, 10))
+        self.duzy = utworz_obraz(self.folder_zrodlowy, "duzy.png", (300, 200))
+        self.sredni = utworz_obraz(self.folder_zrodlowy, "sredni.png", (100, 100))
+        self.pliki = [self.maly, self.duzy, self.sredni]
+
+    def test_probe_cost_reads_header(self):
+        """Test szacowania kosztu z nagłówka pliku"""
+        piksele, rozmiar = probe_cost(self.duzy)
+        self.assertEqual(piksele, 60000)
+        self.assertEqual(rozmiar, os.path.getsize(self.duzy))
+        self.assertEqual(probe_cost(os.path.join(self._tmp.name, "brak.png")), (0, 0))
+
+    def test_largest_first(self):
+        """Test kolejności od największego pliku"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+        plan = schedule_plan(plan_batch(self.pliki, opcje), "largest_first")
+        self.assertEqual([p.source for p in plan], [self.duzy, self.sredni, self.maly])
+
+    def test_skipped_items_first(self):
+        """Test pozycji bez pracy na początku planu"""
+        utworz_obraz(self.folder_docelowy, "maly.jpg", format="JPEG")
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, conflict_policy="skip"
+        )
+        plan = schedule_plan(plan_batch(self.pliki, opcje), "largest_first")
+        self.assertEqual(plan[0].source, self.maly)
+        self.assertEqual(plan[0].action, ACTION_SKIP)
+
+    def test_locality_groups_folders(self):
+        """Test grupowania plików według folderu"""
+        inny = os.path.join(self._tmp.name, "inny")
+        os.makedirs(inny)
+        pliki = [
+            utworz_obraz(self.folder_zrodlowy, "a.png"),
+            utworz_obraz(inny, "b.png"),
+            utworz_obraz(self.folder_zrodlowy, "c.png"),
+        ]
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+        plan = schedule_plan(plan_batch(pliki, opcje), "locality")
+        foldery = [os.path.dirname(p.source) for p in plan]
+        zmiany = sum(1 for a, b in zip(foldery, foldery[1:]) if a != b)
+        self.assertEqual(zmiany, 1)
+
+    def test_batch_uses_schedule(self):
+        """Test wykonania partii w kolejności polityki"""
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            executor="serial",
+            schedule="largest_first",
+        )
+        wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertEqual(wyniki[0].source, self.duzy)
+        self.assertTrue(all(w.ok for w in wyniki))
+
+    def test_invalid_schedule(self):
+        """Test błędu dla nieznanej kolejności"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, schedule="x")
+        with self.assertRaises(ValueError):
+            list(convert_batch(self.pliki, opcje))
+
+
+class TestMemoryBudget(TestEngineBase):
+    """Testy ograniczenia pamięci równoległych zadań"""
+
+    def setUp(self):
+        super().setUp()
+        self.pliki = [
+            utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png", (100, 100))
+            for i in range(6)
+        ]
+        self.lock = threading.Lock()
+        self.w_toku = 0
+        self.maks_w_toku = 0
+        self.duze_w_toku = 0
+        self.maks_duzych = 0
+
+    def konwersja(self, source, options, target=None, data=None):
+        duzy = "duzy" in source
+        with self.lock:
+            self.w_toku += 1
+            self.maks_w_toku = max(self.maks_w_toku, self.w_toku)
+            if duzy:
+                self.duze_w_toku += 1
+                self.maks_duzych = max(self.maks_duzych, self.duze_w_toku)
+        time.sleep(0.02)
+        with self.lock:
+            self.w_toku -= 1
+            if duzy:
+                self.duze_w_toku -= 1
+        return ConversionResult(source, target, STATUS_OK)
+
+    def test_estimate_from_header(self):
+        """Test szacowania pamięci z nagłówka"""
+        sciezka = utworz_obraz(self.folder_zrodlowy, "rgba.png", (100, 50))
+        Image.new("RGBA", (100, 50)).save(sciezka)
+        oczekiwane = os.path.getsize(sciezka) + int(100 * 50 * 4 * 1.5)
+        self.assertEqual(estimate_memory(sciezka), oczekiwane)
+        self.assertEqual(estimate_memory(os.path.join(self._tmp.name, "brak")), 0)
+
+    def test_budget_limits_concurrency(self):
+        """Test uruchamiania tylko zadań mieszczących się w budżecie"""
+        koszt = estimate_memory(self.pliki[0])
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            executor="thread",
+            workers=4,
+            memory_budget=koszt * 2,
+        )
+        with patch("engine.convert_file", side_effect=self.konwersja):
+            wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertEqual(len(wyniki), 6)
+        self.assertLessEqual(self.maks_w_toku, 2)
+
+    def test_oversized_items_run_one_at_a_time(self):
+        """Test osobnego toru dla plików większych niż budżet"""
+        duze = [
+            utworz_obraz(self.folder_zrodlowy, f"duzy{i}.png", (400, 400))
+            for i in range(3)
+        ]
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            executor="thread",
+            workers=4,
+            ordered=False,
+            memory_budget=estimate_memory(self.pliki[0]) * 4,
+        )
+        with patch("engine.convert_file", side_effect=self.konwersja):
+            wyniki = list(convert_batch(duze + self.pliki, opcje))
+        self.assertEqual(len(wyniki), 9)
+        self.assertEqual(self.maks_duzych, 1)
+
+    def test_budget_limits_pipeline(self):
+        """Test budżetu pamięci w potoku etapowym"""
+        koszt = estimate_memory(self.pliki[0])
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            executor="pipeline",
+            workers=4,
+            memory_budget=koszt * 2,
+        )
+        zajete = []
+        przyjmij = StagedPipeline._przyjmij
+
+        def sledz(potok, source, stop):
+            wynik = przyjmij(potok, source, stop)
+            zajete.append(potok._pamiec_w_toku)
+            return wynik
+
+        with patch.object(StagedPipeline, "_przyjmij", autospec=True) as mock:
+            mock.side_effect = sledz
+            wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertTrue(all(w.ok for w in wyniki))
+        self.assertEqual(len(zajete), 6)
+        self.assertLessEqual(max(zajete), koszt * 2)
+
+    def test_headers_read_once_off_dispatch_thread(self):
+        """Test jednego odczytu nagłówka na plik, poza wątkiem zlecającym"""
+        watki = []
+
+        def naglowek(source):
+            watki.append(threading.current_thread().name)
+            with Image.open(source) as img:
+                return img.size, img.mode
+
+        for schedule in ("input", "largest_first"):
+            watki.clear()
+            opcje = ConversionOptions(
+                output_dir=self.folder_docelowy,
+                executor="thread",
+                workers=2,
+                schedule=schedule,
+                memory_budget=10**9,
+                conflict_policy="overwrite",
+            )
+            with patch("engine._odczytaj_naglowek", side_effect=naglowek):
+                wyniki = list(convert_batch(self.pliki, opcje))
+            self.assertTrue(all(w.ok for w in wyniki))
+            self.assertEqual(len(watki), 6, schedule)
+            if schedule == "input":
+                self.assertTrue(all(w.startswith("imageflow-probe") for w in watki))
+
+    def test_prefetch_buffer_counted_in_budget(self):
+        """Test odliczenia bufora wyprzedzenia od budżetu pamięci"""
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            executor="thread",
+            memory_budget=1000,
+            prefetch=2,
+            prefetch_bytes=800,
+        )
+        with patch("engine.Prefetcher", wraps=Prefetcher) as mock_prefetcher, patch(
+            "engine.convert_file", side_effect=self.konwersja
+        ) as mock_convert:
+            list(convert_batch(self.pliki, opcje))
+        self.assertEqual(mock_prefetcher.call_args.kwargs["max_bytes"], 500)
+        self.assertEqual(mock_convert.call_args.args[1].memory_budget, 500)
+
+
+class TestStagedPipeline(TestEngineBase):
+    """Testy potoku etapowego"""
+
+    def setUp(self):
+        super().setUp()
+        self.pliki = [
+            utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png", (120, 80))
+            for i in range(12)
+        ]
+
+    def opcje(self, **kwargs):
+        return ConversionOptions(
+            output_dir=self.folder_docelowy, executor="pipeline", workers=3, **kwargs
+        )
+
+    def test_pipeline_ordered(self):
+        """Test konwersji w potoku z zachowaniem kolejności"""
+        wyniki = list(convert_batch(self.pliki, self.opcje(thumbnail_size=(40, 40))))
+        self.assertEqual([w.source for w in wyniki], self.pliki)
+        self.assertTrue(all(w.ok and os.path.isfile(w.target) for w in wyniki))
+        self.assertEqual(wyniki[0].thumbnail.size, (40, 27))
+
+    def test_pipeline_errors_and_skips(self):
+        """Test błędów i pominięć przechodzących przez potok"""
+        zly = os.path.join(self.folder_zrodlowy, "zly.png")
+        with open(zly, "wb") as f:
+            f.write(b"to nie jest obraz")
+        utworz_obraz(self.folder_docelowy, "obraz0.jpg", format="JPEG")
+        opcje = self.opcje(ordered=False, conflict_policy="skip")
+        wyniki = list(convert_batch(self.pliki + [zly], opcje))
+        statusy = {w.source: w.status for w in wyniki}
+        self.assertEqual(len(wyniki), 13)
+        self.assertEqual(statusy[zly], STATUS_ERROR)
+        self.assertEqual(statusy[self.pliki[0]], STATUS_SKIPPED)
+
+    def test_utilization_per_stage(self):
+        """Test pomiaru wykorzystania etapów"""
+        potok = StagedPipeline(self.opcje(pipeline_workers={"read": 1}), workers=2)
+        zadania = [
+            (p, os.path.join(self.folder_docelowy, f"{i}.jpg"))
+            for i, p in enumerate(self.pliki)
+        ]
+        wyniki = list(potok.run(zadania))
+        self.assertEqual(len(wyniki), 12)
+        wykorzystanie = potok.utilization()
+        self.assertEqual(set(wykorzystanie), {"read", "decode", "transform", "encode"})
+        self.assertTrue(all(0.0 <= u <= 1.0 for u in wykorzystanie.values()))
+        self.assertGreater(wykorzystanie["encode"], 0.0)
+
+    def test_pipeline_interrupted(self):
+        """Test przerwania iteracji potoku"""
+        wyniki = convert_batch(self.pliki, self.opcje())
+        next(wyniki)
+        wyniki.close()
+        self.assertFalse(
+            any(t.name.startswith("imageflow-pipeline") for t in threading.enumerate())
+        )
+
+    def test_decode_in_processes(self):
+        """Test dekodowania w procesach z pikselami w pamięci współdzielonej"""
+        Image.new("RGBA", (50, 40), color=(1, 2, 3, 255)).save(self.pliki[0])
+        opcje = self.opcje(format="PNG", decode_processes=1, thumbnail_size=(20, 20))
+        wyniki = list(convert_batch(self.pliki[:4], opcje))
+        self.assertTrue(all(w.ok for w in wyniki))
+        with Image.open(wyniki[0].target) as img:
+            self.assertEqual(img.getpixel((0, 0)), (1, 2, 3, 255))
+
+    def test_rgb_decoded_in_processes(self):
+        """Test obrazów RGB przekazanych z procesów jako RGBX"""
+        Image.new("RGB", (50, 40), color=(10, 20, 30)).save(self.pliki[0])
+        for format in ("PNG", "TIFF", "JPEG", "WEBP"):
+            with self.subTest(format=format):
+                opcje = self.opcje(
+                    format=format,
+                    decode_processes=1,
+                    thumbnail_size=(20, 20),
+                    conflict_policy="overwrite",
+                )
+                wynik = list(convert_batch(self.pliki[:1], opcje))[0]
+                self.assertTrue(wynik.ok, wynik.error)
+                self.assertEqual(wynik.thumbnail.mode, "RGB")
+                with Image.open(wynik.target) as img:
+                    self.assertEqual(img.mode, "RGB")
+
+    def test_unknown_stage(self):
+        """Test błędu dla nieznanego etapu"""
+        with self.assertRaises(ValueError):
+            StagedPipeline(self.opcje(pipeline_workers={"gpu": 1}))
+
+
+class TestPrefetcher(TestEngineBase):
+    """Testy wczytywania plików z wyprzedzeniem"""
+
+    def setUp(self):
+        super().setUp()
+        self.pliki = [
+            utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png", (60, 40))
+            for i in range(6)
+        ]
+
+    def czekaj_na_bufor(self, wyprzedzenie, liczba):
+        koniec = time.monotonic() + 5
+        while len(wyprzedzenie._bufor) < liczba and time.monotonic() < koniec:
+            time.sleep(0.01)
+
+    def test_reads_ahead_within_file_limit(self):
+        """Test wczytania kolejnych plików z limitem liczby plików"""
+        wyprzedzenie = Prefetcher(self.pliki, max_files=2)
+        try:
+            self.czekaj_na_bufor(wyprzedzenie, 2)
+            time.sleep(0.05)
+            self.assertEqual(len(wyprzedzenie._bufor), 2)
+            with open(self.pliki[0], "rb") as f:
+                self.assertEqual(wyprzedzenie.get(self.pliki[0]), f.read())
+            self.czekaj_na_bufor(wyprzedzenie, 2)
+            self.assertIn(self.pliki[2], wyprzedzenie._bufor)
+        finally:
+            wyprzedzenie.close()
+
+    def test_byte_budget(self):
+        """Test limitu bajtów bufora"""
+        wyprzedzenie = Prefetcher(self.pliki, max_files=10, max_bytes=1)
+        try:
+            self.czekaj_na_bufor(wyprzedzenie, 1)
+            time.sleep(0.05)
+            self.assertEqual(len(wyprzedzenie._bufor), 1)
+        finally:
+            wyprzedzenie.close()
+
+    def test_consumer_ahead_reads_itself(self):
+        """Test pominięcia pliku, którego konsument zażądał wcześniej"""
+        wyprzedzenie = Prefetcher(self.pliki, max_files=1)
+        try:
+            self.assertIsNone(wyprzedzenie.get(self.pliki[-1]))
+            for plik in self.pliki[:-1]:
+                wyprzedzenie.get(plik)
+            time.sleep(0.05)
+            self.assertNotIn(self.pliki[-1], wyprzedzenie._bufor)
+        finally:
+            wyprzedzenie.close()
+
+    def test_cancel_stops_reading(self):
+        """Test zakończenia wczytywania po anulowaniu"""
+        wyprzedzenie = Prefetcher(self.pliki, max_files=1, cancel=lambda: True)
+        wyprzedzenie._watek.join(timeout=5)
+        self.assertFalse(wyprzedzenie._watek.is_alive())
+        self.assertEqual(wyprzedzenie.bytes, 0)
+        wyprzedzenie.close()
+
+    def test_batch_with_prefetch(self):
+        """Test konwersji z wyprzedzeniem w każdym trybie wykonania"""
+        for executor in ("serial", "thread", "pipeline"):
+            opcje = ConversionOptions(
+                output_dir=self.folder_docelowy,
+                executor=executor,
+                workers=2,
+                prefetch=3,
+            )
+            wyniki = list(convert_batch(self.pliki, opcje))
+            self.assertEqual(len(wyniki), 6, executor)
+            self.assertTrue(all(w.ok for w in wyniki), executor)
+        self.assertFalse(
+            any(t.name == "imageflow-prefetch" for t in threading.enumerate())
+        )
+
+
+class TestEncoderProfile(TestEngineBase):
+    """Testy profili kodera w konwersji"""
+
+    def test_webp_uses_quality(self):
+        """Test wpływu suwaka jakości na zapis WEBP"""
+        zrodlo = os.path.join(self.folder_zrodlowy, "szum.png")
+        Image.effect_noise((320, 240), 30).convert("RGB").save(zrodlo)
+        rozmiary = []
+        for jakosc in (20, 95):
+            opcje = ConversionOptions(
+                output_dir=os.path.join(self.folder_docelowy, str(jakosc)),
+                format="WEBP",
+                quality=jakosc,
+            )
+            os.makedirs(opcje.output_dir)
+            wynik = convert_file(zrodlo, opcje)
+            self.assertTrue(wynik.ok)
+            rozmiary.append(os.path.getsize(wynik.target))
+        self.assertLess(rozmiary[0], rozmiary[1])
+
+    def test_profile_invalidates_manifest(self):
+        """Test zapisu profilu w ustawieniach manifestu (poza domyślnym)"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy)
+        self.assertNotIn("profile", manifest_settings(opcje))
+        opcje.profile = "smallest"
+        self.assertEqual(manifest_settings(opcje)["profile"], "smallest")
+
+    def test_max_output_bytes(self):
+        """Test zapisu w limicie rozmiaru i błędu dla nieosiągalnego limitu"""
+        zrodlo = os.path.join(self.folder_zrodlowy, "szum.png")
+        Image.effect_noise((320, 240), 30).convert("RGB").save(zrodlo)
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, quality=95, max_output_bytes=12_000
+        )
+        wynik = convert_file(zrodlo, opcje)
+        self.assertTrue(wynik.ok)
+        self.assertLessEqual(os.path.getsize(wynik.target), 12_000)
+        opcje.max_output_bytes = 200
+        wynik = convert_file(zrodlo, opcje, target=wynik.target + ".2.jpg")
+        self.assertEqual(wynik.status, STATUS_ERROR)
+        self.assertIn("limicie rozmiaru", wynik.error)
+        self.assertFalse(os.path.exists(wynik.target))
+
+    def test_max_output_bytes_unsupported_format(self):
+        """Test błędu dla limitu rozmiaru w formacie bezstratnym"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, format="PNG", max_output_bytes=10_000
+        )
+        with self.assertRaises(ValueError):
+            list(convert_batch([zrodlo], opcje))
+
+    def test_unknown_profile(self):
+        """Test błędu dla nieznanego profilu kodera"""
+        zrodlo = utworz_obraz(self.folder_zrodlowy, "obraz.png")
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, profile="turbo")
+        with self.assertRaises(ValueError):
+            list(convert_batch([zrodlo], opcje))
+
+
+class TestPassthrough(TestEngineBase):
+    """Testy przepisywania plików już zapisanych w formacie docelowym"""
+
+    def setUp(self):
+        super().setUp()
+        self.jpeg = utworz_obraz(self.folder_zrodlowy, "zdjecie.jpg")
+        self.png = utworz_obraz(self.folder_zrodlowy, "grafika.png")
+
+    def bajty(self, sciezka):
+        with open(sciezka, "rb") as f:
+            return f.read()
+
+    def test_same_format_copied(self):
+        """Test kopii bajt w bajt zamiast konwersji"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, passthrough="copy")
+        wynik = convert_file(self.jpeg, opcje)
+        self.assertTrue(wynik.ok)
+        self.assertIn(wynik.passthrough, ("reflink", "copy"))
+        self.assertIsNone(wynik.thumbnail)
+        self.assertEqual(self.bajty(wynik.target), self.bajty(self.jpeg))
+        self.assertEqual(os.listdir(self.folder_docelowy), ["zdjecie.jpg"])
+
+    def test_other_format_converted(self):
+        """Test konwersji pliku w innym formacie"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, passthrough="copy")
+        wynik = convert_file(self.png, opcje)
+        self.assertTrue(wynik.ok)
+        self.assertIsNone(wynik.passthrough)
+        with Image.open(wynik.target) as img:
+            self.assertEqual(img.format, "JPEG")
+
+    def test_hardlink(self):
+        """Test twardego dowiązania na tym samym systemie plików"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, passthrough="link")
+        wynik = convert_file(self.jpeg, opcje)
+        self.assertEqual(wynik.passthrough, "hardlink")
+        self.assertTrue(os.path.samefile(wynik.target, self.jpeg))
+        # Ponowne przepisanie nie zostawia plików tymczasowych
+        self.assertTrue(convert_file(self.jpeg, opcje).ok)
+        self.assertEqual(os.listdir(self.folder_docelowy), ["zdjecie.jpg"])
+
+    def test_copy_fallbacks(self):
+        """Test kopii, gdy reflink i kopia w jądrze są niedostępne"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, passthrough="link")
+        with patch("engine.os.link", side_effect=OSError("EXDEV")), patch(
+            "engine.fcntl", None
+        ), patch("engine.os.copy_file_range", side_effect=OSError, create=True), patch(
+            "engine.os.sendfile", side_effect=OSError, create=True
+        ):
+            wynik = convert_file(self.jpeg, opcje)
+        self.assertEqual(wynik.passthrough, "copy")
+        self.assertEqual(self.bajty(wynik.target), self.bajty(self.jpeg))
+
+    def test_size_limit_reencodes_larger_files(self):
+        """Test konwersji pliku większego niż limit rozmiaru"""
+        duzy = os.path.join(self.folder_zrodlowy, "szum.jpg")
+        Image.effect_noise((320, 240), 30).convert("RGB").save(duzy, quality=95)
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            passthrough="copy",
+            max_output_bytes=os.path.getsize(duzy) // 2,
+        )
+        wynik = convert_file(duzy, opcje)
+        self.assertTrue(wynik.ok)
+        self.assertIsNone(wynik.passthrough)
+
+    def test_encoding_settings_force_reencode(self):
+        """Test konwersji, gdy jakość, profil lub limit rozmiaru wymagają kodowania"""
+        ustawienia = [
+            {"quality": 60},
+            {"profile": "smallest"},
+            {"max_output_bytes": os.path.getsize(self.jpeg) * 10},
+        ]
+        for executor in ("serial", "pipeline"):
+            for kwargs in ustawienia:
+                with self.subTest(executor=executor, **kwargs):
+                    opcje = ConversionOptions(
+                        output_dir=self.folder_docelowy,
+                        executor=executor,
+                        passthrough="copy",
+                        **kwargs,
+                    )
+                    wynik = list(convert_batch([self.jpeg], opcje))[0]
+                    self.assertTrue(wynik.ok, wynik.error)
+                    self.assertIsNone(wynik.passthrough)
+                    self.assertNotEqual(self.bajty(wynik.target), self.bajty(self.jpeg))
+
+    def test_batch_mixed_folder(self):
+        """Test partii z plikami w formacie docelowym i innych"""
+        for executor in ("serial", "thread", "pipeline"):
+            opcje = ConversionOptions(
+                output_dir=os.path.join(self.folder_docelowy, executor),
+                executor=executor,
+                passthrough="copy",
+            )
+            os.makedirs(opcje.output_dir)
+            wyniki = list(convert_batch([self.jpeg, self.png], opcje))
+            self.assertTrue(all(w.ok for w in wyniki), executor)
+            przepisane = [w.source for w in wyniki if w.passthrough]
+            self.assertEqual(przepisane, [self.jpeg], executor)
+
+    def test_unknown_mode(self):
+        """Test błędu dla nieznanego trybu przepuszczania"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, passthrough="x")
+        with self.assertRaises(ValueError):
+            list(convert_batch([self.jpeg], opcje))
+
+
+class TestOutputCache(TestEngineBase):
+    """Testy pamięci wyników wspólnej dla zadań"""
+
+    def setUp(self):
+        super().setUp()
+        self.folder_pamieci = os.path.join(self._tmp.name, "cache")
+        self.pliki = [
+            utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png", kolor=(i, 0, 0))
+            for i in range(3)
+        ]
+
+    def opcje(self, nazwa, **kwargs):
+        return ConversionOptions(
+            output_dir=os.path.join(self.folder_docelowy, nazwa),
+            cache_dir=self.folder_pamieci,
+            **kwargs,
+        )
+
+    def konwertuj(self, opcje):
+        os.makedirs(opcje.output_dir, exist_ok=True)
+        wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertTrue(all(w.ok for w in wyniki))
+        return wyniki
+
+    def test_second_job_hits(self):
+        """Test przepisania wyników z pamięci w kolejnym zadaniu"""
+        pierwsze = self.konwertuj(self.opcje("pierwsze"))
+        self.assertTrue(all(w.cached is False for w in pierwsze))
+        for executor in ("serial", "thread", "pipeline"):
+            with patch("engine._zapisz_obraz") as mock_zapis:
+                drugie = self.konwertuj(self.opcje(executor, executor=executor))
+            mock_zapis.assert_not_called()
+            self.assertTrue(all(w.cached for w in drugie), executor)
+            for a, b in zip(pierwsze, drugie):
+                with open(a.target, "rb") as f1, open(b.target, "rb") as f2:
+                    self.assertEqual(f1.read(), f2.read())
+        statystyki = shared_cache(self.folder_pamieci).stats()
+        self.assertEqual(statystyki["hits"], 9)
+        self.assertGreaterEqual(statystyki["misses"], 3)
+
+    def test_settings_change_misses(self):
+        """Test chybienia po zmianie parametrów kodera"""
+        self.konwertuj(self.opcje("a", quality=90))
+        wyniki = self.konwertuj(self.opcje("b", quality=80))
+        self.assertTrue(all(w.cached is False for w in wyniki))
+        # Układ plików nie zmienia bajtów wyniku - ten sam klucz
+        opcje = self.opcje("c", quality=80, layout="tree")
+        self.assertEqual(
+            output_cache_key("abc", opcje),
+            output_cache_key("abc", self.opcje("d", quality=80)),
+        )
+
+    def test_cache_off_by_default(self):
+        """Test braku pamięci wyników domyślnie"""
+        wynik = convert_file(self.pliki[0], ConversionOptions(self.folder_docelowy))
+        self.assertIsNone(wynik.cached)
+        self.assertFalse(os.path.exists(self.folder_pamieci))
+
+
+class TestAtomicWrite(TestEngineBase):
+    """Testy atomowego zapisu plików wynikowych"""
+
+    def setUp(self):
+        super().setUp()
+        self.pliki = [
+            utworz_obraz(self.folder_zrodlowy, f"obraz{i}.png") for i in range(3)
+        ]
+
+    def test_no_partial_output_on_encoder_error(self):
+        """Test braku niepełnego pliku po błędzie kodowania"""
+        docelowy = os.path.join(self.folder_docelowy, "obraz0.jpg")
+        with open(docelowy, "wb") as f:
+            f.write(b"poprzednia wersja")
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, conflict_policy="overwrite"
+        )
+        with patch("engine.Image.Image.save", side_effect=OSError("kodowanie")):
+            wynik = convert_file(self.pliki[0], opcje)
+        self.assertEqual(wynik.status, STATUS_ERROR)
+        with open(docelowy, "rb") as f:
+            self.assertEqual(f.read(), b"poprzednia wersja")
+        self.assertEqual(os.listdir(self.folder_docelowy), ["obraz0.jpg"])
+
+    def test_no_temporary_files_left(self):
+        """Test braku plików tymczasowych po konwersji"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, format="PNG")
+        wyniki = list(convert_batch(self.pliki, opcje))
+        self.assertTrue(all(w.ok for w in wyniki))
+        self.assertEqual(
+            sorted(os.listdir(self.folder_docelowy)),
+            ["obraz0.png", "obraz1.png", "obraz2.png"],
+        )
+
+    def test_fsync_policies(self):
+        """Test liczby wywołań fsync dla każdej polityki"""
+        liczby = {}
+        for polityka in ("none", "file", "batch"):
+            opcje = ConversionOptions(
+                output_dir=os.path.join(self.folder_docelowy, polityka),
+                output_fsync=polityka,
+            )
+            os.makedirs(opcje.output_dir)
+            with patch("engine.os.fsync") as mock_fsync:
+                wyniki = list(convert_batch(self.pliki, opcje))
+            self.assertTrue(all(w.ok for w in wyniki), polityka)
+            liczby[polityka] = mock_fsync.call_count
+        self.assertEqual(liczby["none"], 0)
+        # Trzy pliki i ich folder (raz na plik albo raz na partię)
+        folder = 1 if os.name == "posix" else 0
+        self.assertEqual(liczby["file"], 3 + 3 * folder)
+        self.assertEqual(liczby["batch"], 3 + folder)
+
+    def test_unknown_fsync_policy(self):
+        """Test błędu dla nieznanej polityki fsync"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, output_fsync="x")
+        with self.assertRaises(ValueError):
+            list(convert_batch(self.pliki, opcje))
+
+
+class TestMultipleOutputs(TestEngineBase):
+    """Testy wielu wyjść z jednego dekodowania"""
+
+    def setUp(self):
+        super().setUp()
+        self.zrodlo = utworz_obraz(self.folder_zrodlowy, "zdjecie.png", (400, 300))
+        self.wyjscia = [
+            OutputSpec("JPEG", suffix="_duze"),
+            OutputSpec("WEBP", max_dimension=200, suffix="_srednie"),
+            OutputSpec("PNG", max_dimension=50, suffix="_male"),
+            OutputSpec("JPEG", max_dimension=100, suffix="_miniatura", quality=60),
+        ]
+
+    def opcje(self, **kwargs):
+        return ConversionOptions(
+            output_dir=self.folder_docelowy, outputs=self.wyjscia, **kwargs
+        )
+
+    def test_single_decode_many_outputs(self):
+        """Test zapisu czterech plików z jednego dekodowania"""
+        with patch("engine.Image.open", wraps=Image.open) as mock_open:
+            wynik = convert_file(self.zrodlo, self.opcje())
+        self.assertTrue(wynik.ok)
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(wynik.target, wynik.outputs[0])
+        oczekiwane = {
+            "zdjecie_duze.jpg": ("JPEG", (400, 300)),
+            "zdjecie_srednie.webp": ("WEBP", (200, 150)),
+            "zdjecie_male.png": ("PNG", (50, 38)),
+            "zdjecie_miniatura.jpg": ("JPEG", (100, 75)),
+        }
+        self.assertEqual([os.path.basename(s) for s in wynik.outputs], list(oczekiwane))
+        for sciezka in wynik.outputs:
+            with Image.open(sciezka) as img:
+                self.assertEqual(
+                    (img.format, img.size), oczekiwane[os.path.basename(sciezka)]
+                )
+
+    def test_renditions_derived_successively(self):
+        """Test pomniejszania każdej wersji z poprzedniej, mniejszej"""
+        with patch("engine.Image.Image.resize", autospec=True) as mock_resize:
+            mock_resize.side_effect = lambda img, *a, **k: Image.new(img.mode, a[0])
+            self.assertTrue(convert_file(self.zrodlo, self.opcje()).ok)
+        zrodla = [wywolanie.args[0].size for wywolanie in mock_resize.call_args_list]
+        cele = [wywolanie.args[1] for wywolanie in mock_resize.call_args_list]
+        self.assertEqual(zrodla, [(400, 300), (200, 150), (100, 75)])
+        self.assertEqual(cele, [(200, 150), (100, 75), (50, 38)])
+
+    def test_pipeline_and_batch_fsync(self):
+        """Test wielu wyjść w potoku etapowym z fsync partii"""
+        opcje = self.opcje(executor="pipeline", output_fsync="batch")
+        with patch("engine.os.fsync") as mock_fsync:
+            wyniki = list(convert_batch([self.zrodlo], opcje))
+        self.assertTrue(wyniki[0].ok)
+        self.assertEqual(len(os.listdir(self.folder_docelowy)), 4)
+        folder = 1 if os.name == "posix" else 0
+        self.assertEqual(mock_fsync.call_count, 4 + folder)
+
+    def test_output_targets(self):
+        """Test ścieżek pozostałych wyjść po zmianie nazwy przy konflikcie"""
+        opcje = self.opcje()
+        self.assertEqual(
+            target_path(self.zrodlo, opcje),
+            os.path.join(self.folder_docelowy, "zdjecie_duze.jpg"),
+        )
+        cele = output_targets(os.path.join("wyj", "zdjecie (1)_duze.jpg"), opcje)
+        self.assertEqual(
+            cele[1:],
+            [
+                os.path.join("wyj", "zdjecie (1)_srednie.webp"),
+                os.path.join("wyj", "zdjecie (1)_male.png"),
+                os.path.join("wyj", "zdjecie (1)_miniatura.jpg"),
+            ],
+        )
+
+    def nazwy(self):
+        return sorted(os.listdir(self.folder_docelowy))
+
+    def test_rename_shares_stem(self):
+        """Test wspólnego numeru wszystkich wyjść przy konflikcie drugiego wyjścia"""
+        utworz_obraz(self.folder_docelowy, "zdjecie_srednie.webp")
+        opcje = self.opcje(conflict_policy="rename")
+        plan = plan_batch([self.zrodlo], opcje)
+        self.assertTrue(plan[0].conflict)
+        self.assertEqual(os.path.basename(plan[0].target), "zdjecie (1)_duze.jpg")
+        self.assertEqual(
+            find_conflicts([self.zrodlo], opcje), [target_path(self.zrodlo, opcje)]
+        )
+        wynik = list(convert_batch([self.zrodlo], opcje))[0]
+        self.assertTrue(wynik.ok, wynik.error)
+        self.assertEqual(
+            [os.path.basename(s) for s in wynik.outputs],
+            [
+                "zdjecie (1)_duze.jpg",
+                "zdjecie (1)_srednie.webp",
+                "zdjecie (1)_male.png",
+                "zdjecie (1)_miniatura.jpg",
+            ],
+        )
+
+    def test_rename_skips_numbers_taken_by_any_output(self):
+        """Test pominięcia numeru zajętego przez dowolne wyjście"""
+        utworz_obraz(self.folder_docelowy, "zdjecie_duze.jpg")
+        utworz_obraz(self.folder_docelowy, "zdjecie (1)_male.png")
+        plan = plan_batch([self.zrodlo], self.opcje(conflict_policy="rename"))
+        self.assertEqual(os.path.basename(plan[0].target), "zdjecie (2)_duze.jpg")
+
+    def test_policy_applies_to_all_outputs(self):
+        """Test pominięcia i skip_if_newer dla całego zestawu wyjść"""
+        utworz_obraz(self.folder_docelowy, "zdjecie_male.png")
+        plan = plan_batch([self.zrodlo], self.opcje(conflict_policy="skip"))
+        self.assertEqual(plan[0].action, ACTION_SKIP)
+        # Tylko jedno wyjście jest nowsze od źródła - pozostałych brakuje
+        plan = plan_batch([self.zrodlo], self.opcje(conflict_policy="skip_if_newer"))
+        self.assertEqual(plan[0].action, ACTION_CONVERT)
+        self.assertTrue(convert_file(self.zrodlo, self.opcje()).ok)
+        plan = plan_batch([self.zrodlo], self.opcje(conflict_policy="skip_if_newer"))
+        self.assertEqual(plan[0].action, ACTION_SKIP)
+
+    def test_duplicate_secondary_output_in_batch(self):
+        """Test powtórzenia w partii ścieżki innego niż pierwsze wyjścia"""
+        drugi = utworz_obraz(self.folder_zrodlowy, "zdjecie_w.png")
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            outputs=[OutputSpec("JPEG"), OutputSpec("JPEG", suffix="_w")],
+            conflict_policy="rename",
+        )
+        # zdjecie_w.png -> zdjecie_w.jpg, a drugie wyjście zdjecie.png to też
+        # zdjecie_w.jpg - konflikt w partii, mimo różnych pierwszych wyjść
+        plan = plan_batch([drugi, self.zrodlo], opcje)
+        self.assertFalse(plan[0].conflict)
+        self.assertTrue(plan[1].conflict)
+        self.assertEqual(os.path.basename(plan[1].target), "zdjecie (1).jpg")
+        wyniki = list(convert_batch([drugi, self.zrodlo], opcje))
+        self.assertTrue(all(w.ok for w in wyniki))
+        self.assertEqual(
+            self.nazwy(),
+            [
+                "zdjecie (1).jpg",
+                "zdjecie (1)_w.jpg",
+                "zdjecie_w.jpg",
+                "zdjecie_w_w.jpg",
+            ],
+        )
+        opcje.conflict_policy = "skip"
+        plan = plan_batch([drugi, self.zrodlo], opcje)
+        self.assertEqual([p.action for p in plan], [ACTION_SKIP, ACTION_SKIP])
+
+
+class TestParallelExecution(TestEngineBase):
+    """Testy równoległej konwersji w pulach wątków i procesów"""
+
+    def utworz_pliki(self, liczba, ext="png"):
+        return [
+            utworz_obraz(self.folder_zrodlowy, f"obraz{i}.{ext}") for i in range(liczba)
+        ]
+
+    def test_resolve_executor_auto(self):
+        """Test wyboru trybu wykonania w trybie auto"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, workers=4)
+        self.assertEqual(resolve_executor(opcje, ["a.png", "b.jpg"]), ("thread", 4))
+        self.assertEqual(resolve_executor(opcje, ["a.png", "b.heic"]), ("process", 4))
+        self.assertEqual(resolve_executor(opcje, ["a.png"]), ("serial", 1))
+
+    def test_resolve_executor_invalid(self):
+        """Test odrzucenia nieznanego trybu wykonania"""
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, executor="gpu")
+        with self.assertRaises(ValueError):
+            resolve_executor(opcje, [])
+
+    def test_thread_pool_ordered(self):
+        """Test czy pula wątków zachowuje kolejność wyników"""
+        pliki = self.utworz_pliki(10)
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, executor="thread", workers=3
+        )
+
+        wyniki = list(convert_batch(pliki, opcje))
+
+        self.assertEqual([w.source for w in wyniki], pliki)
+        self.assertTrue(all(w.ok for w in wyniki))
+
+    def test_thread_pool_unordered(self):
+        """Test konwersji bez zachowania kolejności"""
+        pliki = self.utworz_pliki(10)
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            executor="thread",
+            workers=3,
+            ordered=False,
+        )
+
+        wyniki = list(convert_batch(pliki, opcje))
+
+        self.assertEqual(sorted(w.source for w in wyniki), sorted(pliki))
+
+    def test_process_pool(self):
+        """Test konwersji w puli procesów"""
+        pliki = self.utworz_pliki(3)
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, executor="process", workers=2
+        )
+
+        wyniki = list(convert_batch(pliki, opcje))
+
+        self.assertEqual(len(wyniki), 3)
+        self.assertTrue(all(w.ok for w in wyniki))
+
+    def test_parallel_cancel(self):
+        """Test anulowania konwersji równoległej"""
+        pliki = self.utworz_pliki(20)
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, executor="thread", workers=2
+        )
+        przetworzone = []
+
+        for wynik in convert_batch(pliki, opcje, cancel=lambda: len(przetworzone)):
+            przetworzone.append(wynik)
+
+        # Po anulowaniu kończą się tylko zadania, które były już w toku
+        self.assertLess(len(przetworzone), len(pliki))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,176 @@
+"""
+Testy jednostkowe dla kolejki plików do konwersji ImageFlow
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from filequeue import (
+        REJECT_CONTENT,
+        REJECT_EXTENSION,
+        REJECT_MISSING,
+        REJECT_NAME,
+        REJECT_PATH,
+        FileQueue,
+    )
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+class TestFileQueue(unittest.TestCase):
+    """Testy indeksów duplikatów kolejki plików"""
+
+    def test_behaves_like_list(self):
+        """Test zachowania jak lista ścieżek"""
+        kolejka = FileQueue(["/a/1.jpg", "/a/2.png"])
+        self.assertEqual(len(kolejka), 2)
+        self.assertEqual(kolejka[1], "/a/2.png")
+        self.assertEqual(list(kolejka), ["/a/1.jpg", "/a/2.png"])
+        self.assertIn("/a/1.jpg", kolejka)
+        self.assertEqual(kolejka, ["/a/1.jpg", "/a/2.png"])
+
+    def test_compact_storage(self):
+        """Test przechowywania folderu raz dla wielu plików"""
+        kolejka = FileQueue([f"/zdjecia/2024/IMG_{i}.jpg" for i in range(1000)])
+        self.assertEqual(len(kolejka._foldery), 1)
+        self.assertEqual(kolejka.name(5), "IMG_5.jpg")
+        self.assertEqual(kolejka[-1], os.path.join("/zdjecia/2024", "IMG_999.jpg"))
+        self.assertEqual(len(kolejka[10:20]), 10)
+        with self.assertRaises(IndexError):
+            kolejka[1000]
+
+    def test_rejections(self):
+        """Test powodów odrzucenia plików"""
+        kolejka = FileQueue(["/a/zdjecie.jpg"])
+        self.assertEqual(kolejka.add("/a/dokument.pdf", False), REJECT_EXTENSION)
+        self.assertEqual(kolejka.add("/a/zdjecie.jpg", False), REJECT_PATH)
+        self.assertEqual(kolejka.add("/b/zdjecie.jpg", False), REJECT_NAME)
+        self.assertEqual(kolejka.add("/nie/istnieje.png"), REJECT_MISSING)
+        self.assertEqual(len(kolejka), 1)
+
+    def test_same_names_allowed(self):
+        """Test dodawania plików o tej samej nazwie z różnych folderów"""
+        kolejka = FileQueue(["/a/zdjecie.jpg"], unique_names=False)
+        self.assertIsNone(kolejka.add("/b/zdjecie.jpg", False))
+        self.assertIsNone(kolejka.add("/c/zdjecie.jpg", False))
+        self.assertEqual(kolejka.add("/b/zdjecie.jpg", False), REJECT_PATH)
+        self.assertIn("/c/zdjecie.jpg", kolejka)
+        self.assertNotIn("/d/zdjecie.jpg", kolejka)
+        self.assertEqual(len(kolejka), 3)
+
+    def test_add_many_is_linear(self):
+        """Test dodawania wielu plików bez przeszukiwania listy"""
+        sciezki = [f"/zdjecia/{i}/IMG_{i}.jpg" for i in range(50000)]
+        kolejka = FileQueue()
+        with patch("os.path.basename", wraps=os.path.basename) as mock_basename:
+            dodane = kolejka.extend(sciezki, check_exists=False)
+        self.assertEqual(len(dodane), 50000)
+        # Jedno wywołanie przy sprawdzeniu i jedno przy indeksowaniu na plik
+        self.assertLessEqual(mock_basename.call_count, 2 * 50000)
+
+    def test_remove_indices_in_bulk(self):
+        """Test usuwania wielu pozycji naraz"""
+        kolejka = FileQueue([f"/a/{i}.jpg" for i in range(5)])
+        usuniete = kolejka.remove_indices([3, 0, 1])
+        self.assertEqual(usuniete, ["/a/0.jpg", "/a/1.jpg", "/a/3.jpg"])
+        self.assertEqual(list(kolejka), ["/a/2.jpg", "/a/4.jpg"])
+        # Usunięty plik można dodać ponownie
+        self.assertIsNone(kolejka.add("/a/0.jpg", check_exists=False))
+
+
+class TestContentDedup(unittest.TestCase):
+    """Testy wykrywania plików o identycznej zawartości"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def plik(self, nazwa, dane):
+        sciezka = os.path.join(self._tmp.name, nazwa)
+        with open(sciezka, "wb") as f:
+            f.write(dane)
+        return sciezka
+
+    def test_identical_content_rejected(self):
+        """Test odrzucenia pliku o identycznej zawartości"""
+        kolejka = FileQueue(dedup_content=True)
+        self.assertIsNone(kolejka.add(self.plik("telefon.jpg", b"zdjecie")))
+        self.assertIsNone(kolejka.add(self.plik("inne.jpg", b"zdjecia")))
+        self.assertEqual(
+            kolejka.add(self.plik("aparat.jpg", b"zdjecie")), REJECT_CONTENT
+        )
+        self.assertEqual(len(kolejka), 2)
+
+    def test_unique_sizes_not_hashed(self):
+        """Test pomijania skrótu dla plików o unikalnym rozmiarze"""
+        kolejka = FileQueue(dedup_content=True)
+        with patch("filequeue.hash_file") as mock_hash:
+            kolejka.add(self.plik("a.jpg", b"1"))
+            kolejka.add(self.plik("b.jpg", b"22"))
+            kolejka.add(self.plik("c.jpg", b"333"))
+        mock_hash.assert_not_called()
+
+    def test_enabling_dedup_includes_existing_files(self):
+        """Test włączenia wykrywania po dodaniu plików"""
+        kolejka = FileQueue([self.plik("a.jpg", b"zdjecie")])
+        kolejka.dedup_content = True
+        self.assertEqual(kolejka.add(self.plik("b.jpg", b"zdjecie")), REJECT_CONTENT)
+
+    def test_prepared_files_not_read_on_add(self):
+        """Test dodawania bez odczytu plików po prepare() w innym wątku"""
+        kolejka = FileQueue(dedup_content=True)
+        pliki = [
+            self.plik("a.jpg", b"zdjecie"),
+            self.plik("b.jpg", b"zdjecie"),
+            self.plik("c.jpg", b"obrazek"),
+            self.plik("d.jpg", b"123"),
+        ]
+        watek = threading.Thread(target=kolejka.prepare, args=(pliki,))
+        watek.start()
+        watek.join()
+        with patch("filequeue.hash_file") as mock_hash, patch(
+            "filequeue.os.path.getsize"
+        ) as mock_getsize:
+            powody = [kolejka.add(p, check_exists=False) for p in pliki]
+        mock_hash.assert_not_called()
+        mock_getsize.assert_not_called()
+        self.assertEqual(powody, [None, REJECT_CONTENT, None, None])
+
+    def test_enable_and_remove_without_reading(self):
+        """Test włączenia wykrywania i usuwania bez ponownego odczytu plików"""
+        pliki = [self.plik(f"{i}.jpg", b"zdjecie" if i < 2 else b"x") for i in range(3)]
+        kolejka = FileQueue(pliki)
+        kolejka.prepare(list(kolejka))
+        with patch("filequeue.hash_file") as mock_hash, patch(
+            "filequeue.os.path.getsize"
+        ) as mock_getsize:
+            kolejka.dedup_content = True
+            kolejka.remove_indices([0, 1])
+        mock_hash.assert_not_called()
+        mock_getsize.assert_not_called()
+        # Zawartość usuniętego pliku nie blokuje już dodania
+        self.assertIsNone(kolejka.add(pliki[0]))
+        self.assertEqual(
+            kolejka.add(self.plik("kopia.jpg", b"zdjecie")), REJECT_CONTENT
+        )
+
+    def test_disabled_by_default(self):
+        """Test braku porównywania zawartości domyślnie"""
+        kolejka = FileQueue()
+        kolejka.add(self.plik("a.jpg", b"zdjecie"))
+        self.assertIsNone(kolejka.add(self.plik("b.jpg", b"zdjecie")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ Testy jednostkowe dla aplikacji ImageFlow
 import unittest
 import tempfile
 import os
+import logging
 from unittest.mock import patch, MagicMock, mock_open
 import tkinter as tk
 from tkinter import ttk
@@ -15,7 +16,14 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from app import ImageFlow, ThemeManager, ToolTip, LoadingSpinner
+    from app import (
+        ImageFlow,
+        ThemeManager,
+        ToolTip,
+        LoadingSpinner,
+        LogSink,
+        VirtualListView,
+    )
 except ImportError as e:
     print(f"Błąd importu: {e}")
     print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
@@ -129,6 +137,34 @@ class TestImageFlowCore(unittest.TestCase):
         self.app.dodaj_pliki(pliki)
         self.assertEqual(len(self.app.pliki_do_konwersji), 2)
 
+    def test_dodaj_folder_paczkami(self):
+        """Test dodawania folderu przez wątek przeglądania i kolejkę paczek"""
+        with tempfile.TemporaryDirectory() as folder:
+            os.makedirs(os.path.join(folder, "sub"))
+            for nazwa in ["a.jpg", os.path.join("sub", "b.png"), "c.txt"]:
+                with open(os.path.join(folder, nazwa), "wb") as f:
+                    f.write(b"x")
+            self.app.skanowanie = {"folder": folder, "znalezione": 0, "dodane": 0}
+
+            self.app.skanuj_folder(folder)
+            self.app.odbierz_skanowanie()
+
+        self.assertEqual(len(self.app.pliki_do_konwersji), 2)
+        self.assertEqual(self.app.lista_plikow.size(), 2)
+        self.assertIsNone(self.app.skanowanie)
+
+    def test_uklad_zachowujacy_foldery_przyjmuje_te_same_nazwy(self):
+        """Test dodawania plików o tej samej nazwie w układzie drzewa"""
+        self.app.dodaj_pliki(["/a/img.jpg", "/b/img.jpg"], sprawdz_istnienie=False)
+        self.assertEqual(len(self.app.pliki_do_konwersji), 1)
+
+        self.app.uklad_var.set("Jak foldery źródłowe")
+        self.app.zmien_uklad()
+        self.app.dodaj_pliki(["/b/img.jpg"], sprawdz_istnienie=False)
+
+        self.assertEqual(len(self.app.pliki_do_konwersji), 2)
+        self.assertEqual(self.app.utworz_opcje_konwersji().layout, "tree")
+
     def test_usun_z_listy(self):
         """Test usuwania plików z listy"""
         # Dodaj pliki
@@ -145,6 +181,13 @@ class TestImageFlowCore(unittest.TestCase):
         self.assertEqual(len(self.app.pliki_do_konwersji), 1)
         self.assertEqual(self.app.pliki_do_konwersji[0], "/test/img2.png")
 
+    def test_pobierz_liczbe_watkow(self):
+        """Test odczytu liczby równoległych zadań"""
+        self.app.watki_var.set(4)
+        self.assertEqual(self.app.pobierz_liczbe_watkow(), 4)
+        self.app.watki_var.set(0)
+        self.assertEqual(self.app.pobierz_liczbe_watkow(), 1)
+
     def test_aktualizuj_jakosc_label(self):
         """Test aktualizacji etykiety jakości"""
         self.app.aktualizuj_jakosc_label("75")
@@ -220,6 +263,171 @@ class TestFileOperations(unittest.TestCase):
         self.assertFalse(app.IS_LINUX)
 
 
+class TestKolejkaZdarzen(unittest.TestCase):
+    """Testy kolejki zdarzeń między wątkiem konwersji a interfejsem"""
+
+    def setUp(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.app = ImageFlow(self.root, testing_mode=True)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_postep_scalany_do_ostatniego_stanu(self):
+        """Test scalania wielu zdarzeń postępu w jedną aktualizację"""
+        for i in range(1, 101):
+            self.app.wyslij_zdarzenie("postep", i, 100)
+
+        self.app.przetworz_zdarzenia()
+
+        self.assertEqual(self.app.pasek_postepu["value"], 100)
+        self.assertEqual(self.root.title(), "Konwersja: 100/100")
+        self.assertTrue(self.app.kolejka_zdarzen.empty())
+
+    def test_konwertuj_pliki_nie_dotyka_widgetow(self):
+        """Test czy wątek konwersji komunikuje się tylko przez kolejkę"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.app.folder_docelowy = temp_dir
+            opcje = self.app.utworz_opcje_konwersji()
+            with patch.object(self.app.root, "update") as mock_update:
+                self.app.konwertuj_pliki(opcje, [])
+            mock_update.assert_not_called()
+
+        rodzaje = []
+        while not self.app.kolejka_zdarzen.empty():
+            rodzaje.append(self.app.kolejka_zdarzen.get_nowait()[0])
+        self.assertEqual(rodzaje, ["postep", "koniec"])
+
+    def test_koniec_wysylany_po_nieoczekiwanym_wyjatku(self):
+        """Test czy wyjątek silnika nie blokuje interfejsu (zawsze "koniec")"""
+        opcje = self.app.utworz_opcje_konwersji()
+        with patch("app.convert_batch", side_effect=KeyError("niespodziewany")):
+            with self.assertRaises(KeyError):
+                self.app.konwertuj_pliki(opcje, ["a.png"])
+
+        rodzaje = []
+        while not self.app.kolejka_zdarzen.empty():
+            rodzaje.append(self.app.kolejka_zdarzen.get_nowait()[0])
+        self.assertEqual(rodzaje[-1], "koniec")
+
+    def test_zdarzenie_koniec_przywraca_interfejs(self):
+        """Test obsługi zakończenia konwersji w wątku interfejsu"""
+        self.app.konwertuj_btn.config(state=tk.DISABLED)
+        self.app.wyslij_zdarzenie("koniec", 2, 0)
+
+        with patch.object(self.app, "pokaz_okno_sukcesu") as mock_okno:
+            self.app.przetworz_zdarzenia()
+
+        mock_okno.assert_called_once()
+        self.assertEqual(str(self.app.konwertuj_btn.cget("state")), tk.NORMAL)
+        self.assertEqual(self.root.title(), "ImageFlow")
+
+
+class TestLogSink(unittest.TestCase):
+    """Testy buforowanego zapisu logów"""
+
+    def setUp(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.text = tk.Text(self.root)
+        self.sink = LogSink(self.text, MagicMock(), capacity=10)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def linie_widgetu(self):
+        return self.text.get("1.0", "end-1c").splitlines()
+
+    def test_zapis_paczkami(self):
+        """Test czy komunikaty trafiają do widgetu dopiero przy flush"""
+        self.sink.write("pierwszy")
+        self.sink.write("drugi")
+        self.assertEqual(self.linie_widgetu(), [])
+
+        self.sink.flush()
+        self.assertEqual(self.linie_widgetu(), ["pierwszy", "drugi"])
+
+    def test_ograniczenie_rozmiaru(self):
+        """Test przycinania widgetu i kolejki oczekujących do pojemności"""
+        for i in range(25):
+            self.sink.write(f"komunikat {i}")
+            if i % 7 == 0:
+                self.sink.flush()
+        self.sink.flush()
+
+        self.assertEqual(len(self.linie_widgetu()), 10)
+        self.assertEqual(self.linie_widgetu()[-1], "komunikat 24")
+
+        for i in range(25):
+            self.sink.write(f"bez zapisu {i}")
+        self.assertEqual(len(self.sink.pending), 10)
+
+    def test_filtrowanie_poziomu(self):
+        """Test pomijania komunikatów poniżej poziomu"""
+        self.sink.level = logging.WARNING
+        self.sink.write("informacja", logging.INFO)
+        self.sink.write("ostrzeżenie", logging.WARNING)
+        self.sink.flush()
+
+        self.assertEqual(self.linie_widgetu(), ["ostrzeżenie"])
+
+    def test_tryb_podsumowania(self):
+        """Test pomijania komunikatów szczegółowych w trybie podsumowania"""
+        self.sink.set_summary_only(True)
+        self.sink.write("plik 1", detail=True)
+        self.sink.write("błąd pliku 2", logging.WARNING, detail=True)
+        self.sink.write("podsumowanie")
+        self.sink.flush()
+
+        self.assertEqual(self.linie_widgetu(), ["błąd pliku 2", "podsumowanie"])
+        self.assertEqual(self.sink.suppressed, 1)
+
+
+class TestVirtualListView(unittest.TestCase):
+    """Testy wirtualizowanej listy plików"""
+
+    def setUp(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.dane = [f"plik{i}.jpg" for i in range(100000)]
+        self.lista = VirtualListView(self.root, lambda: self.dane, height=10)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_renderuje_tylko_widoczne_wiersze(self):
+        """Test czy widget zawiera tylko widoczne wiersze"""
+        self.lista.refresh()
+        self.assertEqual(self.lista.size(), 100000)
+        self.assertLessEqual(tk.Listbox.size(self.lista), 11)
+        self.assertEqual(tk.Listbox.get(self.lista, 0), "plik0.jpg")
+        self.assertEqual(self.lista.get(99999), "plik99999.jpg")
+
+    def test_przewijanie(self):
+        """Test przewijania scrollbarem i do wskazanej pozycji"""
+        self.lista.yview("moveto", 0.5)
+        self.assertEqual(tk.Listbox.get(self.lista, 0), "plik50000.jpg")
+        self.lista.see(99999)
+        self.assertEqual(self.lista.yview()[1], 1.0)
+
+    def test_zaznaczenie_w_indeksach_calej_listy(self):
+        """Test zaznaczania poza widocznym fragmentem"""
+        self.lista.selection_set(500, 599)
+        self.lista.selection_set(90000)
+        self.assertEqual(len(self.lista.curselection()), 101)
+        self.assertTrue(self.lista.selection_includes(90000))
+        self.lista.selection_clear(0, tk.END)
+        self.assertEqual(self.lista.curselection(), ())
+
+    def test_zaznaczenie_przyciete_po_usunieciu(self):
+        """Test usunięcia nieistniejących indeksów z zaznaczenia"""
+        self.lista.selection_set(99999)
+        del self.dane[50000:]
+        self.lista.refresh()
+        self.assertEqual(self.lista.curselection(), ())
+
+
 class TestLoadingSpinner(unittest.TestCase):
     """Testy animowanego spinnera"""
 
@@ -0,0 +1,140 @@
+"""
+Testy jednostkowe dla dziennika zadania konwersji ImageFlow
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from engine import STATUS_ERROR, ConversionOptions
+    from journal import JobJournal, load_job, resume, run_job
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+class TestJobJournal(unittest.TestCase):
+    """Testy dziennika zadania i wznawiania po przerwaniu"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder_docelowy = os.path.join(self._tmp.name, "out")
+        os.makedirs(self.folder_docelowy)
+        self.pliki = []
+        for i in range(5):
+            sciezka = os.path.join(self._tmp.name, f"obraz{i}.png")
+            Image.new("RGB", (16, 16)).save(sciezka)
+            self.pliki.append(sciezka)
+        self.dziennik = os.path.join(self._tmp.name, "job.jsonl")
+        self.opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, format="PNG", quality=70
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_completed_job_is_finished(self):
+        """Test oznaczenia zakończonego zadania"""
+        wyniki = list(run_job(self.pliki, self.opcje, self.dziennik))
+
+        stan = load_job(self.dziennik)
+        self.assertEqual(len(wyniki), 5)
+        self.assertTrue(stan.finished)
+        self.assertEqual(stan.remaining(), [])
+        self.assertEqual(stan.options, self.opcje)
+
+    def test_resume_converts_only_remaining(self):
+        """Test wznowienia przerwanego zadania"""
+        for i, _wynik in enumerate(run_job(self.pliki, self.opcje, self.dziennik)):
+            if i == 1:
+                break  # Symulacja przerwania po dwóch plikach
+
+        stan = load_job(self.dziennik)
+        self.assertFalse(stan.finished)
+        self.assertEqual(stan.remaining(), self.pliki[2:])
+
+        wznowione = list(resume(self.dziennik))
+
+        self.assertEqual([w.source for w in wznowione], self.pliki[2:])
+        self.assertTrue(all(w.target.endswith(".png") for w in wznowione))
+        self.assertTrue(load_job(self.dziennik).finished)
+
+    def test_resume_keeps_tree_root(self):
+        """Test zachowania folderu bazowego układu "tree" przy wznowieniu"""
+        pliki = []
+        for podfolder in ("a", "b"):
+            folder = os.path.join(self._tmp.name, "src", podfolder)
+            os.makedirs(folder)
+            pliki.append(os.path.join(folder, "obraz.png"))
+            Image.new("RGB", (16, 16)).save(pliki[-1])
+        opcje = ConversionOptions(output_dir=self.folder_docelowy, layout="tree")
+        for _wynik in run_job(pliki, opcje, self.dziennik):
+            break  # Pozostał tylko plik z folderu "b"
+
+        wznowione = list(resume(self.dziennik))
+
+        self.assertEqual(
+            wznowione[0].target,
+            os.path.join(self.folder_docelowy, "b", "obraz.jpg"),
+        )
+
+    def test_truncated_last_line_ignored(self):
+        """Test odczytu dziennika uciętego w trakcie zapisu"""
+        list(run_job(self.pliki[:2], self.opcje, self.dziennik))
+        with open(self.dziennik, "a", encoding="utf-8") as f:
+            f.write('{"type": "done", "sour')
+
+        stan = load_job(self.dziennik)
+
+        self.assertEqual(stan.done, set(self.pliki[:2]))
+
+    def test_resume_after_truncated_line(self):
+        """Test wznowienia po uciętym rekordzie i ponownego odczytu"""
+        for i, _wynik in enumerate(run_job(self.pliki, self.opcje, self.dziennik)):
+            if i == 1:
+                break
+        with open(self.dziennik, "a", encoding="utf-8") as f:
+            f.write('{"type": "done", "sour')
+
+        wznowione = list(resume(self.dziennik))
+
+        self.assertEqual([w.source for w in wznowione], self.pliki[2:])
+        stan = load_job(self.dziennik)
+        self.assertTrue(stan.finished)
+        self.assertEqual(stan.done, set(self.pliki))
+        self.assertEqual(stan.remaining(), [])
+
+    def test_failed_items_retried_on_request(self):
+        """Test ponawiania plików zakończonych błędem"""
+        zepsuty = os.path.join(self._tmp.name, "zepsuty.png")
+        with open(zepsuty, "wb") as f:
+            f.write(b"nie obraz")
+        wyniki = list(run_job([zepsuty], self.opcje, self.dziennik))
+        self.assertEqual(wyniki[0].status, STATUS_ERROR)
+
+        stan = load_job(self.dziennik)
+        self.assertEqual(stan.remaining(), [])
+        self.assertEqual(stan.remaining(retry_failed=True), [zepsuty])
+
+    def test_invalid_fsync_policy(self):
+        """Test odrzucenia nieznanej polityki fsync"""
+        with self.assertRaises(ValueError):
+            JobJournal(self.dziennik, fsync_policy="czasem")
+
+    def test_not_a_journal(self):
+        """Test odrzucenia pliku, który nie jest dziennikiem"""
+        with open(self.dziennik, "w", encoding="utf-8") as f:
+            f.write('{"type": "done", "source": "a"}\n')
+        with self.assertRaises(ValueError):
+            load_job(self.dziennik)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,191 @@
+"""
+Testy jednostkowe dla manifestu konwersji przyrostowej ImageFlow
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+from unittest.mock import patch
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from engine import (
+        STATUS_OK,
+        STATUS_UNCHANGED,
+        ConversionOptions,
+        OutputSpec,
+        convert_batch,
+    )
+    from manifest import MANIFEST_NAME, Manifest, fingerprint
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+class TestIncrementalConversion(unittest.TestCase):
+    """Testy trybu przyrostowego konwersji"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder_docelowy = os.path.join(self._tmp.name, "out")
+        os.makedirs(self.folder_docelowy)
+        self.pliki = []
+        for i in range(3):
+            sciezka = os.path.join(self._tmp.name, f"obraz{i}.png")
+            Image.new("RGB", (32, 32), color=(i * 40, 0, 0)).save(sciezka)
+            self.pliki.append(sciezka)
+        self.opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, incremental=True, hash_content=True
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def statusy(self, opcje=None):
+        return [w.status for w in convert_batch(self.pliki, opcje or self.opcje)]
+
+    def test_manifest_written(self):
+        """Test zapisu manifestu w folderze docelowym"""
+        self.assertEqual(self.statusy(), [STATUS_OK] * 3)
+        manifest = Manifest.load(self.folder_docelowy)
+        self.assertEqual(len(manifest.entries), 3)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.folder_docelowy, MANIFEST_NAME))
+        )
+
+    def test_unchanged_files_skipped_without_decoding(self):
+        """Test pomijania niezmienionych plików bez dekodowania"""
+        self.statusy()
+
+        with patch("engine.Image.open") as mock_open:
+            statusy = self.statusy()
+
+        self.assertEqual(statusy, [STATUS_UNCHANGED] * 3)
+        mock_open.assert_not_called()
+
+    def test_modified_source_reconverted(self):
+        """Test ponownej konwersji zmienionego pliku"""
+        self.statusy()
+        Image.new("RGB", (48, 48), color="blue").save(self.pliki[1])
+
+        self.assertEqual(
+            self.statusy(), [STATUS_UNCHANGED, STATUS_OK, STATUS_UNCHANGED]
+        )
+
+    def test_touched_source_same_content(self):
+        """Test pliku ze zmienionym mtime, ale tą samą zawartością"""
+        self.statusy()
+        os.utime(self.pliki[0], (1, 1))
+
+        self.assertEqual(self.statusy(), [STATUS_UNCHANGED] * 3)
+
+    def test_changed_settings_reconvert(self):
+        """Test ponownej konwersji po zmianie ustawień"""
+        self.statusy()
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy, incremental=True, quality=50
+        )
+
+        self.assertEqual(self.statusy(opcje), [STATUS_OK] * 3)
+
+    def test_missing_output_reconverted(self):
+        """Test ponownej konwersji gdy plik wynikowy usunięto"""
+        wyniki = list(convert_batch(self.pliki, self.opcje))
+        os.remove(wyniki[2].target)
+
+        self.assertEqual(
+            self.statusy(), [STATUS_UNCHANGED, STATUS_UNCHANGED, STATUS_OK]
+        )
+
+    def test_missing_secondary_output_reconverted(self):
+        """Test ponownej konwersji gdy usunięto jedno z wielu wyjść"""
+        opcje = ConversionOptions(
+            output_dir=self.folder_docelowy,
+            incremental=True,
+            outputs=[OutputSpec("JPEG"), OutputSpec("WEBP", suffix="_w")],
+        )
+        wyniki = list(convert_batch(self.pliki, opcje))
+        os.remove(wyniki[1].outputs[1])
+
+        self.assertEqual(
+            self.statusy(opcje), [STATUS_UNCHANGED, STATUS_OK, STATUS_UNCHANGED]
+        )
+        self.assertTrue(os.path.exists(wyniki[1].outputs[1]))
+
+
+class TestManifest(unittest.TestCase):
+    """Testy klasy Manifest"""
+
+    def test_corrupted_manifest_ignored(self):
+        """Test pominięcia nieczytelnego manifestu"""
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, MANIFEST_NAME), "w") as f:
+                f.write("{niepoprawny json")
+            self.assertEqual(Manifest.load(folder).entries, {})
+
+    def test_lookup_requires_same_settings(self):
+        """Test czy inne ustawienia unieważniają wpis"""
+        with tempfile.TemporaryDirectory() as folder:
+            zrodlo = os.path.join(folder, "a.png")
+            cel = os.path.join(folder, "a.jpg")
+            Image.new("RGB", (4, 4)).save(zrodlo)
+            Image.new("RGB", (4, 4)).save(cel)
+            manifest = Manifest.load(folder)
+            odcisk = fingerprint(zrodlo)
+            manifest.record(zrodlo, cel, {"format": "JPEG"}, odcisk)
+
+            self.assertEqual(manifest.lookup(zrodlo, {"format": "JPEG"}, odcisk), cel)
+            self.assertIsNone(manifest.lookup(zrodlo, {"format": "PNG"}, odcisk))
+
+    def test_append_log_replayed_and_compacted_on_load(self):
+        """Test dziennika zmian: wpisy dopisywane, odtwarzane i kompaktowane"""
+        with tempfile.TemporaryDirectory() as folder:
+            manifest = Manifest.load(folder)
+            for i in range(3):
+                manifest.record(f"/src/{i}.png", f"/out/{i}.jpg", {}, (i, i))
+                manifest.append()
+            self.assertFalse(os.path.exists(manifest.path))
+            with open(manifest.log_path, encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 3)
+            # Niedokończona ostatnia linia po awarii jest pomijana
+            with open(manifest.log_path, "a", encoding="utf-8") as f:
+                f.write('{"source": "/src/x.png", "ent')
+
+            wczytany = Manifest.load(folder)
+
+            self.assertEqual(len(wczytany.entries), 3)
+            self.assertTrue(os.path.exists(wczytany.path))
+            self.assertFalse(os.path.exists(wczytany.log_path))
+
+    def test_batch_writes_full_manifest_once(self):
+        """Test pojedynczego pełnego zapisu manifestu na partię"""
+        with tempfile.TemporaryDirectory() as folder:
+            pliki = []
+            for i in range(5):
+                sciezka = os.path.join(folder, f"obraz{i}.png")
+                Image.new("RGB", (8, 8)).save(sciezka)
+                pliki.append(sciezka)
+            opcje = ConversionOptions(
+                output_dir=os.path.join(folder, "out"), incremental=True
+            )
+            os.makedirs(opcje.output_dir)
+
+            with patch("engine.MANIFEST_SAVE_EVERY", 2), patch.object(
+                Manifest, "save", autospec=True, side_effect=Manifest.save
+            ) as mock_save, patch.object(
+                Manifest, "append", autospec=True, side_effect=Manifest.append
+            ) as mock_append:
+                list(convert_batch(pliki, opcje))
+
+            self.assertEqual(mock_save.call_count, 1)
+            self.assertEqual(mock_append.call_count, 2)
+            self.assertEqual(len(Manifest.load(opcje.output_dir).entries), 5)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
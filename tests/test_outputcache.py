@@ -0,0 +1,101 @@
+"""
+Testy jednostkowe dla pamięci wyników konwersji ImageFlow
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from outputcache import OutputCache, cache_key, shared_cache
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+class TestOutputCache(unittest.TestCase):
+    """Testy magazynu wyników adresowanego zawartością"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self._tmp.name, "cache")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def plik(self, nazwa, rozmiar):
+        sciezka = os.path.join(self._tmp.name, nazwa)
+        with open(sciezka, "wb") as f:
+            f.write(b"x" * rozmiar)
+        return sciezka
+
+    def test_key_depends_on_content_and_settings(self):
+        """Test klucza zależnego od zawartości i ustawień kodera"""
+        klucz = cache_key("abc", {"format": "JPEG", "params": {"quality": 90}})
+        self.assertEqual(
+            klucz, cache_key("abc", {"params": {"quality": 90}, "format": "JPEG"})
+        )
+        self.assertNotEqual(
+            klucz, cache_key("abd", {"format": "JPEG", "params": {"quality": 90}})
+        )
+        self.assertNotEqual(
+            klucz, cache_key("abc", {"format": "JPEG", "params": {"quality": 80}})
+        )
+
+    def test_put_and_lookup(self):
+        """Test dodania wpisu i odczytu jego ścieżki"""
+        pamiec = OutputCache(self.folder)
+        self.assertIsNone(pamiec.lookup("a" * 64))
+        pamiec.put("a" * 64, self.plik("wynik.jpg", 100))
+        wpis = pamiec.lookup("a" * 64)
+        with open(wpis, "rb") as f:
+            self.assertEqual(f.read(), b"x" * 100)
+        self.assertEqual(pamiec.bytes, 100)
+        self.assertEqual(os.listdir(self.folder), [os.path.basename(wpis)])
+
+    def test_lru_eviction(self):
+        """Test usuwania najdawniej użytych wpisów ponad limit"""
+        pamiec = OutputCache(self.folder, max_bytes=280)
+        for i, klucz in enumerate(("a", "b")):
+            pamiec.put(klucz, self.plik(f"{klucz}.jpg", 100))
+            st = os.stat(pamiec.lookup(klucz))
+            os.utime(pamiec.lookup(klucz), ns=(st.st_atime_ns, i * 10**9))
+        # Trafienie odświeża "a", więc przy przycinaniu usuwany jest "b"
+        pamiec.lookup("a")
+        pamiec.put("c", self.plik("c.jpg", 100))
+        self.assertIsNone(pamiec.lookup("b"))
+        self.assertIsNotNone(pamiec.lookup("a"))
+        self.assertIsNotNone(pamiec.lookup("c"))
+        self.assertEqual(pamiec.stats()["evictions"], 1)
+        self.assertLessEqual(pamiec.bytes, 280)
+
+    def test_link_mode(self):
+        """Test wpisu jako twardego dowiązania do pliku wynikowego"""
+        pamiec = OutputCache(self.folder, link=True)
+        wynik = self.plik("wynik.jpg", 10)
+        pamiec.put("a", wynik)
+        self.assertTrue(os.path.samefile(pamiec.lookup("a"), wynik))
+
+    def test_counters(self):
+        """Test liczników trafień i chybień"""
+        pamiec = OutputCache(self.folder)
+        pamiec.record(True)
+        pamiec.record(False)
+        pamiec.record(False)
+        self.assertEqual(
+            pamiec.stats(), {"hits": 1, "misses": 2, "evictions": 0, "bytes": None}
+        )
+
+    def test_shared_per_folder(self):
+        """Test jednej pamięci na folder w procesie"""
+        pamiec = shared_cache(self.folder, max_bytes=1000)
+        self.assertIs(shared_cache(self.folder + os.sep, max_bytes=2000), pamiec)
+        self.assertEqual(pamiec.max_bytes, 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
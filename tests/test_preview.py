@@ -0,0 +1,276 @@
+"""
+Testy jednostkowe dla szybkiego podglądu plików ImageFlow
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from preview import (
+        METHOD_CACHED,
+        METHOD_DRAFT,
+        METHOD_EMBEDDED,
+        METHOD_FULL,
+        METHOD_PAGE,
+        DiskPreviewCache,
+        PreviewCache,
+        PreviewLoader,
+        load_preview,
+        preview_key,
+    )
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+class TestLoadPreview(unittest.TestCase):
+    """Testy podglądu w zmniejszonej rozdzielczości"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.obraz = Image.new("RGB", (1600, 1200), color=(200, 100, 50))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def sciezka(self, nazwa):
+        return os.path.join(self._tmp.name, nazwa)
+
+    def test_jpeg_uses_draft(self):
+        """Test skalowania DCT dla JPEG"""
+        plik = self.sciezka("obraz.jpg")
+        self.obraz.save(plik)
+        podglad = load_preview(plik, (200, 200))
+        self.assertEqual(podglad.method, METHOD_DRAFT)
+        self.assertEqual(podglad.format, "JPEG")
+        self.assertEqual(podglad.size, (1600, 1200))
+        self.assertEqual(podglad.image.size, (200, 150))
+        self.assertEqual(podglad.file_size, os.path.getsize(plik))
+
+    def test_heif_uses_embedded_thumbnail(self):
+        """Test użycia osadzonej miniatury HEIF"""
+        plik = self.sciezka("obraz.heic")
+        self.obraz.save(plik, quality=50, thumbnails=[256])
+        podglad = load_preview(plik, (200, 200))
+        self.assertEqual(podglad.method, METHOD_EMBEDDED)
+        self.assertEqual(podglad.size, (1600, 1200))
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_heif_without_adequate_thumbnail_decodes_fully(self):
+        """Test pełnego dekodowania, gdy miniatura HEIF jest za mała"""
+        plik = self.sciezka("obraz.heic")
+        self.obraz.save(plik, quality=50, thumbnails=[64])
+        podglad = load_preview(plik, (200, 200))
+        self.assertEqual(podglad.method, METHOD_FULL)
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_tiff_uses_reduced_page(self):
+        """Test wyboru strony TIFF o zmniejszonej rozdzielczości"""
+        plik = self.sciezka("obraz.tiff")
+        self.obraz.save(
+            plik,
+            save_all=True,
+            append_images=[
+                self.obraz.resize((800, 600)),
+                self.obraz.resize((400, 300)),
+            ],
+        )
+        podglad = load_preview(plik, (200, 200))
+        self.assertEqual(podglad.method, METHOD_PAGE)
+        self.assertEqual(podglad.size, (1600, 1200))
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_tiff_ignores_unrelated_pages(self):
+        """Test pominięcia stron TIFF o innych proporcjach"""
+        plik = self.sciezka("obraz.tiff")
+        self.obraz.save(
+            plik, save_all=True, append_images=[Image.new("RGB", (300, 900))]
+        )
+        podglad = load_preview(plik, (200, 200))
+        self.assertEqual(podglad.method, METHOD_FULL)
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_png_falls_back_to_full_decode(self):
+        """Test pełnego dekodowania formatów bez tańszej drogi"""
+        plik = self.sciezka("obraz.png")
+        self.obraz.save(plik)
+        podglad = load_preview(plik)
+        self.assertEqual(podglad.method, METHOD_FULL)
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_small_image_not_upscaled(self):
+        """Test, że małe obrazy nie są powiększane"""
+        plik = self.sciezka("maly.jpg")
+        Image.new("RGB", (50, 40)).save(plik)
+        podglad = load_preview(plik, (200, 200))
+        self.assertEqual(podglad.image.size, (50, 40))
+
+    def test_invalid_file_raises(self):
+        """Test błędu dla uszkodzonego pliku"""
+        plik = self.sciezka("zly.jpg")
+        with open(plik, "wb") as f:
+            f.write(b"to nie jest obraz")
+        with self.assertRaises(OSError):
+            load_preview(plik)
+
+
+class TestPreviewCache(unittest.TestCase):
+    """Testy pamięci podręcznej podglądów"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.pliki = []
+        for i in range(3):
+            sciezka = os.path.join(self._tmp.name, f"obraz{i}.png")
+            Image.new("RGB", (400, 300), color=(i * 60, 0, 0)).save(sciezka)
+            self.pliki.append(sciezka)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_lru_bounded_by_bytes(self):
+        """Test usuwania najdawniej użytych wpisów ponad limit bajtów"""
+        # Podgląd 200x150 RGB = 90 000 bajtów; limit mieści dwa
+        cache = PreviewCache(max_bytes=200_000)
+        klucze = [preview_key(p) for p in self.pliki]
+        for klucz, plik in zip(klucze[:2], self.pliki):
+            cache.put(klucz, load_preview(plik))
+        self.assertIsNotNone(cache.get(klucze[0]))  # obraz0 ostatnio użyty
+        cache.put(klucze[2], load_preview(self.pliki[2]))
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.bytes, 200_000)
+        self.assertIsNone(cache.get(klucze[1]))
+        self.assertIsNotNone(cache.get(klucze[0]))
+
+    def test_key_changes_with_file(self):
+        """Test zmiany klucza po modyfikacji pliku"""
+        klucz = preview_key(self.pliki[0])
+        st = os.stat(self.pliki[0])
+        os.utime(self.pliki[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertNotEqual(preview_key(self.pliki[0]), klucz)
+
+    def test_disk_cache_roundtrip(self):
+        """Test zapisu i odczytu podglądu z dysku"""
+        cache = DiskPreviewCache(os.path.join(self._tmp.name, "cache"))
+        klucz = preview_key(self.pliki[0])
+        self.assertIsNone(cache.get(klucz))
+        cache.put(klucz, load_preview(self.pliki[0]))
+        podglad = cache.get(klucz)
+        self.assertEqual(podglad.method, METHOD_CACHED)
+        self.assertEqual(podglad.format, "PNG")
+        self.assertEqual(podglad.size, (400, 300))
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_disk_cache_bounded(self):
+        """Test usuwania najdawniej użytych podglądów ponad limit bajtów"""
+        folder = os.path.join(self._tmp.name, "cache")
+        podglad = load_preview(self.pliki[0])
+        klucze = [preview_key(p) for p in self.pliki]
+        cache = DiskPreviewCache(folder)
+        cache.put(klucze[0], podglad)
+        limit = os.path.getsize(cache._sciezka(klucze[0])) * 2
+        cache = DiskPreviewCache(folder, max_bytes=limit)
+        cache.put(klucze[1], podglad)
+        # Odczyt odświeża obraz0, więc przy przycinaniu usuwany jest obraz1
+        st = os.stat(cache._sciezka(klucze[1]))
+        os.utime(cache._sciezka(klucze[0]), ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+        self.assertIsNotNone(cache.get(klucze[0]))
+        cache.put(klucze[2], podglad)
+        self.assertLessEqual(cache.bytes, limit)
+        self.assertIsNone(cache.get(klucze[1]))
+        self.assertIsNotNone(cache.get(klucze[2]))
+
+
+class TestPreviewLoader(unittest.TestCase):
+    """Testy asynchronicznego wczytywania podglądów"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.pliki = []
+        for i in range(5):
+            sciezka = os.path.join(self._tmp.name, f"obraz{i}.jpg")
+            Image.new("RGB", (800, 600), color=(i * 40, 0, 0)).save(sciezka)
+            self.pliki.append(sciezka)
+        self.loader = PreviewLoader()
+
+    def tearDown(self):
+        self.loader.close()
+        self._tmp.cleanup()
+
+    def czekaj(self):
+        koniec = time.monotonic() + 5
+        while self.loader.pending and time.monotonic() < koniec:
+            time.sleep(0.01)
+        return self.loader.poll()
+
+    def test_loads_in_background(self):
+        """Test wczytania podglądu w tle i odbioru przez poll"""
+        self.assertIsNone(self.loader.request(self.pliki[0]))
+        plik, podglad, blad = self.czekaj()
+        self.assertEqual(plik, self.pliki[0])
+        self.assertIsNone(blad)
+        self.assertEqual(podglad.image.size, (200, 150))
+
+    def test_reselect_is_instant(self):
+        """Test natychmiastowego podglądu z pamięci przy ponownym wyborze"""
+        self.loader.request(self.pliki[0])
+        self.czekaj()
+        podglad = self.loader.request(self.pliki[0])
+        self.assertIsNotNone(podglad)
+        self.assertFalse(self.loader.pending)
+
+    def test_only_latest_request_delivered(self):
+        """Test pomijania nieaktualnych żądań przy szybkim przewijaniu"""
+        for plik in self.pliki:
+            self.loader.request(plik)
+        plik, podglad, _ = self.czekaj()
+        self.assertEqual(plik, self.pliki[-1])
+        self.assertIsNotNone(podglad)
+        self.assertIsNone(self.loader.poll())
+
+    def test_cancel_discards_result(self):
+        """Test anulowania żądania"""
+        self.loader.request(self.pliki[0])
+        self.loader.cancel()
+        self.assertIsNone(self.czekaj())
+
+    def test_error_reported(self):
+        """Test zgłoszenia błędu odczytu"""
+        zly = os.path.join(self._tmp.name, "zly.jpg")
+        with open(zly, "wb") as f:
+            f.write(b"to nie jest obraz")
+        self.loader.request(zly)
+        plik, podglad, blad = self.czekaj()
+        self.assertEqual(plik, zly)
+        self.assertIsNone(podglad)
+        self.assertIsInstance(blad, OSError)
+
+    def test_disk_cache_used(self):
+        """Test wczytania podglądu z pamięci dyskowej"""
+        folder = os.path.join(self._tmp.name, "cache")
+        loader = PreviewLoader(disk_cache=DiskPreviewCache(folder))
+        try:
+            loader.request(self.pliki[0])
+            while loader.pending:
+                time.sleep(0.01)
+            loader.poll()
+            loader.cache.clear()
+            loader.request(self.pliki[0])
+            while loader.pending:
+                time.sleep(0.01)
+            _, podglad, _ = loader.poll()
+            self.assertEqual(podglad.method, METHOD_CACHED)
+        finally:
+            loader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Testy jednostkowe dla przekazywania obrazów przez pamięć współdzieloną
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from sharedframes import (
+        MIN_BLOCK_BYTES,
+        SharedFramePool,
+        frame_size,
+        read_frame,
+        write_frame,
+    )
+except ImportError as e:
+    print(f"Błąd importu: {e}")
+    print("Upewnij się że uruchamiasz testy z głównego folderu projektu")
+    sys.exit(1)
+
+
+class TestSharedFramePool(unittest.TestCase):
+    """Testy puli bloków pamięci współdzielonej"""
+
+    def setUp(self):
+        self.pula = SharedFramePool()
+
+    def tearDown(self):
+        self.pula.close()
+
+    def test_blocks_reused(self):
+        """Test ponownego użycia zwolnionego bloku"""
+        blok = self.pula.acquire(100_000)
+        self.assertGreaterEqual(blok.size, 100_000)
+        nazwa = blok.name
+        self.pula.release(blok)
+        self.assertEqual(self.pula.acquire(90_000).name, nazwa)
+        self.assertEqual(self.pula.allocations, 1)
+
+    def test_idle_bytes_bounded(self):
+        """Test usuwania bloków ponad limit bezczynnych bajtów"""
+        pula = SharedFramePool(max_bytes=MIN_BLOCK_BYTES)
+        try:
+            bloki = [pula.acquire(10) for _ in range(3)]
+            for blok in bloki:
+                pula.release(blok)
+            self.assertEqual(pula.bytes, MIN_BLOCK_BYTES)
+        finally:
+            pula.close()
+
+    def test_frame_size(self):
+        """Test szacowania rozmiaru pikseli z nagłówka"""
+        self.assertEqual(frame_size((10, 5), "RGB"), 200)
+        self.assertEqual(frame_size((10, 5), "I;16"), 100)
+
+
+class TestFrames(unittest.TestCase):
+    """Testy zapisu i odczytu obrazów w blokach"""
+
+    def setUp(self):
+        self.pula = SharedFramePool()
+
+    def tearDown(self):
+        self.pula.close()
+
+    def przekaz(self, img):
+        blok = self.pula.acquire(frame_size(img.size, img.mode))
+        return blok, read_frame(blok, write_frame(img, blok.name))
+
+    def test_rgb_roundtrip(self):
+        """Test przekazania obrazu RGB"""
+        img = Image.new("RGB", (64, 48), color=(10, 20, 30))
+        _, odtworzony = self.przekaz(img)
+        self.assertEqual(odtworzony.convert("RGB").tobytes(), img.tobytes())
+        odtworzony.close()
+        del odtworzony
+
+    def test_rgb_shares_memory(self):
+        """Test przekazania obrazu RGB jako RGBX bez pośredniego tobytes()"""
+        img = Image.new("RGB", (8, 8), color=(1, 2, 3))
+        blok = self.pula.acquire(frame_size(img.size, img.mode))
+        with patch.object(Image.Image, "tobytes", side_effect=AssertionError):
+            ramka = write_frame(img, blok.name)
+        self.assertEqual(ramka.rawmode, "RGBX")
+        odtworzony = read_frame(blok, ramka)
+        self.assertEqual(odtworzony.mode, "RGBX")
+        blok.buf[0] = 200
+        self.assertEqual(odtworzony.getpixel((0, 0))[:3], (200, 2, 3))
+        odtworzony.close()
+        del odtworzony
+
+    def test_rgba_shares_memory(self):
+        """Test odtworzenia obrazu RGBA bez kopiowania pikseli"""
+        img = Image.new("RGBA", (8, 8), color=(1, 2, 3, 4))
+        blok, odtworzony = self.przekaz(img)
+        blok.buf[0] = 200
+        self.assertEqual(odtworzony.getpixel((0, 0)), (200, 2, 3, 4))
+        odtworzony.close()
+        del odtworzony
+
+    def test_palette_and_info_preserved(self):
+        """Test przekazania palety i metadanych"""
+        img = Image.new("RGB", (16, 16), color=(255, 0, 0)).convert("P")
+        img.info["transparency"] = 0
+        _, odtworzony = self.przekaz(img)
+        self.assertEqual(odtworzony.mode, "P")
+        self.assertEqual(odtworzony.convert("RGB").getpixel((0, 0)), (255, 0, 0))
+        self.assertEqual(odtworzony.info["transparency"], 0)
+
+    def test_too_small_block_falls_back(self):
+        """Test przekazania pikseli bezpośrednio, gdy blok jest za mały"""
+        img = Image.new("RGB", (400, 400), color=(5, 6, 7))
+        blok = self.pula.acquire(10)
+        ramka = write_frame(img, blok.name)
+        self.assertIsNotNone(ramka.data)
+        self.assertEqual(read_frame(blok, ramka).getpixel((0, 0)), (5, 6, 7))
+
+
+if __name__ == "__main__":
+    unittest.main()